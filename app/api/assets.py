@@ -0,0 +1,125 @@
+"""
+静态资源构建：启动时为每个静态文件生成带内容摘要的文件名和预压缩版本
+
+构建时把 app/static 下的每个文件复制为 <名称>.<摘要>.<扩展名>，并在旁边写入 .gz 和 .br 压缩版本。
+页面模板通过 static_url('css/style.css') 引用资源，得到带摘要的 URL；内容变化时 URL 随之变化，
+所以带摘要的文件可以用 Cache-Control: immutable 长期缓存，再次访问时浏览器不再请求静态资源。
+构建产物只新增不删除，滚动部署期间仍在使用旧页面的客户端能继续取到旧版本的资源。
+多个 worker 同时启动时各自构建，文件先写临时文件再原子替换，内容相同，互不影响。
+开发模式（DEBUG）下不生成摘要文件名，static_url 返回原路径，修改静态文件后立即生效。
+"""
+
+import hashlib
+import mimetypes
+import os
+import stat
+from typing import Dict, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.api.pages import choose_encoding, compress
+
+# 带摘要的资源一年内不变
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 压缩版本文件的后缀
+SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class AssetPipeline:
+    """静态资源的摘要文件名和预压缩版本"""
+
+    def __init__(self, source_dir: str, build_dir: str, enabled: bool = True):
+        self.source_dir = source_dir
+        self.build_dir = build_dir
+        self.enabled = enabled
+        # 原路径 -> 带摘要的路径，均相对于静态目录
+        self.manifest: Dict[str, str] = {}
+        # 带摘要的路径 -> 各编码版本的文件
+        self.files: Dict[str, Dict[str, str]] = {}
+
+    def build(self) -> None:
+        if not self.enabled:
+            return
+        for root, _, names in os.walk(self.source_dir):
+            for name in names:
+                self._build_file(os.path.relpath(os.path.join(root, name), self.source_dir))
+
+    def _build_file(self, path: str) -> None:
+        with open(os.path.join(self.source_dir, path), "rb") as f:
+            data = f.read()
+        stem, ext = os.path.splitext(path)
+        fingerprinted = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        target = os.path.join(self.build_dir, fingerprinted)
+        variants = {}
+        for encoding, body in compress(data).items():
+            variant_path = target + SUFFIXES.get(encoding, "")
+            if not os.path.exists(variant_path):
+                _write_atomic(variant_path, body)
+            variants[encoding] = variant_path
+        self.manifest[path.replace(os.sep, "/")] = fingerprinted.replace(os.sep, "/")
+        self.files[fingerprinted] = variants
+
+    def url(self, path: str) -> str:
+        """模板中引用静态资源的 URL：构建过的资源返回带摘要的路径"""
+        return f"/static/{self.manifest.get(path, path)}"
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """服务器支持 ASGI zerocopysend 扩展时用 sendfile 发送文件，否则按块读取发送"""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.send_header_only or "http.response.zerocopysend" not in scope.get("extensions", {}):
+            await super().__call__(scope, receive, send)
+            return
+        if self.stat_result is None:
+            # 与 FileResponse 一样先 stat，设置 Content-Length、Last-Modified 和 ETag
+            try:
+                stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                raise RuntimeError(f"File at path {self.path} does not exist.")
+            if not stat.S_ISREG(stat_result.st_mode):
+                raise RuntimeError(f"File at path {self.path} is not a file.")
+            self.set_stat_headers(stat_result)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await send({"type": "http.response.zerocopysend", "file": file})
+        finally:
+            await anyio.to_thread.run_sync(file.close)
+        if self.background is not None:
+            await self.background()
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """静态文件挂载：带摘要的路径按 Accept-Encoding 返回预压缩版本并长期缓存，其余路径按原方式返回"""
+
+    def __init__(self, *, pipeline: AssetPipeline, **kwargs):
+        super().__init__(**kwargs)
+        self.pipeline = pipeline
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        variants: Optional[Dict[str, str]] = self.pipeline.files.get(path)
+        if variants is None:
+            return await super().get_response(path, scope)
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), variants)
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return ZeroCopyFileResponse(
+            variants[encoding], headers=headers, media_type=mimetypes.guess_type(path)[0], method=scope["method"]
+        )
@@ -0,0 +1,101 @@
+"""
+条件请求：由客户的版本号生成 ETag，处理 If-None-Match（304）和 If-Match（412）
+
+单个客户的 ETag 为 "v<版本号>.<行标识>"，行标识在新建时随机生成，id 被复用后 ETag 也不会与先前的客户相同；列表页的 ETag 由页内每个客户的 id、版本号和下一页游标摘要得到，
+同一查询参数下页内任一客户变化、增删都会改变 ETag。
+响应带 Cache-Control: no-cache，浏览器每次使用缓存前都带上 If-None-Match 重新验证。
+客户数据随 X-Tenant-ID 选择的租户库而不同，这些响应和 304 都带 Vary: X-Tenant-ID，共享缓存按租户分别保存。
+
+内容只随部署变化的接口（服务元数据、工具模式、规模选项）用 StaticJSON 在启动时序列化一次，
+ETag 为内容摘要，每次部署后客户端只下载一次，之后的重新验证都返回 304。
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Iterable, List, Mapping, Optional
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from app.db.crud import RowVersion
+from app.db.tenants import TENANT_HEADER
+
+CACHE_CONTROL = "no-cache"
+# 可被共享缓存保存，但每次使用前要重新验证，部署后内容变化能立即生效
+STATIC_CACHE_CONTROL = "public, no-cache"
+# 单个客户的 ETag，没有行标识的旧客户为 "v<版本号>"
+CUSTOMER_ETAG_PATTERN = re.compile(r'^"v(\d+)(?:\.([0-9a-f]+))?"$')
+
+
+def customer_etag(customer: Mapping[str, Any]) -> str:
+    """单个客户的 ETag，由版本号和行标识组成"""
+    version, row_token = customer["version"], customer["row_token"]
+    return f'"v{version}.{row_token}"' if row_token else f'"v{version}"'
+
+
+def page_etag(customers: Iterable, next_cursor: Optional[str]) -> str:
+    """列表页的 ETag"""
+    digest = hashlib.sha1()
+    for customer in customers:
+        digest.update(f"{customer.id}:{customer.version}:{customer.row_token},".encode())
+    digest.update((next_cursor or "").encode())
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def _parse_etags(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def is_not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中当前 ETag（弱比较）"""
+    if if_none_match is None:
+        return False
+    tags = _parse_etags(if_none_match)
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": TENANT_HEADER})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = TENANT_HEADER
+
+
+def if_match_versions(if_match: Optional[str]) -> Optional[List[RowVersion]]:
+    """If-Match 中列出的客户版本；没有该请求头或为 * 时返回 None，表示不限定版本
+
+    If-Match 使用强比较，弱 ETag 和无法识别的 ETag 不匹配任何版本。
+    """
+    if if_match is None:
+        return None
+    tags = _parse_etags(if_match)
+    if "*" in tags:
+        return None
+    versions = []
+    for tag in tags:
+        match = CUSTOMER_ETAG_PATTERN.match(tag)
+        if match:
+            versions.append((int(match[1]), match[2] or ""))
+    return versions
+
+
+class StaticJSON:
+    """启动时序列化一次的 JSON 响应：不可变的响应体字节和由内容摘要得到的强 ETag"""
+
+    def __init__(self, content: Any):
+        # 与 JSONResponse 相同的序列化方式
+        self.body = json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:20]}"'
+        self.headers = {"ETag": self.etag, "Cache-Control": STATIC_CACHE_CONTROL}
+
+    def response(self, if_none_match: Optional[str] = None) -> Response:
+        """If-None-Match 命中时返回 304，否则直接返回预先序列化的字节"""
+        if is_not_modified(if_none_match, self.etag):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
@@ -1,14 +1,68 @@
+import csv
+import io
+import json
 import logging
-from typing import List
+from collections import defaultdict
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Type
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.conditional import (
+    StaticJSON,
+    customer_etag,
+    if_match_versions,
+    is_not_modified,
+    not_modified,
+    page_etag,
+    set_etag,
+)
+from app.api.streaming import StreamParseError, iter_json_array, iter_ndjson
 from app.config.options import CustomerSize
-from app.db.database import get_db
-from app.db.models import Customer
-from app.schemas.customer import CustomerCreate, CustomerSchema, CustomerUpdate
+from app.db.bulk import DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, insert_customers, upsert_customers
+from app.db.cache import customer_cache
+from app.db.crud import RowVersion, VersionConflictError, delete_customer_row, select_customer, update_customer_row
+from app.db.database import GroupWriter, get_db, get_read_db, read_session_scope
+from app.db.group_commit import after_commit
+from app.db.queries import (
+    DEFAULT_PAGE_SIZE,
+    EXPORT_COLUMNS,
+    MAX_PAGE_SIZE,
+    SORT_PATTERN,
+    InvalidCursorError,
+    fetch_customer_page,
+    iter_customer_chunks,
+)
+from app.db.sharding import (
+    ShardRouter,
+    customer_read_scope,
+    external_id_fits_shard,
+    fetch_sharded_customer_page,
+    get_customer_writer,
+    get_new_customer_writer,
+    get_shard_router,
+    group_new_customers_by_shard,
+    insert_customers_into_shard,
+    insert_new_customer,
+    iter_sharded_customer_chunks,
+    locate_external_ids,
+    upsert_customers_into_shard,
+)
+from app.schemas.customer import (
+    BulkCreateResult,
+    BulkRowResult,
+    BulkUpsertResult,
+    CustomerCreate,
+    CustomerFilter,
+    CustomerSchema,
+    CustomerUpdate,
+    CustomerUpsert,
+    format_validation_error,
+)
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -18,118 +72,366 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+# 规模选项只随部署变化，启动时序列化一次
+_size_options = StaticJSON({"options": CustomerSize.get_options()})
+
+
 @router.get("/size-options/")
-async def get_size_options():
-    """获取所有可用的客户规模选项"""
-    try:
-        options = CustomerSize.get_options()
-        return {"options": options}
-    except Exception as e:
-        logger.error(f"Error in get_size_options: {str(e)}")
-        return JSONResponse(status_code=500, content={"detail": str(e)})
+async def get_size_options(if_none_match: Optional[str] = Header(None)):
+    """获取所有可用的客户规模选项，响应带 ETag，If-None-Match 命中时返回 304"""
+    return _size_options.response(if_none_match)
+
+
+async def _create(customer: CustomerCreate, db: AsyncSession) -> CustomerSchema:
+    """写操作：一条 INSERT ... RETURNING 新建客户，提交后失效新客户名称的缓存条目"""
+    created = CustomerSchema.model_validate(await insert_new_customer(db, customer.dict()))
+    # 新客户可能成为同名客户中 id 最小的一个
+    after_commit(db, partial(customer_cache.invalidate, names=[created.name]))
+    return created
 
 
 @router.post("/", response_model=CustomerSchema)
-async def create_customer(customer: CustomerCreate, db: Session = Depends(get_db)):
-    """创建客户"""
+async def create_customer(customer: CustomerCreate):
+    """创建客户
+
+    与同时到达的其它增删改合并到一个事务中提交，返回时已提交。
+    external_id 已存在时返回 409；分片模式下同一 external_id 总是写入同一分片，同样由唯一约束拦截。
+    """
     try:
         logger.info("=== Starting customer creation ===")
         logger.info(f"Received customer data: {customer.dict()}")
-        logger.info("Validating customer data...")
 
-        db_customer = Customer(**customer.dict())
-        logger.info("Customer model created successfully")
+        write = get_new_customer_writer(customer.external_id)
+        created = await write(partial(_create, customer))
 
-        logger.info("Adding to database session...")
-        db.add(db_customer)
-
-        logger.info("Committing transaction...")
-        db.commit()
-
-        logger.info("Refreshing customer data...")
-        db.refresh(db_customer)
-
-        logger.info(f"Customer created successfully with ID: {db_customer.id}")
-        return db_customer
+        logger.info(f"Customer created successfully with ID: {created.id}")
+        return created
+    except IntegrityError as e:
+        logger.info(f"Customer with external_id {customer.external_id} already exists: {str(e)}")
+        return JSONResponse(status_code=409, content={"detail": "Customer with this external_id already exists"})
     except Exception as e:
         logger.error("=== Error in customer creation ===")
         logger.error(f"Error type: {type(e).__name__}")
         logger.error(f"Error message: {str(e)}")
         logger.error("Stack trace:", exc_info=True)
-        db.rollback()
         return JSONResponse(status_code=500, content={"detail": str(e), "error_type": type(e).__name__})
 
 
+def _iter_request_items(request: Request):
+    """根据 Content-Type 选择请求体的增量解析方式"""
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        return iter_ndjson(request.stream())
+    return iter_json_array(request.stream())
+
+
+BatchWriter = Callable[[AsyncSession, List[Dict[str, Any]]], Awaitable[List[int]]]
+Batch = List[Tuple[int, Dict[str, Any]]]
+BatchFlusher = Callable[[Batch, List[BulkRowResult]], Awaitable[int]]
+
+
+async def _write_batch(db: AsyncSession, write: BatchWriter, batch: Batch, results: List[BulkRowResult]) -> int:
+    """在独立事务中写入一个批次，返回成功写入的行数"""
+    try:
+        ids = await write(db, [row for _, row in batch])
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error writing customer batch: {str(e)}")
+        results.extend(BulkRowResult(index=index, error=str(e)) for index, _ in batch)
+        return 0
+    customer_cache.invalidate(customer_ids=ids, names=[row["name"] for _, row in batch])
+    results.extend(BulkRowResult(index=index, id=customer_id) for (index, _), customer_id in zip(batch, ids))
+    return len(ids)
+
+
+async def _insert_batch_by_shard(router: ShardRouter, batch: Batch, results: List[BulkRowResult]) -> int:
+    """分片模式：带 external_id 的行按其哈希选择分片，其余行一起写入轮转选出的分片，每个分片一个事务"""
+    groups = group_new_customers_by_shard(router, batch, lambda item: item[1].get("external_id"))
+    written = 0
+    for shard, group in groups.items():
+        async with router.write_session(shard) as db:
+            written += await _write_batch(db, insert_customers_into_shard, group, results)
+    return written
+
+
+async def _upsert_batch_by_shard(router: ShardRouter, batch: Batch, results: List[BulkRowResult]) -> int:
+    """分片模式：已存在的 external_id 在其所在分片上更新，新的按 external_id 哈希选择分片"""
+    located = await locate_external_ids(router, [row["external_id"] for _, row in batch])
+    groups: Dict[int, Batch] = defaultdict(list)
+    for index, row in batch:
+        external_id = row["external_id"]
+        groups[located.get(external_id, router.shard_for_key(external_id))].append((index, row))
+    written = 0
+    for shard, group in groups.items():
+        async with router.write_session(shard) as db:
+            written += await _write_batch(db, upsert_customers_into_shard, group, results)
+    return written
+
+
+async def _process_bulk(
+    request: Request, schema: Type[BaseModel], flush: BatchFlusher, batch_size: int
+) -> Tuple[int, List[BulkRowResult]]:
+    """边解析边校验请求体中的行，每攒满 batch_size 行就交给 flush 在一个事务中批量写入
+
+    校验或写入失败的行在结果中单独标出，不影响其它行。
+    请求体本身格式错误时抛出 StreamParseError，written 属性为此前已提交的行数。
+    """
+    results: List[BulkRowResult] = []
+    batch: Batch = []
+    written = 0
+    try:
+        index = 0
+        async for item in _iter_request_items(request):
+            if isinstance(item, StreamParseError):
+                results.append(BulkRowResult(index=index, error=str(item)))
+            else:
+                try:
+                    batch.append((index, schema.model_validate(item).model_dump()))
+                except ValidationError as e:
+                    results.append(BulkRowResult(index=index, error=format_validation_error(e)))
+            index += 1
+            if len(batch) >= batch_size:
+                written += await flush(batch, results)
+                batch = []
+        if batch:
+            written += await flush(batch, results)
+    except StreamParseError as e:
+        e.written = written
+        raise
+    results.sort(key=lambda result: result.index)
+    return written, results
+
+
+@router.post("/bulk", response_model=BulkCreateResult)
+async def bulk_create_customers(
+    request: Request,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """批量创建客户
+
+    请求体为 CustomerCreate 对象组成的 JSON 数组，或 application/x-ndjson。
+    """
+    shard_router = get_shard_router()
+    if shard_router is None:
+        flush = partial(_write_batch, db, insert_customers)
+    else:
+        flush = partial(_insert_batch_by_shard, shard_router)
+    try:
+        created, results = await _process_bulk(request, CustomerCreate, flush, batch_size)
+    except StreamParseError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e), "created": e.written})
+    logger.info(f"Bulk create finished: {created} created, {len(results) - created} failed")
+    return BulkCreateResult(created=created, failed=len(results) - created, results=results)
+
+
+@router.post("/upsert", response_model=BulkUpsertResult)
+async def upsert_customers_by_external_id(
+    request: Request,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """按 external_id 批量同步客户
+
+    已存在的 external_id 更新为请求中的数据，不存在的新建；重复推送同一批数据结果不变。
+    请求体格式与 /bulk 相同，每行必须包含 external_id。
+    """
+    shard_router = get_shard_router()
+    if shard_router is None:
+        flush = partial(_write_batch, db, upsert_customers)
+    else:
+        flush = partial(_upsert_batch_by_shard, shard_router)
+    try:
+        upserted, results = await _process_bulk(request, CustomerUpsert, flush, batch_size)
+    except StreamParseError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e), "upserted": e.written})
+    logger.info(f"Bulk upsert finished: {upserted} upserted, {len(results) - upserted} failed")
+    return BulkUpsertResult(upserted=upserted, failed=len(results) - upserted, results=results)
+
+
 @router.get("/", response_model=List[CustomerSchema])
-async def list_customers(db: Session = Depends(get_db)):
-    """获取客户列表"""
+async def list_customers(
+    response: Response,
+    filters: CustomerFilter = Depends(),
+    sort: str = Query("id", pattern=SORT_PATTERN),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """获取客户列表
+
+    键集分页：还有下一页时在响应头 X-Next-Cursor 中返回游标，
+    以 cursor 参数回传即可取下一页。
+    响应带整页的 ETag，If-None-Match 命中时返回 304。
+    """
     try:
-        logger.info("Attempting to fetch all customers")
-        customers = db.query(Customer).all()
-        logger.info(f"Successfully fetched {len(customers)} customers")
-        for customer in customers:
-            logger.debug(f"Customer data: {customer.id}, {customer.name}, {customer.size}")
+        shard_router = get_shard_router()
+        if shard_router is None:
+            customers, next_cursor = await fetch_customer_page(db, filters, sort, cursor, limit)
+        else:
+            customers, next_cursor = await fetch_sharded_customer_page(shard_router, filters, sort, cursor, limit)
+        logger.debug(f"Fetched {len(customers)} customers")
+        etag = page_etag(customers, next_cursor)
+        if is_not_modified(if_none_match, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return customers
+    except InvalidCursorError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
     except Exception as e:
         logger.error(f"Error listing customers: {str(e)}", exc_info=True)
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
 
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+async def _iter_export_chunks(filters: CustomerFilter) -> AsyncIterator[List[Dict[str, Any]]]:
+    """按批次读取要导出的客户，分片模式下归并所有分片"""
+    shard_router = get_shard_router()
+    if shard_router is not None:
+        async for chunk in iter_sharded_customer_chunks(shard_router, filters):
+            yield chunk
+        return
+    async with read_session_scope() as db:
+        async for chunk in iter_customer_chunks(db, filters):
+            yield chunk
+
+
+async def _export_stream(filters: CustomerFilter, export_format: str) -> AsyncIterator[str]:
+    """逐批生成导出内容
+
+    会话在生成器内部获取和释放，保证在整个响应流结束前连接都可用。
+    """
+    try:
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+            writer.writeheader()
+            async for chunk in _iter_export_chunks(filters):
+                writer.writerows(chunk)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            async for chunk in _iter_export_chunks(filters):
+                yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk)
+    except Exception as e:
+        logger.error(f"Error exporting customers: {str(e)}", exc_info=True)
+        raise
+
+
+@router.get("/export")
+async def export_customers(
+    filters: CustomerFilter = Depends(),
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+):
+    """流式导出客户数据，支持 NDJSON 和 CSV 格式"""
+    return StreamingResponse(
+        _export_stream(filters, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="customers.{export_format}"'},
+    )
+
+
+async def _load_customer(customer_id: int) -> Optional[Dict[str, Any]]:
+    """从客户所在的库读取整行数据"""
+    async with customer_read_scope(customer_id) as db:
+        return await select_customer(db, customer_id)
+
+
 @router.get("/{customer_id}", response_model=CustomerSchema)
-async def get_customer(customer_id: int, db: Session = Depends(get_db)):
-    """获取单个客户"""
+async def get_customer(customer_id: int, response: Response, if_none_match: Optional[str] = Header(None)):
+    """获取单个客户，响应带 ETag，If-None-Match 命中时返回 304
+
+    先查进程内缓存，未命中时才获取会话读取数据库；同一客户的并发请求共享一次读取。
+    """
     try:
-        customer = db.query(Customer).filter(Customer.id == customer_id).first()
+        customer = await customer_cache.get_or_load("id", customer_id, partial(_load_customer, customer_id))
         if customer is None:
             return JSONResponse(status_code=404, content={"detail": "Customer not found"})
+        etag = customer_etag(customer)
+        if is_not_modified(if_none_match, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
         return customer
     except Exception as e:
         logger.error(f"Error getting customer: {str(e)}")
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
 
+async def _update(
+    customer_id: int, customer_update: CustomerUpdate, versions: Optional[List[RowVersion]], db: AsyncSession
+) -> Optional[Dict[str, Any]]:
+    """写操作：一条 UPDATE ... RETURNING 只写入请求中给出的字段，返回更新后的整行；客户不存在时返回 None
+
+    提交后失效该客户的缓存条目和新名称的条目。
+    """
+    row = await update_customer_row(db, customer_id, customer_update.dict(exclude_unset=True), versions)
+    if row is None:
+        return None
+    after_commit(db, partial(customer_cache.invalidate, customer_ids=[customer_id], names=[row.name]))
+    return dict(row._mapping)
+
+
 @router.put("/{customer_id}", response_model=CustomerSchema)
-async def update_customer(customer_id: int, customer_update: CustomerUpdate, db: Session = Depends(get_db)):
-    """更新客户"""
+async def update_customer(
+    customer_id: int,
+    customer_update: CustomerUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    write: GroupWriter = Depends(get_customer_writer),
+):
+    """更新客户
+
+    带 If-Match 时只在客户当前的 ETag 与之相符时更新，否则返回 412。响应带更新后的 ETag。
+    external_id 已被其它客户使用时返回 409；分片模式下 external_id 须属于客户所在的分片，否则同样返回 409。
+    """
+    if not external_id_fits_shard(customer_id, customer_update.external_id):
+        return JSONResponse(
+            status_code=409, content={"detail": "external_id belongs to a different shard than this customer"}
+        )
     try:
-        db_customer = db.query(Customer).filter(Customer.id == customer_id).first()
-        if db_customer is None:
+        updated = await write(partial(_update, customer_id, customer_update, if_match_versions(if_match)))
+        if updated is None:
             return JSONResponse(status_code=404, content={"detail": "Customer not found"})
-
-        for field, value in customer_update.dict(exclude_unset=True).items():
-            setattr(db_customer, field, value)
-
-        db.commit()
-        db.refresh(db_customer)
-        return db_customer
+        set_etag(response, customer_etag(updated))
+        return updated
+    except VersionConflictError as e:
+        return JSONResponse(status_code=412, content={"detail": str(e)})
+    except IntegrityError as e:
+        logger.info(f"Customer with external_id {customer_update.external_id} already exists: {str(e)}")
+        return JSONResponse(status_code=409, content={"detail": "Customer with this external_id already exists"})
     except Exception as e:
         logger.error(f"Error updating customer: {str(e)}")
-        db.rollback()
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
 
+async def _delete(customer_id: int, versions: Optional[List[RowVersion]], db: AsyncSession) -> Optional[CustomerSchema]:
+    """写操作：一条 DELETE ... RETURNING 删除客户并返回删除前的数据，客户不存在时返回 None；提交后失效该客户的缓存条目"""
+    row = await delete_customer_row(db, customer_id, versions)
+    if row is None:
+        return None
+    after_commit(db, partial(customer_cache.invalidate, customer_ids=[customer_id]))
+    return CustomerSchema.model_validate(row)
+
+
 @router.delete("/{customer_id}", response_model=CustomerSchema)
-async def delete_customer(customer_id: int, db: Session = Depends(get_db)):
-    """删除客户"""
+async def delete_customer(
+    customer_id: int, if_match: Optional[str] = Header(None), write: GroupWriter = Depends(get_customer_writer)
+):
+    """删除客户，带 If-Match 时只在客户当前的 ETag 与之相符时删除，否则返回 412"""
     try:
-        db_customer = db.query(Customer).filter(Customer.id == customer_id).first()
-        if db_customer is None:
+        deleted = await write(partial(_delete, customer_id, if_match_versions(if_match)))
+        if deleted is None:
             return JSONResponse(status_code=404, content={"detail": "Customer not found"})
-
-        # 保存客户信息用于返回
-        customer_data = {
-            "id": db_customer.id,
-            "name": db_customer.name,
-            "city": db_customer.city,
-            "industry": db_customer.industry,
-            "cargo_type": db_customer.cargo_type,
-            "size": db_customer.size,
-        }
-
-        db.delete(db_customer)
-        db.commit()
-        return customer_data
+        return deleted
+    except VersionConflictError as e:
+        return JSONResponse(status_code=412, content={"detail": str(e)})
     except Exception as e:
         logger.error(f"Error deleting customer: {str(e)}")
-        db.rollback()
         return JSONResponse(status_code=500, content={"detail": str(e)})
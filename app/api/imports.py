@@ -0,0 +1,73 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_db, get_read_db
+from app.db.models import ImportJob
+from app.imports.pipeline import (
+    COMPLETED,
+    DEFAULT_CHUNK_SIZE,
+    MAX_CHUNK_SIZE,
+    create_job,
+    is_job_active,
+    run_import,
+    save_upload,
+)
+from app.schemas.import_job import ImportJobSchema
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/customers", response_model=ImportJobSchema, status_code=202)
+async def import_customers(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    filename: Optional[str] = None,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=MAX_CHUNK_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """上传 CSV 并在后台分块导入客户
+
+    请求体为原始 CSV 内容，表头需包含 name,city,industry,cargo_type,size。
+    立即返回任务信息，通过 GET /api/imports/{job_id} 查看进度。
+    """
+    try:
+        path = await save_upload(request.stream())
+        job = await create_job(db, filename, path, chunk_size)
+        background_tasks.add_task(run_import, job.id)
+        return job
+    except Exception as e:
+        logger.error(f"Error creating import job: {str(e)}", exc_info=True)
+        await db.rollback()
+        return JSONResponse(status_code=500, content={"detail": str(e)})
+
+
+@router.get("/{job_id}", response_model=ImportJobSchema)
+async def get_import_job(job_id: int, db: AsyncSession = Depends(get_read_db)):
+    """查看导入任务进度"""
+    job = await db.get(ImportJob, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"detail": "Import job not found"})
+    return job
+
+
+@router.post("/{job_id}/resume", response_model=ImportJobSchema, status_code=202)
+async def resume_import_job(job_id: int, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_read_db)):
+    """从最后一个已提交的块之后继续执行中断的导入任务
+
+    这里只读取任务状态，写连接留给后台任务。任务仍在运行（租约期内有心跳）时返回 409。
+    """
+    job = await db.get(ImportJob, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"detail": "Import job not found"})
+    if job.status == COMPLETED:
+        return JSONResponse(status_code=409, content={"detail": "Import job already completed"})
+    if is_job_active(job):
+        return JSONResponse(status_code=409, content={"detail": "Import job is already running"})
+    background_tasks.add_task(run_import, job.id)
+    return job
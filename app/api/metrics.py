@@ -0,0 +1,55 @@
+import logging
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.db import database
+from app.db.cache import customer_cache
+from app.db.coherence import cache_watcher
+from app.db.database import get_pool_stats
+from app.db.group_commit import group_committer
+from app.db.sharding import get_shard_router
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/db-pool")
+async def get_db_pool_metrics():
+    """数据库连接池的实时状态：容量、已借出/空闲连接数、溢出连接数和取连接等待时间
+
+    分片模式下 shards 列出每个分片的写引擎和只读引擎。
+    """
+    try:
+        stats = get_pool_stats()
+        shard_router = get_shard_router()
+        if shard_router is not None:
+            stats["shards"] = shard_router.pool_stats()
+        return stats
+    except Exception as e:
+        logger.error(f"Error reading pool stats: {str(e)}")
+        return JSONResponse(status_code=500, content={"detail": str(e)})
+
+
+@router.get("/snapshot")
+async def get_snapshot_metrics():
+    """内存优先模式下的快照状态：快照次数、最近一次的时间和耗时"""
+    if database.memory_snapshot is None:
+        return {"enabled": False}
+    return {"enabled": True, **database.memory_snapshot.stats()}
+
+
+@router.get("/group-commit")
+async def get_group_commit_metrics():
+    """合并提交的统计：批次数、写操作数、平均和最大批次大小、平均提交耗时，以及各写目标当前排队的写操作数"""
+    return group_committer.stats()
+
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """客户读缓存的统计：条目数、占用字节数、命中率、淘汰、过期和失效次数
+
+    sync 为跨进程一致性检查的状态，未启用时为 None。
+    """
+    return {**customer_cache.stats(), "sync": cache_watcher.stats() if cache_watcher is not None else None}
@@ -0,0 +1,96 @@
+"""
+预渲染的 HTML 页面：模板启动时渲染一次，同时保存 gzip 和 brotli 压缩版本
+
+页面模板不使用任何请求数据，渲染结果对所有请求相同。请求到来时按 Accept-Encoding 选择
+br、gzip 或未压缩的版本直接返回，ETag 由页面内容摘要和编码组成，If-None-Match 命中时返回 304。
+开发模式（DEBUG）下每次请求检查模板文件是否修改过，修改后重新渲染。
+"""
+
+import gzip
+import hashlib
+import threading
+from typing import Dict, Optional
+
+import brotli
+from fastapi import Request, Response
+from jinja2 import Environment, Template
+
+from app.api.conditional import CACHE_CONTROL, is_not_modified
+
+# 按优先顺序尝试的压缩编码
+ENCODINGS = ("br", "gzip")
+
+
+def compress(body: bytes) -> Dict[str, bytes]:
+    """未压缩的内容及其各压缩版本，按编码名索引；压缩后不更小的版本不保留"""
+    variants = {"identity": body}
+    # mtime=0 让同样的内容每次压缩得到同样的字节
+    compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0), "br": brotli.compress(body, quality=11)}
+    variants.update((encoding, data) for encoding, data in compressed.items() if len(data) < len(body))
+    return variants
+
+
+def _accepted(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding 中每个编码的 q 值"""
+    accepted = {}
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: Optional[str], available) -> str:
+    """按 Accept-Encoding 选择可用的压缩编码，都不接受时返回 identity"""
+    accepted = _accepted(header)
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+class RenderedPage:
+    """一个预渲染的页面"""
+
+    def __init__(self, environment: Environment, name: str, auto_reload: bool = False):
+        self.environment = environment
+        self.name = name
+        self.auto_reload = auto_reload
+        self._lock = threading.Lock()
+        self.renders = 0
+        self._render()
+
+    def _render(self) -> None:
+        template: Template = self.environment.get_template(self.name)
+        body = template.render().encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self._template = template
+        self._variants = compress(body)
+        self._etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self._variants
+        }
+        self.renders += 1
+
+    def response(self, request: Request) -> Response:
+        """按请求的 Accept-Encoding 和 If-None-Match 返回页面或 304"""
+        if self.auto_reload and not self._template.is_up_to_date:
+            with self._lock:
+                if not self._template.is_up_to_date:
+                    self._render()
+        encoding = choose_encoding(request.headers.get("accept-encoding"), self._variants)
+        headers = {"ETag": self._etags[encoding], "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if is_not_modified(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=self._variants[encoding], media_type="text/html; charset=utf-8", headers=headers)
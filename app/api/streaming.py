@@ -0,0 +1,126 @@
+import codecs
+import json
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+# 解析状态
+_OPEN, _FIRST_ITEM, _ITEM, _SEPARATOR, _DONE = range(5)
+_WHITESPACE = " \t\r\n"
+
+_decoder = json.JSONDecoder()
+
+
+class StreamParseError(ValueError):
+    """请求体不是合法的 JSON 数组 / NDJSON"""
+
+    # 出错前已经写入数据库的行数，由批量写入方填充
+    written = 0
+
+
+def _skip_whitespace(buffer: str, pos: int) -> int:
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+class _JsonArrayParser:
+    """顶层 JSON 数组的解析状态，每次解析缓冲区中已到达的数据"""
+
+    def __init__(self):
+        self.state = _OPEN
+
+    def parse(self, buffer: str, eof: bool) -> Tuple[List[Any], int]:
+        """解析缓冲区中所有完整的元素，返回这些元素和已解析到的位置，之后的数据留到下一次解析"""
+        items: List[Any] = []
+        pos = _skip_whitespace(buffer, 0)
+        while pos < len(buffer):
+            next_pos = self._step(buffer, pos, eof, items)
+            if next_pos is None:
+                break
+            pos = _skip_whitespace(buffer, next_pos)
+        return items, pos
+
+    def _step(self, buffer: str, pos: int, eof: bool, items: List[Any]) -> Optional[int]:
+        """处理 pos 处的一个括号、分隔符或元素，返回之后的位置；需要等待更多数据时返回 None"""
+        char = buffer[pos]
+        if self.state == _OPEN:
+            if char != "[":
+                raise StreamParseError("Request body must be a JSON array")
+            self.state = _FIRST_ITEM
+        elif self.state == _FIRST_ITEM and char == "]":
+            self.state = _DONE
+        elif self.state in (_FIRST_ITEM, _ITEM):
+            return self._item(buffer, pos, eof, items)
+        elif self.state == _SEPARATOR:
+            self.state = _after_separator(char)
+        else:
+            raise StreamParseError("Unexpected data after JSON array")
+        return pos + 1
+
+    def _item(self, buffer: str, pos: int, eof: bool, items: List[Any]) -> Optional[int]:
+        """解析一个数组元素，返回元素之后的位置；元素还不完整时返回 None"""
+        try:
+            item, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise StreamParseError(f"Invalid JSON: {e.msg}")
+            return None
+        # 位于缓冲区末尾的标量可能被分块截断（如数字），等待更多数据
+        if end == len(buffer) and not eof and not isinstance(item, (dict, list)):
+            return None
+        items.append(item)
+        self.state = _SEPARATOR
+        return end
+
+
+def _after_separator(char: str) -> int:
+    """元素之后的分隔符对应的下一个状态"""
+    if char == ",":
+        return _ITEM
+    if char == "]":
+        return _DONE
+    raise StreamParseError("Expected ',' or ']' between array items")
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """增量解析顶层 JSON 数组，每解析出一个元素就立即产出
+
+    只在缓冲区中保留尚未解析完的尾部数据，不需要先把整个请求体读入内存。
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    iterator = chunks.__aiter__()
+    parser = _JsonArrayParser()
+    buffer, eof = "", False
+    while not eof:
+        try:
+            buffer += utf8.decode(await iterator.__anext__())
+        except StopAsyncIteration:
+            buffer += utf8.decode(b"", final=True)
+            eof = True
+        items, pos = parser.parse(buffer, eof)
+        for item in items:
+            yield item
+        buffer = buffer[pos:]
+    if parser.state != _DONE:
+        raise StreamParseError("Unexpected end of JSON array")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """逐行解析 NDJSON，无法解析的行以 StreamParseError 实例产出，由调用方按行记录错误"""
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += utf8.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield _loads_line(line)
+    buffer += utf8.decode(b"", final=True)
+    if buffer.strip():
+        yield _loads_line(buffer)
+
+
+def _loads_line(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return StreamParseError(f"Invalid JSON: {e.msg}")
@@ -0,0 +1,78 @@
+"""
+运行配置：从环境变量读取，启动时先加载项目根目录下的 .env（deploy.sh 会生成该文件）
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# 测试模式标志
+TESTING = bool(os.getenv("TESTING"))
+# 开发模式：页面模板修改后自动重新渲染
+DEBUG = env_bool("DEBUG", False)
+
+# 数据库连接
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+
+# 连接池：queue（默认，固定大小 + 溢出）/ null（每次新建连接）/ static（单连接）
+DB_POOL_CLASS = os.getenv("DB_POOL_CLASS", "queue")
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30.0)
+# 连接最长复用秒数，-1 表示不回收
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", -1)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", False)
+
+# 内存优先模式：数据放在进程内的内存库中，DATABASE_URL 指向的文件作为快照，启动时载入、定期和关闭时写回
+DB_IN_MEMORY = env_bool("DB_IN_MEMORY", False)
+DB_SNAPSHOT_INTERVAL = env_float("DB_SNAPSHOT_INTERVAL", 60.0)
+
+# 合并提交：单条增删改最多等待多少毫秒与同时到达的写操作合并到一个事务，以及每批的最大写操作数
+DB_GROUP_COMMIT_DELAY_MS = env_float("DB_GROUP_COMMIT_DELAY_MS", 2.0)
+DB_GROUP_COMMIT_MAX_BATCH = env_int("DB_GROUP_COMMIT_MAX_BATCH", 64)
+
+# 客户数据的进程内缓存：条目数上限（0 表示关闭）、估算字节数上限和过期秒数
+CUSTOMER_CACHE_MAX_ENTRIES = env_int("CUSTOMER_CACHE_MAX_ENTRIES", 10000)
+CUSTOMER_CACHE_MAX_BYTES = env_int("CUSTOMER_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+CUSTOMER_CACHE_TTL = env_float("CUSTOMER_CACHE_TTL", 30.0)
+# 每隔多少秒检查一次库文件是否被其他进程写入过（PRAGMA data_version），被写入时清空对应租户的缓存；0 表示不检查
+CUSTOMER_CACHE_SYNC_INTERVAL = env_float("CUSTOMER_CACHE_SYNC_INTERVAL", 0.5)
+
+# CSV 导入：上传文件的落盘目录；运行中的任务超过多少秒没有提交新的块视为已中断，可以续传
+IMPORT_DIR = os.getenv("IMPORT_DIR", os.path.join(".", "imports"))
+IMPORT_JOB_LEASE_SECONDS = env_float("IMPORT_JOB_LEASE_SECONDS", 60.0)
+
+# SQLite 性能配置档，见 app/db/pragmas.py
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "balanced")
+
+# 分片存储：DB_SHARDS 大于 1 时客户数据按 id 分散到多个 SQLite 文件，{shard} 替换为分片编号
+DB_SHARDS = env_int("DB_SHARDS", 1)
+DB_SHARD_URL = os.getenv("DB_SHARD_URL", "sqlite:///./app-shard{shard}.db")
+
+# 多租户：请求头 X-Tenant-ID 选择租户库，{tenant} 替换为租户标识
+TENANT_DB_URL = os.getenv("TENANT_DB_URL", "sqlite:///./tenants/{tenant}.db")
+# 同时保持打开的租户库数量上限，以及空闲多少秒后关闭
+TENANT_ENGINE_CAPACITY = env_int("TENANT_ENGINE_CAPACITY", 64)
+TENANT_ENGINE_IDLE_SECONDS = env_float("TENANT_ENGINE_IDLE_SECONDS", 300.0)
+# 每个租户只读连接池的大小（不溢出），控制租户数多时的文件句柄总数
+TENANT_READ_POOL_SIZE = env_int("TENANT_READ_POOL_SIZE", 2)
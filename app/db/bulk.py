@@ -0,0 +1,54 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import insert, or_, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Customer
+
+# 批量写入的默认批次大小和上限
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+
+
+async def insert_customers(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+    """用 executemany 批量写入多行客户数据，按输入顺序返回新建的 id
+
+    走 Core 语句而不是 ORM 工作单元，不做逐行 flush/refresh；调用方负责提交事务。
+    customers 表没有 AUTOINCREMENT，SQLite 为新行分配 max(rowid)+1，
+    同一事务内的 executemany 持有写锁，新 id 是连续的，可以由 last_insert_rowid() 反推。
+    行中已带 id 时（分片模式由调用方分配）直接按给定 id 写入。
+    """
+    if not rows:
+        return []
+    await db.execute(insert(Customer.__table__), rows)
+    if "id" in rows[0]:
+        return [row["id"] for row in rows]
+    last_id = await db.scalar(text("SELECT last_insert_rowid()"))
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+
+async def upsert_customers(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+    """按 external_id 批量插入或更新客户，按输入顺序返回 id
+
+    使用 INSERT ... ON CONFLICT(external_id) DO UPDATE，一条语句完成整批同步。
+    内容没有变化的行不会被改写，这类行的 id 通过一次 IN 查询补齐。
+    行中带的 id 只用于新建的行，已存在的行保留原 id，被改写的行版本号加 1。调用方负责提交事务。
+    """
+    if not rows:
+        return []
+    table = Customer.__table__
+    columns = [name for name in rows[0] if name not in ("id", "external_id")]
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.external_id],
+        set_={**{name: stmt.excluded[name] for name in columns}, "version": table.c.version + 1},
+        where=or_(*(table.c[name].is_distinct_from(stmt.excluded[name]) for name in columns)),
+    ).returning(table.c.external_id, table.c.id)
+    ids = dict((await db.execute(stmt, rows)).all())
+
+    unchanged = list({row["external_id"] for row in rows} - ids.keys())
+    if unchanged:
+        lookup = select(table.c.external_id, table.c.id).where(table.c.external_id.in_(unchanged))
+        ids.update((await db.execute(lookup)).all())
+    return [ids[row["external_id"]] for row in rows]
@@ -0,0 +1,203 @@
+"""
+客户数据的进程内读穿透缓存：按 id 和按名称缓存整行客户数据，LRU + TTL
+
+条目数和估算的字节数都有上限，超出时淘汰最久未使用的条目；条目在 TTL 秒后过期。
+写接口在提交后按 id 和名称精确失效相关条目：按名称缓存的是同名客户中 id 最小的一个，
+所以新建客户、改名时要失效新名称，更新和删除时要失效该客户被缓存过的所有名称。
+每次失效都会推进 generation，读取前记下 generation，加载期间发生过失效时不写入缓存，
+避免把写入提交前读到的旧数据放回缓存。
+请求指定了租户时按租户隔离缓存条目。
+未命中时同一客户的并发读取合并为一次数据库查询（缓存关闭时同样合并），见 app/db/singleflight.py。
+其他 worker 进程的写入由 app/db/coherence.py 检测，按租户整体清空（clear_tenant）。
+"""
+
+import time
+from collections import Counter, OrderedDict
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from app.config import settings
+from app.db.singleflight import SingleFlight
+from app.db.tenants import current_tenant
+
+# 缓存键：(租户, "id" 或 "name", 值)
+CacheKey = Tuple[Optional[str], str, Any]
+Customer = Dict[str, Any]
+
+
+def _estimate_size(customer: Customer) -> int:
+    """条目占用内存的粗略估算：键和值的字符数加上固定开销"""
+    return 200 + sum(len(name) + len(str(value)) for name, value in customer.items())
+
+
+class CustomerCache:
+    """按 id 和名称缓存客户数据的 LRU 缓存"""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[Customer, float, int]]" = OrderedDict()
+        # 每个客户被缓存过的名称键，更新和删除该客户时一起失效
+        self._names_by_id: Dict[Tuple[Optional[str], int], Set[CacheKey]] = {}
+        # 每个租户的条目数，供跨进程失效检查只轮询有缓存条目的租户库
+        self._tenant_entries: Counter = Counter()
+        self.bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.tenant_clears = 0
+        self.flights = SingleFlight()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, kind: str, value: Any) -> Optional[Customer]:
+        """按 id 或名称取缓存的客户，未命中或已过期时返回 None"""
+        if not self.enabled:
+            return None
+        key = (current_tenant.get(), kind, value)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, customer: Customer, name: Optional[str] = None, generation: Optional[int] = None) -> None:
+        """按 id 缓存客户，给出 name 时同时按该名称缓存
+
+        generation 为读取前记下的值，此后发生过失效时不写入。
+        """
+        if not self.enabled or (generation is not None and generation != self.generation):
+            return
+        tenant = current_tenant.get()
+        self._store((tenant, "id", customer["id"]), customer)
+        if name is not None:
+            name_key = (tenant, "name", name)
+            self._store(name_key, customer)
+            self._names_by_id.setdefault((tenant, customer["id"]), set()).add(name_key)
+        self._evict()
+
+    async def get_or_load(
+        self,
+        kind: str,
+        value: Any,
+        load: Callable[[], Awaitable[Optional[Customer]]],
+        columns: Optional[Sequence[str]] = None,
+    ) -> Optional[Customer]:
+        """读穿透：未命中时调用 load 从数据库读取并写入缓存，客户不存在时不缓存
+
+        同一客户的并发未命中共享一次 load。columns 为 None 表示 load 读取整行；
+        load 只读取部分列时用 columns 区分，读到的部分行不写入缓存，缓存中只保存整行。
+        """
+        customer = self.get(kind, value)
+        if customer is not None:
+            return customer
+        key = (current_tenant.get(), kind, value, None if columns is None else tuple(columns))
+        return await self.flights.do(key, partial(self._load, kind, value, load, columns is None))
+
+    async def _load(
+        self, kind: str, value: Any, load: Callable[[], Awaitable[Optional[Customer]]], cache: bool
+    ) -> Optional[Customer]:
+        generation = self.generation
+        customer = await load()
+        if customer is not None and cache:
+            self.put(customer, name=value if kind == "name" else None, generation=generation)
+        return customer
+
+    def invalidate(self, customer_ids: Iterable[int] = (), names: Iterable[str] = ()) -> None:
+        """失效客户的 id 条目、该客户被缓存过的名称条目，以及给出的名称条目"""
+        if not self.enabled:
+            return
+        self.generation += 1
+        tenant = current_tenant.get()
+        for customer_id in customer_ids:
+            self._remove((tenant, "id", customer_id))
+            for name_key in self._names_by_id.pop((tenant, customer_id), ()):
+                self._remove(name_key)
+        for name in names:
+            self._remove((tenant, "name", name))
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._names_by_id.clear()
+        self._tenant_entries.clear()
+        self.bytes = 0
+
+    def clear_tenant(self, tenant: Optional[str]) -> None:
+        """清空一个租户（None 为主库）的所有条目"""
+        self.generation += 1
+        for key in [key for key in self._entries if key[0] == tenant]:
+            self._remove(key)
+        self.tenant_clears += 1
+
+    def tenants(self) -> Set[Optional[str]]:
+        """当前有缓存条目的租户"""
+        return set(self._tenant_entries)
+
+    def _store(self, key: CacheKey, customer: Customer) -> None:
+        self._remove(key)
+        size = _estimate_size(customer)
+        self._entries[key] = (customer, time.monotonic() + self.ttl, size)
+        self._tenant_entries[key[0]] += 1
+        self.bytes += size
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry[2]
+        self._tenant_entries[key[0]] -= 1
+        if not self._tenant_entries[key[0]]:
+            del self._tenant_entries[key[0]]
+        if key[1] == "name":
+            names = self._names_by_id.get((key[0], entry[0]["id"]))
+            if names is not None:
+                names.discard(key)
+                if not names:
+                    del self._names_by_id[(key[0], entry[0]["id"])]
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的条目，直到条目数和字节数都不超过上限"""
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "tenant_clears": self.tenant_clears,
+            # 并发的相同读取合并后实际执行的查询数和省下的查询数
+            "loads": self.flights.loads,
+            "coalesced": self.flights.coalesced,
+        }
+
+
+# 客户接口和 MCP 查询共用的缓存
+customer_cache = CustomerCache(
+    settings.CUSTOMER_CACHE_MAX_ENTRIES, settings.CUSTOMER_CACHE_MAX_BYTES, settings.CUSTOMER_CACHE_TTL
+)
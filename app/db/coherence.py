@@ -0,0 +1,146 @@
+"""
+多 worker 部署下客户缓存的跨进程一致性：轮询 SQLite 的 PRAGMA data_version
+
+每个 worker 各有一份进程内缓存，本进程的写入会精确失效相关条目，但看不到其他 worker 的写入。
+检查任务为每个库文件保持一个只读连接，每隔 interval 秒读取一次 data_version：
+其他连接（包括其他进程）在两次读取之间提交过写入时该值会变化，此时清空该库所属租户的全部缓存条目，
+因此其他 worker 写入后最多 interval 秒本进程不再返回旧数据，不需要额外的消息中间件。
+覆盖所有连接到库文件的写入：其他 worker 的接口写入和 CSV 导入任务，以及手工用 sqlite3 修改库文件。
+data_version 无法区分写入来自哪个进程，本进程自己的写入也会触发一次清空，写入频繁时缓存的有效期约为 interval。
+主库（及其分片）始终检查，租户库只在有缓存条目时检查；内存库只属于当前进程，不需要检查。
+"""
+
+import asyncio
+import logging
+import sqlite3
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import make_url
+
+from app.config import settings
+from app.db.cache import CustomerCache, customer_cache
+from app.db.database import SQLALCHEMY_DATABASE_URL, tenant_engines
+from app.db.pool import is_memory_url
+from app.db.sharding import shard_router
+
+logger = logging.getLogger(__name__)
+
+# 租户（None 为主库）到其库文件路径的映射
+WatchedPaths = Dict[Optional[str], List[str]]
+
+
+def _database_path(url: str) -> Optional[str]:
+    """文件库的路径；内存库返回 None"""
+    if is_memory_url(url) or "vfs=memdb" in url:
+        return None
+    return make_url(url).database
+
+
+class DataVersionWatcher:
+    """轮询一组库文件的 data_version，库被写入过时清空对应租户的缓存"""
+
+    def __init__(self, cache: CustomerCache, watched_paths: Callable[[Set[Optional[str]]], WatchedPaths]):
+        self.cache = cache
+        self._watched_paths = watched_paths
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._versions: Dict[str, int] = {}
+        self.polls = 0
+        self.changes = 0
+        self.last_error: Optional[str] = None
+
+    def _data_version(self, path: str) -> Optional[int]:
+        """读取库文件的 data_version，文件还不存在时返回 None"""
+        conn = self._connections.get(path)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            except sqlite3.OperationalError:
+                return None
+            self._connections[path] = conn
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _close(self, path: str) -> None:
+        self._versions.pop(path, None)
+        conn = self._connections.pop(path, None)
+        if conn is not None:
+            conn.close()
+
+    def poll(self) -> Set[Optional[str]]:
+        """读取一轮 data_version，返回库被写入过的租户
+
+        第一次检查某个库时也视为被写入过：开始检查之前缓存的条目可能已经过时。
+        """
+        watched = self._watched_paths(self.cache.tenants())
+        paths = {path for tenant_paths in watched.values() for path in tenant_paths}
+        for path in set(self._connections) - paths:
+            self._close(path)
+        changed = set()
+        for tenant, tenant_paths in watched.items():
+            for path in tenant_paths:
+                version = self._data_version(path)
+                if version is not None and self._versions.get(path) != version:
+                    self._versions[path] = version
+                    changed.add(tenant)
+        self.polls += 1
+        return changed
+
+    def sync(self, changed: Set[Optional[str]]) -> None:
+        """清空库被写入过的租户的缓存条目"""
+        for tenant in changed:
+            self.cache.clear_tenant(tenant)
+        self.changes += len(changed)
+
+    async def run_periodic(self, interval: float) -> None:
+        """每隔 interval 秒在工作线程中检查一次，直到任务被取消"""
+        try:
+            while True:
+                try:
+                    self.sync(await asyncio.to_thread(self.poll))
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.error(f"Cache coherence check failed: {str(e)}", exc_info=True)
+                await asyncio.sleep(interval)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for path in list(self._connections):
+            self._close(path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "watched_files": len(self._connections),
+            "polls": self.polls,
+            "changes": self.changes,
+            "last_error": self.last_error,
+        }
+
+
+def _watched_paths(tenants: Set[Optional[str]]) -> WatchedPaths:
+    """主库和各分片的文件，以及有缓存条目的租户库文件"""
+    main_urls = [SQLALCHEMY_DATABASE_URL] + (shard_router.urls if shard_router is not None else [])
+    watched: WatchedPaths = {None: [path for path in map(_database_path, main_urls) if path is not None]}
+    for tenant in tenants:
+        if tenant is not None:
+            path = _database_path(tenant_engines.url_for(tenant))
+            if path is not None:
+                watched[tenant] = [path]
+    return watched
+
+
+# 缓存关闭、未配置检查间隔或主库为内存库（只能单 worker 运行）时为 None
+cache_watcher: Optional[DataVersionWatcher] = (
+    DataVersionWatcher(customer_cache, _watched_paths)
+    if customer_cache.enabled
+    and settings.CUSTOMER_CACHE_SYNC_INTERVAL > 0
+    and _database_path(SQLALCHEMY_DATABASE_URL) is not None
+    else None
+)
+
+
+def start_cache_watcher_task() -> Optional[asyncio.Task]:
+    """启动缓存一致性检查任务，应用启动时调用"""
+    if cache_watcher is None:
+        return None
+    return asyncio.create_task(cache_watcher.run_periodic(settings.CUSTOMER_CACHE_SYNC_INTERVAL))
@@ -0,0 +1,81 @@
+"""
+单条客户的增删改：每个操作一条 INSERT/UPDATE/DELETE ... RETURNING 语句（SQLite 3.35+）
+
+走 Core 语句，不经过 ORM 工作单元：不加载对象、不做 flush/refresh，写入后的整行由 RETURNING 直接返回。
+更新和删除可以限定客户当前的版本（If-Match），版本不符时不写入并抛出 VersionConflictError。
+调用方负责提交事务。
+"""
+
+from typing import Any, Collection, Dict, Optional, Tuple, TypeVar
+
+from sqlalchemy import Delete, Row, Select, Update, delete, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Customer
+
+customers = Customer.__table__
+
+Statement = TypeVar("Statement", Select, Update, Delete)
+
+# 客户的一个版本：版本号和行标识，与客户的 ETag 一一对应
+RowVersion = Tuple[int, str]
+
+
+class VersionConflictError(ValueError):
+    """客户当前的版本号不在调用方期望的版本中"""
+
+
+async def _raise_if_exists(db: AsyncSession, customer_id: int) -> None:
+    """限定版本的写入没有命中任何行时，区分客户不存在和版本冲突"""
+    if await db.scalar(select(customers.c.version).where(customers.c.id == customer_id)) is not None:
+        raise VersionConflictError(f"Customer {customer_id} has been modified")
+
+
+def _where_version(stmt: Statement, versions: Optional[Collection[RowVersion]]) -> Statement:
+    if versions is None:
+        return stmt
+    return stmt.where(tuple_(customers.c.version, customers.c.row_token).in_(versions))
+
+
+async def select_customer(db: AsyncSession, customer_id: int) -> Optional[Dict[str, Any]]:
+    """按 id 读取整行客户数据，返回可缓存的字典；客户不存在时返回 None"""
+    row = (await db.execute(select(customers).where(customers.c.id == customer_id))).first()
+    return None if row is None else dict(row._mapping)
+
+
+async def insert_customer_row(db: AsyncSession, values: Dict[str, Any]) -> Row:
+    """写入一个客户，返回写入后的整行"""
+    return (await db.execute(insert(customers).values(**values).returning(*customers.c))).one()
+
+
+async def update_customer_row(
+    db: AsyncSession, customer_id: int, values: Dict[str, Any], versions: Optional[Collection[RowVersion]] = None
+) -> Optional[Row]:
+    """只更新 values 中给出的列并把版本号加 1，返回更新后的整行；客户不存在时返回 None
+
+    versions 不为 None 时只在客户当前版本属于其中时更新。
+    """
+    if values:
+        stmt = update(customers).where(customers.c.id == customer_id)
+        stmt = _where_version(stmt, versions).values(**values, version=customers.c.version + 1)
+        row = (await db.execute(stmt.returning(*customers.c))).first()
+    else:
+        stmt = select(customers).where(customers.c.id == customer_id)
+        row = (await db.execute(_where_version(stmt, versions))).first()
+    if row is None and versions is not None:
+        await _raise_if_exists(db, customer_id)
+    return row
+
+
+async def delete_customer_row(
+    db: AsyncSession, customer_id: int, versions: Optional[Collection[RowVersion]] = None
+) -> Optional[Row]:
+    """删除客户，返回删除前的整行；客户不存在时返回 None
+
+    versions 不为 None 时只在客户当前版本属于其中时删除。
+    """
+    stmt = _where_version(delete(customers).where(customers.c.id == customer_id), versions)
+    row = (await db.execute(stmt.returning(*customers.c))).first()
+    if row is None and versions is not None:
+        await _raise_if_exists(db, customer_id)
+    return row
@@ -1,70 +1,232 @@
+import asyncio
 import logging
 import os
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from sqlalchemy import create_engine
+from sqlalchemy import Connection, Engine, Table, create_engine, inspect, make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
+
+from app.config import settings
+from app.db.group_commit import WriteOp, group_committer
+from app.db.pool import is_memory_url, pool_options, pool_status, writer_pool_options
+from app.db.pragmas import (
+    install_immediate_transactions,
+    install_read_only,
+    install_sqlite_profile,
+    read_sqlite_settings,
+)
+from app.db.snapshot import MemorySnapshot
+from app.db.tenants import TenantEngineCache, current_tenant
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # 测试模式标志
-is_testing = bool(os.getenv("TESTING"))
+is_testing = settings.TESTING
+
+# 内存优先模式使用的内存库，memdb VFS 让同一进程的多个连接共享它
+MEMORY_SQLITE_URI = "file:/l2c?vfs=memdb"
+memory_snapshot: Optional[MemorySnapshot] = None
 
 # 数据库URL配置
 if is_testing:
     # 测试环境使用命名内存数据库以实现连接共享
     SQLALCHEMY_DATABASE_URL = "sqlite:///file:memdb?mode=memory&cache=shared&uri=true"
+elif settings.DB_IN_MEMORY:
+    # 内存优先模式：DATABASE_URL 指向的文件只作为快照
+    memory_snapshot = MemorySnapshot(MEMORY_SQLITE_URI, make_url(settings.DATABASE_URL).database)
+    SQLALCHEMY_DATABASE_URL = f"sqlite:///{MEMORY_SQLITE_URI}&uri=true"
 else:
-    # 生产环境使用文件数据库
-    SQLALCHEMY_DATABASE_URL = "sqlite:///./app.db"
+    # 生产环境使用 DATABASE_URL 指定的数据库，默认为文件数据库
+    SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+SQLITE_PROFILE = settings.SQLITE_PROFILE
+
+
+def _read_only_url(url: str) -> str:
+    """文件库以 mode=ro 打开只读连接；内存库只能共用原 URL，靠 query_only 保证只读"""
+    if is_memory_url(url):
+        return url
+    parsed = make_url(url)
+    if parsed.query.get("uri"):
+        return url
+    return str(parsed.set(database=f"file:{parsed.database}", query={"mode": "ro", "uri": "true"}))
 
-# 创建数据库引擎
+
+# 异步驱动使用同一个数据库
+ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# 同步引擎：用于建表迁移、脚本和测试夹具
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     echo=is_testing,  # 在测试模式下启用SQL日志
+    **pool_options(SQLALCHEMY_DATABASE_URL, is_async=False),
 )
+# 每个新连接都应用同一套 PRAGMA
+install_sqlite_profile(engine, SQLITE_PROFILE)
+
+
+def create_async_engines(url: str, read_pool_size: Optional[int] = None) -> Tuple[AsyncEngine, AsyncEngine]:
+    """为一个 SQLite 库创建异步写引擎和只读引擎，两者都应用 SQLITE_PROFILE
+
+    写引擎只有一个连接，所有写事务串行执行，不再互相争抢 SQLite 写锁；
+    只读引擎在 WAL 模式下多个连接可以与写连接并发读取。
+    read_pool_size 指定时只读连接池固定为该大小、不溢出。
+    """
+    writer = create_async_engine(url, echo=is_testing, **writer_pool_options(url))
+    read_url = _read_only_url(url)
+    read_options = pool_options(read_url, is_async=True)
+    if read_pool_size is not None and "pool_size" in read_options:
+        read_options.update(pool_size=read_pool_size, max_overflow=0)
+    reader = create_async_engine(read_url, echo=is_testing, **read_options)
+    install_sqlite_profile(writer.sync_engine, SQLITE_PROFILE)
+    install_immediate_transactions(writer.sync_engine)
+    install_sqlite_profile(reader.sync_engine, SQLITE_PROFILE)
+    install_read_only(reader.sync_engine)
+    return writer, reader
+
+
+# 主库的异步写引擎和只读引擎
+async_engine, read_engine = create_async_engines(ASYNC_DATABASE_URL)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# 用于测试的会话实例
-_test_db = None
+# 提交后不过期对象，避免在返回响应时触发隐式的异步加载
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
 def init_db():
-    """初始化数据库表结构"""
-    Base.metadata.create_all(bind=engine)
-
-
-def get_db():
-    """数据库会话依赖"""
-    if is_testing:
-        # 测试环境使用全局测试会话
-        global _test_db
-        if _test_db is None:
-            logger.warning("测试数据库会话未设置，创建新会话")
-            _test_db = SessionLocal()
-        try:
-            yield _test_db
-        finally:
-            # 测试会话由测试框架管理，这里不关闭
-            pass
-    else:
-        # 非测试环境，每次请求创建新会话
-        db = SessionLocal()
-        try:
-            yield db
-        finally:
-            db.close()
-
-
-def set_test_db(db):
-    """设置测试数据库会话"""
-    global _test_db
-    _test_db = db
-    logger.info("测试数据库会话设置成功")
+    """初始化数据库表结构，内存优先模式下先载入快照"""
+    if memory_snapshot is not None:
+        memory_snapshot.load()
+    create_schema(engine)
+    pragma_settings = ", ".join(f"{name}={value}" for name, value in read_sqlite_settings(engine).items())
+    logger.info(f"SQLite profile '{SQLITE_PROFILE}': {pragma_settings}")
+
+
+def create_schema(bind: Engine, tables: Optional[List[Table]] = None):
+    """建表并补齐已存在的表中缺少的列和索引
+
+    所有 DDL 在同一个事务中执行；写引擎以 BEGIN IMMEDIATE 开始事务时，
+    多个线程或进程同时初始化同一个库会依次执行，后执行的检查到表已存在后跳过。
+    """
+    tables = tables or Base.metadata.sorted_tables
+    with bind.begin() as conn:
+        Base.metadata.create_all(bind=conn, tables=tables)
+        _add_missing_columns(conn, tables)
+        # create_all 不会为已存在的表补建索引，这里逐个补齐
+        for table in tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def _add_missing_columns(conn: Connection, tables: List[Table]):
+    """为已存在的表补充模型中新增的列（SQLite 只支持 ADD COLUMN，新列须可空或带 server_default）"""
+    inspector = inspect(conn)
+    for table in tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                # 按模型生成列定义，带上 server_default 和 NOT NULL，已有的行取默认值
+                column_ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                logger.info(f"Adding column {table.name}.{column.name}")
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+
+
+def _init_tenant_schema(url: str):
+    """新租户库：创建目录和表结构
+
+    同一租户的多个首次请求可能同时到达（也可能在不同 worker 中），建表在 BEGIN IMMEDIATE 事务中串行执行。
+    """
+    directory = os.path.dirname(make_url(url).database)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tenant_engine = create_engine(url)
+    install_sqlite_profile(tenant_engine, SQLITE_PROFILE)
+    install_immediate_transactions(tenant_engine)
+    try:
+        create_schema(tenant_engine)
+    finally:
+        tenant_engine.dispose()
+
+
+# 租户库引擎缓存
+tenant_engines = TenantEngineCache(
+    settings.TENANT_DB_URL,
+    open_engines=partial(create_async_engines, read_pool_size=settings.TENANT_READ_POOL_SIZE),
+    init_schema=_init_tenant_schema,
+    capacity=settings.TENANT_ENGINE_CAPACITY,
+    idle_seconds=settings.TENANT_ENGINE_IDLE_SECONDS,
+)
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """数据库会话依赖（写连接），用于会修改数据的接口；请求指定了租户时连接租户库"""
+    tenant = current_tenant.get()
+    session = AsyncSessionLocal() if tenant is None else tenant_engines.session(tenant)
+    async with session as db:
+        yield db
+
+
+async def get_read_db() -> AsyncIterator[AsyncSession]:
+    """只读数据库会话依赖，用于只查询数据的接口"""
+    tenant = current_tenant.get()
+    session = ReadSessionLocal() if tenant is None else tenant_engines.session(tenant, read_only=True)
+    async with session as db:
+        yield db
+
+
+# 非依赖注入场景（MCP 服务、流式响应、后台任务）使用的会话上下文
+session_scope = asynccontextmanager(get_db)
+read_session_scope = asynccontextmanager(get_read_db)
+
+
+# 提交一个写操作并等待它所在的批次提交，返回写操作的结果
+GroupWriter = Callable[[WriteOp], Awaitable[Any]]
+
+
+def get_writer() -> GroupWriter:
+    """合并提交的写入口依赖，用于单条增删改；请求指定了租户时写入租户库"""
+    tenant = current_tenant.get()
+    if tenant is None:
+        return partial(group_committer.submit, "main", AsyncSessionLocal)
+    return partial(group_committer.submit, f"tenant:{tenant}", partial(tenant_engines.session, tenant))
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """写引擎、只读引擎和同步引擎连接池的实时状态，以及租户引擎缓存的使用情况"""
+    return {
+        "write": pool_status(async_engine.sync_engine),
+        "read": pool_status(read_engine.sync_engine),
+        "sync": pool_status(engine),
+        "tenants": tenant_engines.stats(),
+    }
+
+
+def start_snapshot_task() -> Optional[asyncio.Task]:
+    """内存优先模式下启动定期快照任务，应用启动时调用"""
+    if memory_snapshot is None:
+        return None
+    return asyncio.create_task(memory_snapshot.run_periodic(settings.DB_SNAPSHOT_INTERVAL))
+
+
+async def dispose_engines():
+    """释放连接池中的连接，应用关闭时调用；内存优先模式下最后保存一次快照"""
+    await async_engine.dispose()
+    await read_engine.dispose()
+    await tenant_engines.dispose()
+    engine.dispose()
+    if memory_snapshot is not None:
+        memory_snapshot.close()
@@ -0,0 +1,162 @@
+"""
+合并提交（group commit）：把几毫秒内先后到达的单行写操作放进同一个事务，一次提交
+
+每个写目标（主库、某个分片、某个租户库）各有一个队列。第一个写操作到达后等待 max_delay 秒，
+期间到达的写操作一起在一个事务中执行；队列攒满 max_batch 个时立即提交，不再等待。
+每个写操作在自己的 SAVEPOINT 中执行，出错时只回滚它自己，调用方各自拿到自己的结果或异常；
+整个事务提交失败时，这一批的调用方都收到该异常。
+写操作可以用 after_commit 登记提交后的回调（如失效缓存），回调由合并提交在事务提交后执行，
+调用方在写操作执行后被取消（如客户端断开）时回调同样执行。
+同一写目标的批次依次执行，与单连接写引擎一致，不会互相争抢写锁。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 写操作：在给定会话中执行一次修改并返回结果，不自行提交
+WriteOp = Callable[[AsyncSession], Awaitable[T]]
+SessionFactory = Callable[[], AsyncContextManager[AsyncSession]]
+
+# 会话 info 中保存提交后回调的键
+_AFTER_COMMIT = "group_commit_after_commit"
+
+
+def after_commit(db: AsyncSession, callback: Callable[[], None]) -> None:
+    """在写操作中登记一个回调，所在事务提交后执行；提交失败时不执行"""
+    db.info.setdefault(_AFTER_COMMIT, []).append(callback)
+
+
+class _WriteQueue:
+    """一个写目标上等待提交的写操作"""
+
+    def __init__(self, session_factory: SessionFactory):
+        self.session_factory = session_factory
+        self.pending: List[Tuple[WriteOp, asyncio.Future]] = []
+        self.full = asyncio.Event()
+        self.timer: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()
+        # 已启动但还没结束的批次数（等待计时、等待锁或正在提交），为 0 时队列才可以移除
+        self.flushes = 0
+
+
+class GroupCommitter:
+    """按写目标合并并发写操作的协调器"""
+
+    def __init__(self, max_delay: float, max_batch: int):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._queues: Dict[str, _WriteQueue] = {}
+        self.batches = 0
+        self.writes = 0
+        self.failed_writes = 0
+        self.failed_commits = 0
+        self.largest_batch = 0
+        self.total_commit_ms = 0.0
+
+    async def submit(self, key: str, session_factory: SessionFactory, op: WriteOp[T]) -> T:
+        """把写操作加入 key 对应写目标的下一批，等待该批提交后返回它的结果"""
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _WriteQueue(session_factory)
+        future = asyncio.get_running_loop().create_future()
+        queue.pending.append((op, future))
+        if queue.timer is None:
+            queue.flushes += 1
+            queue.timer = asyncio.create_task(self._flush_after_delay(key, queue))
+        if len(queue.pending) >= self.max_batch:
+            queue.full.set()
+        return await future
+
+    async def _flush_after_delay(self, key: str, queue: _WriteQueue) -> None:
+        try:
+            await asyncio.wait_for(queue.full.wait(), self.max_delay)
+        except asyncio.TimeoutError:
+            pass
+        # 取走当前这一批，之后到达的写操作开始下一批的计时
+        batch, queue.pending = queue.pending, []
+        queue.timer = None
+        queue.full.clear()
+        try:
+            async with queue.lock:
+                await self._commit(queue.session_factory, batch)
+        finally:
+            queue.flushes -= 1
+        # 只有没有其它批次在等待或执行时才移除队列；否则之后的写操作会新建一个带新锁的队列，
+        # 与仍在等待旧锁的批次同时提交
+        if queue.flushes == 0 and not queue.pending:
+            self._queues.pop(key, None)
+
+    async def _commit(self, session_factory: SessionFactory, batch: List[Tuple[WriteOp, asyncio.Future]]) -> None:
+        """在一个事务中依次执行这一批写操作，提交后把结果交给各自的调用方"""
+        started = time.perf_counter()
+        outcomes: List[Tuple[asyncio.Future, Any, Optional[BaseException]]] = []
+        try:
+            async with session_factory() as db:
+                for op, future in batch:
+                    if future.done():
+                        # 调用方已取消（如客户端断开），不再执行
+                        continue
+                    try:
+                        async with db.begin_nested():
+                            outcomes.append((future, await op(db), None))
+                    except Exception as e:
+                        self.failed_writes += 1
+                        outcomes.append((future, None, e))
+                await db.commit()
+                self._run_after_commit(db.info.pop(_AFTER_COMMIT, []))
+        except Exception as e:
+            self.failed_commits += 1
+            logger.error(f"Group commit of {len(batch)} writes failed: {str(e)}", exc_info=True)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.batches += 1
+            self.writes += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.total_commit_ms += (time.perf_counter() - started) * 1000
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    @staticmethod
+    def _run_after_commit(callbacks: List[Callable[[], None]]) -> None:
+        """执行提交后回调；数据已经提交，回调出错只记录日志，不影响调用方的结果"""
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"After-commit callback failed: {str(e)}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_delay_ms": self.max_delay * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed_writes": self.failed_writes,
+            "failed_commits": self.failed_commits,
+            "largest_batch": self.largest_batch,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0,
+            "avg_commit_ms": round(self.total_commit_ms / self.batches, 3) if self.batches else 0,
+            "pending": {key: len(queue.pending) for key, queue in self._queues.items() if queue.pending},
+        }
+
+
+# 单行增删改共用的合并提交协调器
+group_committer = GroupCommitter(settings.DB_GROUP_COMMIT_DELAY_MS / 1000, settings.DB_GROUP_COMMIT_MAX_BATCH)
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Enum, Integer, String
+import secrets
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Enum, Float, Integer, String, text
 
 from app.config.options import CustomerSize
 from app.db.database import Base
@@ -7,8 +10,37 @@ from app.db.database import Base
 class Customer(Base):
     __tablename__ = "customers"
     id = Column(Integer, primary_key=True, index=True)
+    # SQLite 的索引条目末尾自带 rowid(即 id)，单列索引即可支撑 (列, id) 的键集分页
     name = Column(String, index=True)
-    city = Column(String)
-    industry = Column(String)
-    cargo_type = Column(String)
-    size = Column(Enum(CustomerSize))
+    city = Column(String, index=True)
+    industry = Column(String, index=True)
+    cargo_type = Column(String, index=True)
+    size = Column(Enum(CustomerSize), index=True)
+    # 上游 CRM 中的客户标识，用于幂等同步
+    external_id = Column(String, unique=True, index=True, nullable=True)
+    # 行版本号，每次写入加 1，用于 ETag 和 If-Match 乐观并发控制
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    # 新建时随机生成的行标识：id 没有 AUTOINCREMENT，删除后可能被新客户复用，ETag 带上它以区分前后两个客户
+    # 早于该列的客户取空串
+    row_token = Column(String, nullable=False, default=lambda: secrets.token_hex(8), server_default=text("''"))
+
+
+class ImportJob(Base):
+    """CSV 导入任务，记录已提交的进度以便中断后续传"""
+
+    __tablename__ = "import_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String)
+    path = Column(String)
+    status = Column(String, default="pending")
+    chunk_size = Column(Integer)
+    # 已提交的数据行数（含校验失败的行），续传时从这里之后开始
+    rows_processed = Column(Integer, default=0)
+    rows_created = Column(Integer, default=0)
+    rows_failed = Column(Integer, default=0)
+    chunks_committed = Column(Integer, default=0)
+    rows_per_second = Column(Float)
+    errors = Column(JSON, default=list)
+    error_message = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool, StaticPool
+
+from app.config import settings
+
+
+class PoolWaitStats:
+    """记录从连接池取连接的次数和等待时间"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_time_total_ms": round(self.wait_total * 1000, 3),
+                "wait_time_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_time_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _WaitTimingMixin:
+    """统计取连接耗时（包括等待空闲连接和新建溢出连接的时间）"""
+
+    wait_stats: PoolWaitStats
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def recreate(self):
+        # 重建连接池时沿用原来的统计
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.record(time.perf_counter() - started)
+
+
+class TimedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def is_memory_url(url: str) -> bool:
+    """内存库的数据只存在于连接上，只能使用 SQLAlchemy 默认的单连接池"""
+    return url.rstrip("/").endswith(":memory:") or "mode=memory" in url or url in ("sqlite://", "sqlite+aiosqlite://")
+
+
+def pool_options(url: str, is_async: bool) -> Dict[str, Any]:
+    """根据配置生成 create_engine 的连接池参数"""
+    if is_memory_url(url):
+        return {}
+    common = {"pool_recycle": settings.DB_POOL_RECYCLE, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if settings.DB_POOL_CLASS == "queue":
+        return {
+            "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            **common,
+        }
+    if settings.DB_POOL_CLASS == "null":
+        return {"poolclass": NullPool, **common}
+    if settings.DB_POOL_CLASS == "static":
+        return {"poolclass": StaticPool, **common}
+    raise ValueError(f"Unknown DB_POOL_CLASS '{settings.DB_POOL_CLASS}', expected one of: queue, null, static")
+
+
+def writer_pool_options(url: str) -> Dict[str, Any]:
+    """写连接池：固定一个连接、不允许溢出，所有写事务在取连接处排队串行执行"""
+    if is_memory_url(url):
+        return {}
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool,
+        "pool_size": 1,
+        "max_overflow": 0,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """连接池的实时状态"""
+    pool: Pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            # 负数表示还能再创建多少个连接才会用到溢出
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        status.update(wait_stats.to_dict())
+    return status
@@ -0,0 +1,133 @@
+import base64
+import binascii
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Customer
+from app.schemas.customer import CustomerFilter
+
+# 可排序的字段，前缀 "-" 表示降序
+SORT_FIELDS = ("id", "name", "city", "industry", "cargo_type", "size")
+SORT_PATTERN = r"^-?(" + "|".join(SORT_FIELDS) + r")$"
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# 导出时每批从游标取出的行数
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_COLUMNS = ("id", "name", "city", "industry", "cargo_type", "size", "external_id")
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析或与排序方式不匹配"""
+
+
+def apply_customer_filters(stmt: Select, filters: Optional[CustomerFilter]) -> Select:
+    """把过滤条件追加到查询语句上"""
+    if filters is None:
+        return stmt
+    for field, value in filters.model_dump(exclude_none=True).items():
+        stmt = stmt.where(getattr(Customer, field) == value)
+    return stmt
+
+
+def sort_value(customer: Customer, field: str) -> Any:
+    """客户在排序字段上的取值，枚举取其字符串值"""
+    value = getattr(customer, field)
+    return value.value if field == "size" and value is not None else value
+
+
+def encode_cursor(customer: Customer, sort: str) -> str:
+    """根据一页的最后一行生成下一页游标"""
+    field = sort.lstrip("-")
+    payload = {"sort": sort, "value": sort_value(customer, field), "id": customer.id}
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """解析游标，返回 (排序字段值, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value, last_id = payload["value"], int(payload["id"])
+        cursor_sort = payload["sort"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+    if cursor_sort != sort:
+        raise InvalidCursorError("Cursor does not match sort order")
+    return value, last_id
+
+
+def customer_page_statement(
+    filters: Optional[CustomerFilter] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Select:
+    """构造键集分页查询
+
+    排序固定以 id 作为次级键，游标条件写成行值比较 (列, id) > (值, id)，
+    SQLite 可以直接在对应索引上定位，翻页耗时与表大小无关。
+    多取一行用于判断是否还有下一页。
+    """
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    column = getattr(Customer, field)
+
+    stmt = apply_customer_filters(select(Customer), filters)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        if field == "id":
+            stmt = stmt.where(Customer.id < last_id if descending else Customer.id > last_id)
+        else:
+            key = tuple_(column, Customer.id)
+            bound = tuple_(value, last_id)
+            stmt = stmt.where(key < bound if descending else key > bound)
+
+    if field == "id":
+        order_by = [Customer.id.desc() if descending else Customer.id]
+    else:
+        order_by = [column.desc(), Customer.id.desc()] if descending else [column, Customer.id]
+    return stmt.order_by(*order_by).limit(limit + 1)
+
+
+async def fetch_customer_page(
+    db: AsyncSession,
+    filters: Optional[CustomerFilter] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[List[Customer], Optional[str]]:
+    """获取一页客户数据，返回 (客户列表, 下一页游标)"""
+    customers = list(await db.scalars(customer_page_statement(filters, sort, cursor, limit)))
+    return split_page(customers, sort, limit)
+
+
+def split_page(customers: List[Customer], sort: str, limit: int) -> Tuple[List[Customer], Optional[str]]:
+    """从多取一行的查询结果中截出一页，还有下一页时生成游标"""
+    if len(customers) <= limit:
+        return customers, None
+    customers = customers[:limit]
+    return customers, encode_cursor(customers[-1], sort)
+
+
+async def iter_customer_chunks(
+    db: AsyncSession, filters: Optional[CustomerFilter] = None, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """按批次流式读取客户数据
+
+    只查询列而不构造 ORM 实体，配合 yield_per 分批 fetch，
+    内存中最多保留一个批次的数据，与表大小无关。
+    """
+    columns = [getattr(Customer, name) for name in EXPORT_COLUMNS]
+    stmt = apply_customer_filters(select(*columns), filters).order_by(Customer.id)
+    result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+    try:
+        async for partition in result.partitions():
+            yield [{**row._asdict(), "size": row.size.value if row.size is not None else None} for row in partition]
+    finally:
+        await result.close()
@@ -0,0 +1,322 @@
+"""
+分片存储：客户数据按 id 分散到多个 SQLite 文件，每个分片有独立的写连接，写吞吐随分片数扩展
+
+分片 k 中的客户 id 满足 (id - 1) % 分片数 == k。新 id 在目标分片的写事务内按步长分配
+（该分片当前最大 id + 分片数），事务以 BEGIN IMMEDIATE 开始持有写锁，不需要中心化的发号器也能全局唯一；
+按 id 读写时直接算出所在分片，列表和导出则在所有分片上执行后归并。
+导入任务等其它表仍在主库中。请求指定了租户时使用租户库，租户库不分片。
+"""
+
+import asyncio
+import heapq
+import itertools
+import zlib
+from collections import defaultdict, deque
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import Row, Select, create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.db.bulk import insert_customers, upsert_customers
+from app.db.crud import insert_customer_row
+from app.db.database import GroupWriter, create_async_engines, create_schema, get_writer, read_session_scope
+from app.db.group_commit import group_committer
+from app.db.models import Customer
+from app.db.pool import pool_status
+from app.db.pragmas import install_sqlite_profile
+from app.db.queries import (
+    DEFAULT_PAGE_SIZE,
+    EXPORT_CHUNK_SIZE,
+    customer_page_statement,
+    iter_customer_chunks,
+    sort_value,
+    split_page,
+)
+from app.db.tenants import current_tenant
+from app.schemas.customer import CustomerFilter
+
+T = TypeVar("T")
+
+
+def _next_id_statement(shard: int, shard_count: int) -> Select:
+    """分片中下一个可用的 id，空分片从 shard + 1 开始"""
+    return select(func.coalesce(func.max(Customer.id), shard + 1 - shard_count) + shard_count)
+
+
+async def allocate_customer_ids(db: AsyncSession, count: int) -> List[int]:
+    """在分片写会话中为 count 个新客户分配 id，会话的 info 中记录分片编号和分片总数"""
+    shard_count = db.info["shard_count"]
+    next_id = await db.scalar(_next_id_statement(db.info["shard"], shard_count))
+    return [next_id + offset * shard_count for offset in range(count)]
+
+
+async def insert_new_customer(db: AsyncSession, values: Dict[str, Any]) -> Row:
+    """写入一个新客户；在分片写会话中先按分片分配 id"""
+    if "shard_count" in db.info:
+        values = {**values, "id": (await allocate_customer_ids(db, 1))[0]}
+    return await insert_customer_row(db, values)
+
+
+async def insert_customers_into_shard(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+    """分配 id 后批量写入当前分片"""
+    ids = await allocate_customer_ids(db, len(rows))
+    return await insert_customers(db, [{**row, "id": customer_id} for row, customer_id in zip(rows, ids)])
+
+
+async def upsert_customers_into_shard(db: AsyncSession, rows: List[Dict[str, Any]]) -> List[int]:
+    """按 external_id 同步到当前分片，新建的行使用本分片分配的 id"""
+    ids = await allocate_customer_ids(db, len(rows))
+    return await upsert_customers(db, [{**row, "id": customer_id} for row, customer_id in zip(rows, ids)])
+
+
+class ShardRouter:
+    """按客户 id 把会话路由到对应的分片"""
+
+    def __init__(self, urls: List[str]):
+        if len(urls) < 2:
+            raise ValueError("Sharded storage needs at least 2 shards")
+        self.urls = list(urls)
+        self._engines = []
+        self._write_sessions = []
+        self._read_sessions = []
+        for shard, url in enumerate(self.urls):
+            writer, reader = create_async_engines(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+            info = {"shard": shard, "shard_count": len(self.urls)}
+            self._engines.append((writer, reader))
+            self._write_sessions.append(async_sessionmaker(writer, info=info, autoflush=False, expire_on_commit=False))
+            self._read_sessions.append(async_sessionmaker(reader, info=info, autoflush=False, expire_on_commit=False))
+        self._round_robin = itertools.count()
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.urls)
+
+    def shard_for(self, customer_id: int) -> int:
+        """客户 id 所在的分片"""
+        return (customer_id - 1) % self.shard_count
+
+    def shard_for_key(self, key: str) -> int:
+        """按 external_id 的哈希为新客户选择分片，同一 external_id 总是落在同一分片"""
+        return zlib.crc32(key.encode("utf-8")) % self.shard_count
+
+    def next_shard(self) -> int:
+        """轮转选择写入新客户的分片"""
+        return next(self._round_robin) % self.shard_count
+
+    def write_session(self, shard: int) -> AsyncSession:
+        return self._write_sessions[shard]()
+
+    def read_session(self, shard: int) -> AsyncSession:
+        return self._read_sessions[shard]()
+
+    def init_db(self):
+        """在每个分片上创建客户表"""
+        for url in self.urls:
+            engine = create_engine(url)
+            install_sqlite_profile(engine, settings.SQLITE_PROFILE)
+            try:
+                create_schema(engine, [Customer.__table__])
+            finally:
+                engine.dispose()
+
+    def pool_stats(self) -> List[Dict[str, Any]]:
+        """每个分片写引擎和只读引擎连接池的状态"""
+        return [
+            {"write": pool_status(writer.sync_engine), "read": pool_status(reader.sync_engine)}
+            for writer, reader in self._engines
+        ]
+
+    async def dispose(self):
+        for writer, reader in self._engines:
+            await writer.dispose()
+            await reader.dispose()
+
+
+def shard_urls(count: int, template: str) -> List[str]:
+    """按模板生成各分片的数据库 URL"""
+    return [template.format(shard=shard) for shard in range(count)]
+
+
+# 未启用分片时为 None，客户数据存放在主库
+shard_router: Optional[ShardRouter] = (
+    ShardRouter(shard_urls(settings.DB_SHARDS, settings.DB_SHARD_URL)) if settings.DB_SHARDS > 1 else None
+)
+
+
+def get_shard_router() -> Optional[ShardRouter]:
+    """主库启用了分片时返回路由器；未启用分片或请求指定了租户时返回 None"""
+    if current_tenant.get() is not None:
+        return None
+    return shard_router
+
+
+def init_shards():
+    """应用启动时为各分片建表"""
+    router = get_shard_router()
+    if router is not None:
+        router.init_db()
+
+
+async def dispose_shards():
+    router = get_shard_router()
+    if router is not None:
+        await router.dispose()
+
+
+async def get_customer_read_db(customer_id: int) -> AsyncIterator[AsyncSession]:
+    """按路径中的客户 id 选择只读会话"""
+    router = get_shard_router()
+    session = read_session_scope() if router is None else router.read_session(router.shard_for(customer_id))
+    async with session as db:
+        yield db
+
+
+customer_read_scope = asynccontextmanager(get_customer_read_db)
+
+
+def get_customer_writer(customer_id: int) -> GroupWriter:
+    """按路径中的客户 id 选择合并提交的写目标：分片模式下为该客户所在的分片"""
+    router = get_shard_router()
+    if router is None:
+        return get_writer()
+    shard = router.shard_for(customer_id)
+    return partial(group_committer.submit, f"shard:{shard}", partial(router.write_session, shard))
+
+
+def new_customer_shard(router: "ShardRouter", external_id: Optional[str]) -> int:
+    """新客户写入的分片
+
+    带 external_id 的客户按其哈希选择分片，同一 external_id 总是落在同一分片，由分片内的唯一约束保证不重复；
+    其余轮转选择。
+    """
+    return router.shard_for_key(external_id) if external_id else router.next_shard()
+
+
+def group_new_customers_by_shard(
+    router: "ShardRouter", items: List[T], external_id: Callable[[T], Optional[str]]
+) -> Dict[int, List[T]]:
+    """把一批新客户按写入分片分组：带 external_id 的按哈希分组，其余一起写入轮转选出的一个分片"""
+    groups: Dict[int, List[T]] = defaultdict(list)
+    next_shard = None
+    for item in items:
+        key = external_id(item)
+        if key:
+            groups[router.shard_for_key(key)].append(item)
+            continue
+        if next_shard is None:
+            next_shard = router.next_shard()
+        groups[next_shard].append(item)
+    return groups
+
+
+def get_new_customer_writer(external_id: Optional[str] = None) -> GroupWriter:
+    """新建客户的合并提交写目标：分片模式下按 new_customer_shard 选择分片"""
+    router = get_shard_router()
+    if router is None:
+        return get_writer()
+    shard = new_customer_shard(router, external_id)
+    return partial(group_committer.submit, f"shard:{shard}", partial(router.write_session, shard))
+
+
+def external_id_fits_shard(customer_id: int, external_id: Optional[str]) -> bool:
+    """已有客户能否改用该 external_id：分片模式下 external_id 的哈希分片必须是客户 id 所在的分片
+
+    external_id 的唯一约束只在分片内生效，新建和同步都按哈希把同一 external_id 路由到同一分片；
+    客户改用属于其它分片的 external_id 后，再按该值新建客户时唯一约束就拦截不到。
+    """
+    router = get_shard_router()
+    return router is None or not external_id or router.shard_for_key(external_id) == router.shard_for(customer_id)
+
+
+async def _on_all_shards(router: ShardRouter, stmt: Select, rows: bool = False) -> List[List[Any]]:
+    """在所有分片上并发执行同一个查询，默认取每行的第一列，rows 为 True 时返回整行"""
+
+    async def fetch(shard: int) -> List[Any]:
+        async with router.read_session(shard) as db:
+            result = await db.execute(stmt)
+            return list(result.all() if rows else result.scalars())
+
+    return await asyncio.gather(*(fetch(shard) for shard in range(router.shard_count)))
+
+
+def _merge_key(sort: str) -> Callable[[Customer], Tuple]:
+    """与 SQLite 排序一致的归并键：NULL 排在最前，再按字段值和 id"""
+    field = sort.lstrip("-")
+
+    def key(customer: Customer) -> Tuple:
+        value = sort_value(customer, field)
+        return (value is not None, value, customer.id)
+
+    return key
+
+
+async def fetch_sharded_customer_page(
+    router: ShardRouter,
+    filters: Optional[CustomerFilter] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Tuple[List[Customer], Optional[str]]:
+    """在所有分片上取游标之后的一页，按排序键归并后截出全局的一页
+
+    每个分片各自取 limit + 1 行就足够：全局的前 limit + 1 行一定在各分片的前 limit + 1 行之中。
+    """
+    stmt = customer_page_statement(filters, sort, cursor, limit)
+    pages = await _on_all_shards(router, stmt)
+    merged = heapq.merge(*pages, key=_merge_key(sort), reverse=sort.startswith("-"))
+    return split_page(list(itertools.islice(merged, limit + 1)), sort, limit)
+
+
+async def iter_sharded_customer_chunks(
+    router: ShardRouter, filters: Optional[CustomerFilter] = None, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """同时流式读取所有分片，按 id 归并输出
+
+    每个分片缓冲一个批次；所有未读完的分片中，缓冲区末尾 id 的最小值以内的行已经可以确定顺序，
+    每轮输出这些行，内存中最多保留每个分片各一个批次。
+    """
+    async with AsyncExitStack() as stack:
+        streams = []
+        for shard in range(router.shard_count):
+            db = await stack.enter_async_context(router.read_session(shard))
+            streams.append(await stack.enter_async_context(aclosing(iter_customer_chunks(db, filters, chunk_size))))
+        buffers: List[Deque[Dict[str, Any]]] = [deque() for _ in streams]
+        live = set(range(len(streams)))
+        while True:
+            for shard in sorted(live):
+                if not buffers[shard]:
+                    chunk = await anext(streams[shard], None)
+                    if chunk is None:
+                        live.discard(shard)
+                    else:
+                        buffers[shard].extend(chunk)
+            if not any(buffers):
+                return
+            bound = min((buffers[shard][-1]["id"] for shard in live), default=None)
+            ready = []
+            for buffer in buffers:
+                rows = []
+                while buffer and (bound is None or buffer[0]["id"] <= bound):
+                    rows.append(buffer.popleft())
+                ready.append(rows)
+            yield list(heapq.merge(*ready, key=lambda row: row["id"]))
+
+
+async def find_rows_on_shards(router: ShardRouter, stmt: Select) -> List[Row]:
+    """在所有分片上执行查询，返回所有分片的结果行"""
+    return [row for rows in await _on_all_shards(router, stmt, rows=True) for row in rows]
+
+
+async def find_customer_on_shards(router: ShardRouter, stmt: Select) -> Optional[Row]:
+    """在所有分片上执行查询，返回 id 最小的匹配行；查询的列中须包含 id"""
+    return min(await find_rows_on_shards(router, stmt), key=lambda row: row.id, default=None)
+
+
+async def locate_external_ids(router: ShardRouter, external_ids: List[str]) -> Dict[str, int]:
+    """查出已存在的 external_id 所在的分片"""
+    stmt = select(Customer.external_id).where(Customer.external_id.in_(set(external_ids)))
+    found = await _on_all_shards(router, stmt)
+    return {external_id: shard for shard, rows in enumerate(found) for external_id in rows}
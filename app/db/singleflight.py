@@ -0,0 +1,66 @@
+"""
+合并并发的相同读取（single-flight）
+
+同一个键同时只有一次加载在执行：第一个调用方执行加载，之后到达的调用方等待并共享它的结果或异常，
+加载结束后键即被移除，下一次调用重新加载。
+执行加载的调用方被取消（如客户端断开）时，等待中的调用方不会跟着取消，而是由其中一个重新加载。
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Abandoned(Exception):
+    """执行加载的调用方被取消，等待中的调用方需要重新加载"""
+
+
+def _retrieve_exception(future: asyncio.Future) -> None:
+    # 没有等待方时异常也视为已处理，避免 "exception was never retrieved" 日志
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """按键合并并发加载"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.loads = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        """key 上已有加载在执行时等待它的结果，否则执行 load"""
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+            try:
+                # shield：等待方自己被取消时不影响加载和其他等待方
+                result = await asyncio.shield(flight)
+            except _Abandoned:
+                continue
+            self.coalesced += 1
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_retrieve_exception)
+        self._flights[key] = future
+        self.loads += 1
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            future.set_exception(_Abandoned())
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"loads": self.loads, "coalesced": self.coalesced, "in_flight": len(self._flights)}
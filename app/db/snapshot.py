@@ -0,0 +1,95 @@
+"""
+内存库的磁盘快照：启动时从快照文件载入，运行中定期、关闭时用 SQLite backup API 写回
+
+内存库使用 memdb VFS（file:/名称?vfs=memdb），同一进程内的多个连接共享同一份数据，并且与文件库一样按库加锁。
+内存库在最后一个连接关闭时释放，快照对象持有一个常驻连接，既保证数据存活，也用于执行 backup。
+两次快照之间的写入在进程崩溃时会丢失；每个进程各有一份内存库，只能以单 worker 运行。
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MemorySnapshot:
+    """内存库与其磁盘快照文件"""
+
+    def __init__(self, memory_uri: str, path: str):
+        self.memory_uri = memory_uri
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.snapshots = 0
+        self.last_snapshot_at: Optional[float] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def load(self) -> None:
+        """打开常驻连接，快照文件存在时把它载入内存库"""
+        self._conn = sqlite3.connect(self.memory_uri, uri=True, check_same_thread=False)
+        if not os.path.exists(self.path):
+            logger.info(f"No snapshot at {self.path}, starting with an empty in-memory database")
+            return
+        started = time.perf_counter()
+        source = sqlite3.connect(self.path)
+        try:
+            source.backup(self._conn)
+        finally:
+            source.close()
+        logger.info(f"Loaded snapshot {self.path} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def save(self) -> None:
+        """把内存库一次性备份到临时文件，再原子替换快照文件
+
+        backup 一步复制全部页面，期间持有读锁，得到的是某个时刻的一致快照。
+        """
+        if self._conn is None:
+            return
+        with self._lock:
+            started = time.perf_counter()
+            tmp_path = f"{self.path}.tmp"
+            target = sqlite3.connect(tmp_path)
+            try:
+                self._conn.backup(target)
+            finally:
+                target.close()
+            os.replace(tmp_path, self.path)
+            self.snapshots += 1
+            self.last_snapshot_at = time.time()
+            self.last_duration_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    async def run_periodic(self, interval: float) -> None:
+        """每隔 interval 秒在工作线程中保存一次快照，直到任务被取消"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.save)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Snapshot to {self.path} failed: {str(e)}", exc_info=True)
+
+    def close(self) -> None:
+        """保存最后一次快照并关闭常驻连接"""
+        if self._conn is None:
+            return
+        try:
+            self.save()
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "snapshots": self.snapshots,
+            "last_snapshot_at": self.last_snapshot_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+        }
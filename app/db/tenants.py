@@ -0,0 +1,179 @@
+"""
+多租户：请求头 X-Tenant-ID 选择租户自己的 SQLite 库
+
+当前租户保存在 ContextVar 中，由中间件在请求开始时设置，get_db / session_scope 据此选择引擎，
+后台任务和流式响应在同一请求上下文中运行，自动沿用请求的租户。
+租户引擎放在有容量上限的 LRU 中，空闲超时或超出容量时关闭，打开的文件句柄数与租户总数无关。
+"""
+
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+# 指定租户的请求头，不带该请求头时使用主库
+TENANT_HEADER = "X-Tenant-ID"
+
+# 租户标识只允许字母、数字、下划线和短横线，直接用作数据库文件名
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# 当前请求的租户，None 表示使用主库
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+
+class InvalidTenantError(ValueError):
+    """租户标识格式不合法"""
+
+
+def validate_tenant(tenant: str) -> str:
+    if not TENANT_ID_PATTERN.match(tenant):
+        raise InvalidTenantError("Invalid tenant id")
+    return tenant
+
+
+@dataclass
+class TenantDatabase:
+    """一个租户已打开的写引擎、只读引擎和会话工厂"""
+
+    writer: AsyncEngine
+    reader: AsyncEngine
+    write_sessions: async_sessionmaker
+    read_sessions: async_sessionmaker
+    last_used: float = field(default_factory=time.monotonic)
+    # 正在使用的会话数，大于 0 时不会被淘汰
+    in_use: int = 0
+
+    async def dispose(self):
+        await self.writer.dispose()
+        await self.reader.dispose()
+
+
+class TenantEngineCache:
+    """按租户缓存引擎的 LRU
+
+    打开新租户时先在工作线程中建表，超出 capacity 时淘汰最久未用且没有会话在用的租户，
+    每次取会话时顺带关闭空闲超过 idle_seconds 的租户。
+    """
+
+    def __init__(
+        self,
+        url_template: str,
+        open_engines: Callable[[str], Tuple[AsyncEngine, AsyncEngine]],
+        init_schema: Callable[[str], None],
+        capacity: int,
+        idle_seconds: float,
+    ):
+        self.url_template = url_template
+        self._open_engines = open_engines
+        self._init_schema = init_schema
+        self.capacity = capacity
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._databases: "OrderedDict[str, TenantDatabase]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def url_for(self, tenant: str) -> str:
+        return self.url_template.format(tenant=validate_tenant(tenant))
+
+    async def _acquire(self, tenant: str) -> TenantDatabase:
+        with self._lock:
+            database = self._databases.get(tenant)
+            if database is not None:
+                self._databases.move_to_end(tenant)
+                database.in_use += 1
+                database.last_used = time.monotonic()
+                self.hits += 1
+                return database
+
+        url = self.url_for(tenant)
+        await asyncio.to_thread(self._init_schema, url)
+        writer, reader = self._open_engines(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+        opened = TenantDatabase(
+            writer=writer,
+            reader=reader,
+            write_sessions=async_sessionmaker(writer, autoflush=False, expire_on_commit=False),
+            read_sessions=async_sessionmaker(reader, autoflush=False, expire_on_commit=False),
+        )
+        with self._lock:
+            database = self._databases.setdefault(tenant, opened)
+            self._databases.move_to_end(tenant)
+            database.in_use += 1
+            database.last_used = time.monotonic()
+            self.misses += 1
+        if database is not opened:
+            # 并发打开了同一个租户，保留先放入缓存的那份
+            await opened.dispose()
+        return database
+
+    def _release(self, database: TenantDatabase) -> None:
+        with self._lock:
+            database.in_use -= 1
+            database.last_used = time.monotonic()
+
+    def _pop_evictable(self) -> List[TenantDatabase]:
+        """取出超出容量或空闲超时、且没有会话在用的租户"""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            excess = len(self._databases) - self.capacity
+            for tenant, database in list(self._databases.items()):
+                if database.in_use:
+                    continue
+                if excess > 0 or now - database.last_used > self.idle_seconds:
+                    del self._databases[tenant]
+                    evicted.append(database)
+                    excess -= 1
+            self.evictions += len(evicted)
+        return evicted
+
+    async def evict_idle(self) -> int:
+        """关闭应当淘汰的租户引擎，返回关闭的数量"""
+        evicted = self._pop_evictable()
+        for database in evicted:
+            await database.dispose()
+        return len(evicted)
+
+    @asynccontextmanager
+    async def session(self, tenant: str, read_only: bool = False) -> AsyncIterator[AsyncSession]:
+        """租户的写会话或只读会话，使用期间该租户不会被淘汰"""
+        database = await self._acquire(tenant)
+        try:
+            sessions = database.read_sessions if read_only else database.write_sessions
+            async with sessions() as db:
+                yield db
+        finally:
+            self._release(database)
+            await self.evict_idle()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            databases = dict(self._databases)
+            stats = {
+                "capacity": self.capacity,
+                "open": len(databases),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+        now = time.monotonic()
+        stats["tenants"] = {
+            tenant: {"in_use": database.in_use, "idle_seconds": round(now - database.last_used, 1)}
+            for tenant, database in databases.items()
+        }
+        return stats
+
+    async def dispose(self):
+        with self._lock:
+            databases = list(self._databases.values())
+            self._databases.clear()
+        for database in databases:
+            await database.dispose()
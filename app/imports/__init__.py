@@ -0,0 +1,3 @@
+"""
+CSV Import Package
+"""
@@ -0,0 +1,213 @@
+import asyncio
+import csv
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import ColumnElement, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.db.bulk import insert_customers
+from app.db.cache import customer_cache
+from app.db.database import session_scope
+from app.db.models import ImportJob
+from app.db.sharding import get_shard_router, group_new_customers_by_shard, insert_customers_into_shard
+from app.schemas.customer import BulkRowResult, CustomerCreate, format_validation_error
+
+logger = logging.getLogger(__name__)
+
+# 上传文件的落盘目录
+IMPORT_DIR = settings.IMPORT_DIR
+# 上传内容攒到这么多字节再交给工作线程写入磁盘
+UPLOAD_WRITE_SIZE = 1024 * 1024
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 10000
+# 任务上最多记录的错误行数
+MAX_RECORDED_ERRORS = 100
+
+PENDING, RUNNING, COMPLETED, FAILED = "pending", "running", "completed", "failed"
+
+# 一个块：[(数据行序号, 原始行)]
+Chunk = List[Tuple[int, Dict[str, Any]]]
+
+
+async def save_upload(chunks: AsyncIterator[bytes]) -> str:
+    """阶段一：把上传内容边接收边写入磁盘，返回文件路径
+
+    磁盘操作都在工作线程中执行，不阻塞事件循环。
+    """
+    await run_in_threadpool(os.makedirs, IMPORT_DIR, exist_ok=True)
+    path = os.path.join(IMPORT_DIR, f"{uuid.uuid4().hex}.csv")
+    f = await run_in_threadpool(open, path, "wb")
+    try:
+        buffer = bytearray()
+        async for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= UPLOAD_WRITE_SIZE:
+                await run_in_threadpool(f.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(f.write, bytes(buffer))
+    finally:
+        await run_in_threadpool(f.close)
+    return path
+
+
+def _lease_expired(now: datetime) -> datetime:
+    """updated_at 早于该时刻的运行中任务视为已中断"""
+    return now - timedelta(seconds=settings.IMPORT_JOB_LEASE_SECONDS)
+
+
+def is_job_active(job: ImportJob) -> bool:
+    """任务是否正在（或即将）执行：等待中或运行中，且最近一次提交还在租约期内
+
+    运行中的任务每提交一块都会更新 updated_at，作为心跳。
+    """
+    return job.status in (PENDING, RUNNING) and job.updated_at >= _lease_expired(datetime.utcnow())
+
+
+def _claimable(now: datetime) -> ColumnElement[bool]:
+    """可以开始执行的任务：未完成，且不在运行中或运行已超过租约没有心跳"""
+    return or_(ImportJob.status.in_((PENDING, FAILED)), ImportJob.updated_at < _lease_expired(now))
+
+
+async def create_job(db: AsyncSession, filename: Optional[str], path: str, chunk_size: int) -> ImportJob:
+    """登记导入任务
+
+    提交后不再 refresh：各列默认值都在 Python 端生成，提交即释放写连接，后台任务可以立即拿到它。
+    """
+    job = ImportJob(filename=filename, path=path, status=PENDING, chunk_size=chunk_size, errors=[])
+    db.add(job)
+    await db.commit()
+    return job
+
+
+def iter_csv_chunks(path: str, chunk_size: int, skip_rows: int = 0) -> Iterator[Chunk]:
+    """阶段二：按块读取 CSV，跳过已提交的 skip_rows 行"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = enumerate(csv.DictReader(f))
+        for _ in islice(rows, skip_rows):
+            pass
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def _normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """清理表格中常见的格式差异：首尾空白，以及 "Extra Large" 形式的规模标签"""
+    row = {key.strip(): value.strip() if isinstance(value, str) else value for key, value in row.items() if key}
+    if isinstance(row.get("size"), str):
+        row["size"] = row["size"].upper().replace(" ", "_")
+    return row
+
+
+def validate_chunk(chunk: Chunk) -> Tuple[Chunk, List[BulkRowResult]]:
+    """阶段三：用 CustomerCreate 校验一个块，返回 (有效行, 错误行)"""
+    valid: Chunk = []
+    errors: List[BulkRowResult] = []
+    for index, row in chunk:
+        try:
+            valid.append((index, CustomerCreate.model_validate(_normalize_row(row)).model_dump()))
+        except ValidationError as e:
+            errors.append(BulkRowResult(index=index, error=format_validation_error(e)))
+    return valid, errors
+
+
+def _next_validated(chunks: Iterator[Chunk]) -> Optional[Tuple[int, Chunk, List[BulkRowResult]]]:
+    chunk = next(chunks, None)
+    if chunk is None:
+        return None
+    valid, errors = validate_chunk(chunk)
+    return len(chunk), valid, errors
+
+
+async def _write_chunk(
+    db: AsyncSession, job: ImportJob, row_count: int, valid: Chunk, errors: List[BulkRowResult]
+) -> None:
+    """阶段四：在一个事务中写入客户数据并推进任务进度，两者同时生效或同时回滚
+
+    分片模式下客户数据写入分片库（带 external_id 的行按其哈希选择分片），先提交分片再推进主库中的进度；
+    两次提交之间中断时，续传会重新写入这一块。
+    """
+    rows = [row for _, row in valid]
+    shard_router = get_shard_router()
+    if shard_router is None:
+        await insert_customers(db, rows)
+    else:
+        groups = group_new_customers_by_shard(shard_router, rows, lambda row: row.get("external_id"))
+        for shard, group in groups.items():
+            async with shard_router.write_session(shard) as shard_db:
+                await insert_customers_into_shard(shard_db, group)
+                await shard_db.commit()
+    job.rows_processed += row_count
+    job.rows_created += len(valid)
+    job.rows_failed += len(errors)
+    job.chunks_committed += 1
+    if errors and len(job.errors) < MAX_RECORDED_ERRORS:
+        recorded = [error.model_dump() for error in errors]
+        job.errors = (job.errors + recorded)[:MAX_RECORDED_ERRORS]
+    await db.commit()
+    # 新客户可能成为同名客户中 id 最小的一个
+    customer_cache.invalidate(names=[row["name"] for row in rows])
+
+
+async def run_import(job_id: int) -> None:
+    """执行（或续传）导入任务
+
+    解析和校验在单独的工作线程中进行，与事件循环中的写入交错：
+    写入第 N 块时，第 N+1 块已经在解析校验。每块单独提交，
+    任务中断后从最后一个已提交的块之后继续。
+    """
+    loop = asyncio.get_running_loop()
+    async with session_scope() as db:
+        job = None
+        try:
+            # 原子地把任务标记为运行中，同一任务同时只有一次执行
+            now = datetime.utcnow()
+            claim = update(ImportJob).where(ImportJob.id == job_id, ImportJob.status != COMPLETED, _claimable(now))
+            result = await db.execute(claim.values(status=RUNNING, error_message=None, updated_at=now))
+            await db.commit()
+            if result.rowcount == 0:
+                logger.info(f"Import job {job_id} is completed, missing or already running")
+                return
+            job = await db.get(ImportJob, job_id)
+
+            started = time.perf_counter()
+            rows_this_run = 0
+            chunks = iter_csv_chunks(job.path, job.chunk_size, job.rows_processed)
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="import-validate") as executor:
+                pending = loop.run_in_executor(executor, _next_validated, chunks)
+                while True:
+                    validated = await pending
+                    if validated is None:
+                        break
+                    pending = loop.run_in_executor(executor, _next_validated, chunks)
+                    row_count, valid, errors = validated
+                    await _write_chunk(db, job, row_count, valid, errors)
+                    rows_this_run += row_count
+                    job.rows_per_second = round(rows_this_run / max(time.perf_counter() - started, 1e-6), 1)
+
+            job.status = COMPLETED
+            await db.commit()
+            logger.info(
+                f"Import job {job_id} completed: {job.rows_created} created, {job.rows_failed} failed, "
+                f"{job.rows_per_second or 0} rows/s"
+            )
+        except Exception as e:
+            logger.error(f"Import job {job_id} failed: {str(e)}", exc_info=True)
+            await db.rollback()
+            if job is not None:
+                job.status = FAILED
+                job.error_message = str(e)
+                await db.commit()
@@ -1,70 +1,103 @@
-from fastapi import APIRouter, Request
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Header, Request
 from fastapi.responses import JSONResponse
 
-from .errors import MCPError, ToolNotFoundError
+from app.api.conditional import StaticJSON
+from app.db.database import read_session_scope
+from app.db.sharding import get_shard_router
+
+from .errors import InvalidRequestError, MCPError, ToolNotFoundError
 from .protocol import MCPProtocol
-from .service import MCPService
+from .service import MCPService, shared_read_session
+from .tools import get_tool, get_tools
 
 router = APIRouter(prefix="/api/mcp", tags=["mcp"])
 
 
-@router.post("")
-async def handle_mcp_request(request: Request):
-    """处理 MCP 请求"""
-    request_id = None
+# 一次批量请求最多包含的工具调用数
+MAX_BATCH_CALLS = 100
+
+# 服务元数据、工具列表和各工具模式只随部署变化，启动时序列化一次，带 ETag 返回
+_metadata_response = StaticJSON(MCPService.get_service_metadata())
+_tool_list_response = StaticJSON(MCPService.list_tools())
+_tool_schema_responses = {name: StaticJSON(tool.schema.model_dump()) for name, tool in get_tools().items()}
+
+
+async def _handle_call(request_data: Any) -> Tuple[int, Dict[str, Any]]:
+    """处理单个工具调用，返回 HTTP 状态码和响应内容；错误也作为响应内容返回"""
+    request_id = request_data.get("request_id") if isinstance(request_data, dict) else None
     try:
+        if not isinstance(request_data, dict):
+            raise InvalidRequestError("工具调用必须是对象")
         # 解析请求
-        request_data = await request.json()
         parsed_request = MCPProtocol.parse_request(request_data)
-
-        # 获取工具名称和参数
-        tool_name = parsed_request["tool"]
-        parameters = parsed_request["parameters"]
-        request_id = parsed_request["request_id"]
-
-        # 根据工具名称调用相应的服务方法
-        if tool_name == "query":
-            response = MCPService.query_customer(
-                customer_id=parameters.get("customer_id"), fields=parameters.get("fields")
-            )
-        elif tool_name == "query_by_name":
-            response = MCPService.query_customer_by_name(
-                customer_name=parameters.get("customer_name"), fields=parameters.get("fields")
-            )
-        elif tool_name == "list_tools":
-            response = MCPService.list_tools()
-        else:
-            return JSONResponse(
-                status_code=404, content=MCPProtocol.format_error(ToolNotFoundError(tool_name), request_id)
-            )
-
+        response = await get_tool(parsed_request["tool"]).call(parsed_request["parameters"])
         # 格式化并返回响应
-        return JSONResponse(content=MCPProtocol.format_response(response, request_id))
+        return 200, MCPProtocol.format_response(response, request_id)
     except MCPError as e:
         # 处理已知的MCP错误
-        return JSONResponse(status_code=e.status_code, content=MCPProtocol.format_error(e, request_id))
+        return e.status_code, MCPProtocol.format_error(e, request_id)
     except Exception as e:
         # 处理未知错误
-        return JSONResponse(status_code=500, content=MCPProtocol.format_exception(e, request_id))
+        return 500, MCPProtocol.format_exception(e, request_id)
 
 
-@router.get("/metadata")
-async def get_metadata():
-    """获取服务元数据"""
+async def _handle_batch(calls: List[Any]) -> List[Dict[str, Any]]:
+    """处理批量工具调用，按请求中的顺序返回各调用的响应
+
+    未分片时所有调用共用一个只读会话，在同一个连接上依次执行，省去每次取连接和开事务的开销；
+    分片模式下各调用连接各自的分片，并发执行。
+    """
+    if get_shard_router() is not None:
+        results = await asyncio.gather(*(_handle_call(call) for call in calls))
+        return [content for _, content in results]
+    async with read_session_scope() as db:
+        token = shared_read_session.set(db)
+        try:
+            return [(await _handle_call(call))[1] for call in calls]
+        finally:
+            shared_read_session.reset(token)
+
+
+@router.post("")
+async def handle_mcp_request(request: Request):
+    """处理 MCP 请求
+
+    请求体为单个工具调用 {tool, parameters, request_id}，或由多个工具调用组成的数组。
+    数组请求返回同样顺序的响应数组，每个响应带各自的 request_id 和 status，单个调用失败不影响其它调用。
+    """
     try:
-        return MCPService.get_service_metadata()
-    except MCPError as e:
-        return JSONResponse(status_code=e.status_code, content=MCPProtocol.format_error(e, None))
+        request_data = await request.json()
     except Exception as e:
         return JSONResponse(status_code=500, content=MCPProtocol.format_exception(e, None))
+    if not isinstance(request_data, list):
+        status_code, content = await _handle_call(request_data)
+        return JSONResponse(status_code=status_code, content=content)
+    if len(request_data) > MAX_BATCH_CALLS:
+        error = InvalidRequestError(f"批量请求最多包含 {MAX_BATCH_CALLS} 个工具调用", {"calls": len(request_data)})
+        return JSONResponse(status_code=400, content=MCPProtocol.format_error(error, None))
+    return JSONResponse(content=await _handle_batch(request_data))
+
+
+@router.get("/metadata")
+async def get_metadata(if_none_match: Optional[str] = Header(None)):
+    """获取服务元数据，响应带 ETag，If-None-Match 命中时返回 304"""
+    return _metadata_response.response(if_none_match)
+
+
+@router.get("/tools")
+async def list_tools(if_none_match: Optional[str] = Header(None)):
+    """获取可用工具列表，与 list_tools 工具的结果相同，响应带 ETag"""
+    return _tool_list_response.response(if_none_match)
 
 
 @router.get("/tools/{tool_name}")
-async def get_tool_schema(tool_name: str):
-    """获取指定工具的详细模式"""
-    try:
-        return MCPService.get_tool_schema(tool_name)
-    except ToolNotFoundError as e:
-        return JSONResponse(status_code=e.status_code, content=MCPProtocol.format_error(e, None))
-    except Exception as e:
-        return JSONResponse(status_code=500, content=MCPProtocol.format_exception(e, None))
+async def get_tool_schema(tool_name: str, if_none_match: Optional[str] = Header(None)):
+    """获取指定工具的详细模式，响应带 ETag，If-None-Match 命中时返回 304"""
+    schema = _tool_schema_responses.get(tool_name)
+    if schema is None:
+        error = ToolNotFoundError(tool_name)
+        return JSONResponse(status_code=error.status_code, content=MCPProtocol.format_error(error, None))
+    return schema.response(if_none_match)
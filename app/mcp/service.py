@@ -1,147 +1,157 @@
-from typing import Any, Dict, List, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Annotated, Any, AsyncIterator, Dict, List, Mapping, Optional
 
-from app.db.database import get_db
+from pydantic import Field
+from sqlalchemy import Row, Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.cache import customer_cache
+from app.db.database import read_session_scope
 from app.db.models import Customer
+from app.db.sharding import customer_read_scope, find_customer_on_shards, find_rows_on_shards, get_shard_router
+
+from .errors import CustomerNotFoundError, DatabaseError, InternalServerError, InvalidParametersError
+from .protocol import ServiceMetadata
+from .tools import get_tool, get_tools, register_tool
+
+# 批量请求中各工具调用共用的只读会话，未设置时每次调用各自获取会话
+shared_read_session: ContextVar[Optional[AsyncSession]] = ContextVar("mcp_shared_read_session", default=None)
+
+
+@asynccontextmanager
+async def _read_scope(customer_id: Optional[int] = None) -> AsyncIterator[AsyncSession]:
+    """工具调用使用的只读会话：优先使用批量请求共用的会话"""
+    db = shared_read_session.get()
+    if db is not None:
+        yield db
+        return
+    async with read_session_scope() if customer_id is None else customer_read_scope(customer_id) as db:
+        yield db
+
+
+# 单个客户的返回值模式
+CUSTOMER_RETURNS = {
+    "type": "object",
+    "properties": {
+        "customer": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "integer"},
+                "name": {"type": "string"},
+                "city": {"type": "string"},
+                "industry": {"type": "string"},
+            },
+        }
+    },
+}
+
+# 未指定 fields 时返回的字段
+DEFAULT_FIELDS = ("name", "city", "industry")
+# fields 中可以请求的字段，其它字段忽略
+CUSTOMER_FIELDS = ("id", "name", "city", "industry", "cargo_type", "size")
+
+# query_many 一次最多查询的客户数，以及每条 IN (...) 语句的参数个数（远低于 SQLite 的绑定参数上限）
+MAX_QUERY_MANY_KEYS = 1000
+IN_CHUNK_SIZE = 500
+
+customers = Customer.__table__
+
+
+def _projection(fields: Optional[List[str]]) -> List[str]:
+    """请求的字段中可以返回的部分，去重并保持请求中的顺序"""
+    return [field for field in dict.fromkeys(DEFAULT_FIELDS if fields is None else fields) if field in CUSTOMER_FIELDS]
+
+
+def _select_columns(columns: List[str]) -> Select:
+    """只查询要返回的列，另带上 id 用于判断客户是否存在和在分片间取最小 id
+
+    走 Core 语句，结果是轻量的行，不创建 ORM 对象。
+    """
+    return select(customers.c.id, *(customers.c[name] for name in columns if name != "id"))
+
 
-from .errors import CustomerNotFoundError, DatabaseError, InternalServerError, InvalidParametersError, ToolNotFoundError
-from .protocol import ParameterSchema, ServiceMetadata, ToolSchema
+async def _rows_where_in(key: str, values: List[Any], columns: List[str]) -> List[Row]:
+    """按 key IN (...) 查询客户，每块不超过 IN_CHUNK_SIZE 个参数；分片模式下查询所有分片"""
+    column = customers.c[key]
+    stmts = [
+        _select_columns(list(dict.fromkeys([key, *columns]))).where(column.in_(values[start : start + IN_CHUNK_SIZE]))
+        for start in range(0, len(values), IN_CHUNK_SIZE)
+    ]
+    shard_router = get_shard_router()
+    if shard_router is not None:
+        return [row for stmt in stmts for row in await find_rows_on_shards(shard_router, stmt)]
+    rows = []
+    async with _read_scope() as db:
+        for stmt in stmts:
+            rows.extend((await db.execute(stmt)).all())
+    return rows
+
+
+async def _load_by_id(customer_id: int, columns: List[str]) -> Optional[Dict[str, Any]]:
+    """从客户所在的库按 id 读取客户的 columns 列"""
+    async with _read_scope(customer_id) as db:
+        row = (await db.execute(_select_columns(columns).where(customers.c.id == customer_id))).first()
+    return None if row is None else dict(row._mapping)
+
+
+async def _load_by_name(customer_name: str, columns: List[str]) -> Optional[Dict[str, Any]]:
+    """按名称读取客户的 columns 列，同名时取 id 最小的客户，分片模式下查询所有分片"""
+    stmt = _select_columns(columns).where(customers.c.name == customer_name)
+    stmt = stmt.order_by(customers.c.id).limit(1)
+    shard_router = get_shard_router()
+    if shard_router is None:
+        async with _read_scope() as db:
+            row = (await db.execute(stmt)).first()
+    else:
+        row = await find_customer_on_shards(shard_router, stmt)
+    return None if row is None else dict(row._mapping)
+
+
+def _customer_dict(customer: Mapping[str, Any], columns: List[str]) -> Dict[str, Any]:
+    """把客户数据转换为按请求字段组成的字典"""
+    return {name: str(customer[name]) if name == "size" else customer[name] for name in columns}
+
+
+FieldsParameter = Annotated[Optional[List[str]], Field(description="需要返回的字段列表")]
 
 
 class MCPService:
-    """MCP 服务实现"""
-
-    # 服务元数据
-    SERVICE_METADATA = ServiceMetadata(
-        name="L2C MCP Service",
-        version="1.0.0",
-        description="L2C 系统的 MCP 服务，提供客户管理和查询功能",
-        tools=[
-            ToolSchema(
-                name="query",
-                description="查询客户信息",
-                parameters={
-                    "customer_id": ParameterSchema(type="integer", description="客户ID", required=True),
-                    "fields": ParameterSchema(
-                        type="array",
-                        description="需要返回的字段列表",
-                        required=False,
-                        default=["name", "city", "industry"],
-                    ),
-                },
-                returns={
-                    "type": "object",
-                    "properties": {
-                        "customer": {
-                            "type": "object",
-                            "properties": {
-                                "id": {"type": "integer"},
-                                "name": {"type": "string"},
-                                "city": {"type": "string"},
-                                "industry": {"type": "string"},
-                            },
-                        }
-                    },
-                },
-            ),
-            ToolSchema(
-                name="query_by_name",
-                description="按名称查询客户信息",
-                parameters={
-                    "customer_name": ParameterSchema(type="string", description="客户名称", required=True),
-                    "fields": ParameterSchema(
-                        type="array",
-                        description="需要返回的字段列表",
-                        required=False,
-                        default=["name", "city", "industry"],
-                    ),
-                },
-                returns={
-                    "type": "object",
-                    "properties": {
-                        "customer": {
-                            "type": "object",
-                            "properties": {
-                                "id": {"type": "integer"},
-                                "name": {"type": "string"},
-                                "city": {"type": "string"},
-                                "industry": {"type": "string"},
-                            },
-                        }
-                    },
-                },
-            ),
-            ToolSchema(
-                name="list_tools",
-                description="获取可用工具列表",
-                parameters={},
-                returns={
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {"name": {"type": "string"}, "description": {"type": "string"}},
-                    },
-                },
-            ),
-        ],
-        capabilities=["customer_query", "customer_management"],
-    )
+    """MCP 服务实现
+
+    工具在模块末尾注册，参数模式由各方法的签名生成。
+    """
 
     @staticmethod
     def get_service_metadata() -> Dict[str, Any]:
-        """获取服务元数据"""
-        try:
-            return MCPService.SERVICE_METADATA.model_dump()
-        except Exception as e:
-            raise InternalServerError(f"获取服务元数据失败: {str(e)}")
+        """获取服务元数据（启动时生成）"""
+        return _service_metadata
 
     @staticmethod
     def get_tool_schema(tool_name: str) -> Optional[Dict[str, Any]]:
         """获取指定工具的详细模式"""
-        for tool in MCPService.SERVICE_METADATA.tools:
-            if tool.name == tool_name:
-                return tool.model_dump()
-        raise ToolNotFoundError(tool_name)
+        return get_tool(tool_name).schema.model_dump()
 
     @staticmethod
-    def query_customer(customer_id: int, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    async def query_customer(
+        customer_id: Annotated[int, Field(description="客户ID")], fields: FieldsParameter = DEFAULT_FIELDS
+    ) -> Dict[str, Any]:
         """查询客户信息"""
         try:
             # 验证参数
             if not isinstance(customer_id, int) or customer_id <= 0:
                 raise InvalidParametersError("客户ID必须是正整数", {"customer_id": customer_id})
 
-            # 获取数据库会话
-            db = next(get_db())
-            try:
-                # 从数据库查询客户信息
-                customer_db = db.query(Customer).filter(Customer.id == customer_id).first()
-
-                # 如果客户不存在，抛出异常
-                if not customer_db:
-                    raise CustomerNotFoundError(customer_id)
-
-                # 将 SQLAlchemy 模型转换为字典
-                customer = {
-                    "id": customer_db.id,
-                    "name": customer_db.name,
-                    "city": customer_db.city,
-                    "industry": customer_db.industry,
-                    "cargo_type": customer_db.cargo_type,
-                    "size": str(customer_db.size),
-                }
-
-                # 如果指定了字段，只返回这些字段
-                if fields is None:
-                    fields = ["name", "city", "industry"]
-                result = {}
-                for field in fields:
-                    if field in customer:
-                        result[field] = customer[field]
-                return {"customer": result}
-            finally:
-                # 确保会话关闭（非测试环境下）
-                if getattr(db, "_is_test_db", False) is False:
-                    db.close()
+            # 先查缓存，未命中时从客户所在的分片只读取要返回的列，并发的相同查询只读取一次
+            columns = _projection(fields)
+            load = partial(_load_by_id, customer_id, columns)
+            customer = await customer_cache.get_or_load("id", customer_id, load, columns=columns)
+
+            # 如果客户不存在，抛出异常
+            if customer is None:
+                raise CustomerNotFoundError(customer_id)
+            return {"customer": _customer_dict(customer, columns)}
         except CustomerNotFoundError:
             # 直接抛出，不需要额外包装
             raise
@@ -155,45 +165,24 @@ class MCPService:
             raise InternalServerError(f"查询客户时出错: {str(e)}")
 
     @staticmethod
-    def query_customer_by_name(customer_name: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    async def query_customer_by_name(
+        customer_name: Annotated[str, Field(description="客户名称")], fields: FieldsParameter = DEFAULT_FIELDS
+    ) -> Dict[str, Any]:
         """按名称查询客户信息"""
         try:
             # 验证参数
             if not customer_name or not isinstance(customer_name, str):
                 raise InvalidParametersError("客户名称不能为空", {"customer_name": customer_name})
 
-            # 获取数据库会话
-            db = next(get_db())
-            try:
-                # 从数据库查询客户信息（支持模糊匹配）
-                customer_db = db.query(Customer).filter(Customer.name == customer_name).first()
-
-                # 如果客户不存在，抛出异常
-                if not customer_db:
-                    raise CustomerNotFoundError(customer_name, param_name="customer_name")
-
-                # 将 SQLAlchemy 模型转换为字典
-                customer = {
-                    "id": customer_db.id,
-                    "name": customer_db.name,
-                    "city": customer_db.city,
-                    "industry": customer_db.industry,
-                    "cargo_type": customer_db.cargo_type,
-                    "size": str(customer_db.size),
-                }
-
-                # 如果指定了字段，只返回这些字段
-                if fields is None:
-                    fields = ["name", "city", "industry"]
-                result = {}
-                for field in fields:
-                    if field in customer:
-                        result[field] = customer[field]
-                return {"customer": result}
-            finally:
-                # 确保会话关闭（非测试环境下）
-                if getattr(db, "_is_test_db", False) is False:
-                    db.close()
+            # 先查缓存，未命中时从数据库只读取要返回的列，并发的相同查询只读取一次
+            columns = _projection(fields)
+            load = partial(_load_by_name, customer_name, columns)
+            customer = await customer_cache.get_or_load("name", customer_name, load, columns=columns)
+
+            # 如果客户不存在，抛出异常
+            if customer is None:
+                raise CustomerNotFoundError(customer_name, param_name="customer_name")
+            return {"customer": _customer_dict(customer, columns)}
         except CustomerNotFoundError:
             # 直接抛出，不需要额外包装
             raise
@@ -207,12 +196,101 @@ class MCPService:
             raise InternalServerError(f"查询客户时出错: {str(e)}")
 
     @staticmethod
-    def list_tools() -> Dict[str, Any]:
-        """获取可用工具列表"""
+    async def query_many_customers(
+        customer_ids: Annotated[Optional[List[int]], Field(description="客户ID列表")] = None,
+        customer_names: Annotated[Optional[List[str]], Field(description="客户名称列表")] = None,
+        fields: FieldsParameter = DEFAULT_FIELDS,
+    ) -> Dict[str, Any]:
+        """按客户ID或名称列表批量查询客户信息"""
         try:
-            tools = []
-            for tool in MCPService.SERVICE_METADATA.tools:
-                tools.append({"name": tool.name, "description": tool.description})
-            return {"tools": tools}
+            # 验证参数
+            if bool(customer_ids) == bool(customer_names):
+                raise InvalidParametersError("customer_ids 和 customer_names 必须且只能提供一个")
+            key, keys = ("id", customer_ids) if customer_ids else ("name", customer_names)
+            keys = list(dict.fromkeys(keys))
+            if len(keys) > MAX_QUERY_MANY_KEYS:
+                raise InvalidParametersError(
+                    f"一次最多查询 {MAX_QUERY_MANY_KEYS} 个客户", {"count": len(keys), "max": MAX_QUERY_MANY_KEYS}
+                )
+
+            # 先查缓存，其余的按 IN (...) 分块只查询要返回的列，同名客户取 id 最小的一个
+            columns = _projection(fields)
+            found: Dict[Any, Dict[str, Any]] = {}
+            for value in keys:
+                cached = customer_cache.get(key, value)
+                if cached is not None:
+                    found[value] = cached
+            pending = [value for value in keys if value not in found]
+            if pending:
+                rows = await _rows_where_in(key, pending, columns)
+                for row in sorted(rows, key=lambda row: row.id, reverse=True):
+                    found[row._mapping[key]] = dict(row._mapping)
+
+            param_name = "customer_id" if key == "id" else "customer_name"
+            return {
+                "customers": [
+                    {param_name: value, "customer": _customer_dict(found[value], columns)}
+                    for value in keys
+                    if value in found
+                ],
+                "missing": [value for value in keys if value not in found],
+            }
+        except InvalidParametersError:
+            # 直接抛出，不需要额外包装
+            raise
         except Exception as e:
-            raise InternalServerError(f"获取工具列表失败: {str(e)}")
+            # 其他未知异常，包装为数据库错误或内部错误
+            if "database" in str(e).lower() or "db" in str(e).lower() or "sql" in str(e).lower():
+                raise DatabaseError(f"查询客户数据库操作失败: {str(e)}")
+            raise InternalServerError(f"查询客户时出错: {str(e)}")
+
+    @staticmethod
+    def list_tools() -> Dict[str, Any]:
+        """获取可用工具列表（启动时生成）"""
+        return _tool_list
+
+
+register_tool("query", MCPService.query_customer, returns=CUSTOMER_RETURNS)
+register_tool("query_by_name", MCPService.query_customer_by_name, returns=CUSTOMER_RETURNS)
+register_tool(
+    "query_many",
+    MCPService.query_many_customers,
+    returns={
+        "type": "object",
+        "properties": {
+            "customers": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "customer_id": {"type": "integer"},
+                        "customer_name": {"type": "string"},
+                        "customer": CUSTOMER_RETURNS["properties"]["customer"],
+                    },
+                },
+            },
+            "missing": {"type": "array"},
+        },
+    },
+)
+register_tool(
+    "list_tools",
+    MCPService.list_tools,
+    returns={
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}, "description": {"type": "string"}},
+        },
+    },
+)
+
+# 服务元数据和工具列表在所有工具注册后生成一次
+_tool_list = {"tools": [{"name": tool.name, "description": tool.schema.description} for tool in get_tools().values()]}
+_service_metadata = ServiceMetadata(
+    name="L2C MCP Service",
+    version="1.0.0",
+    description="L2C 系统的 MCP 服务，提供客户管理和查询功能",
+    tools=[tool.schema for tool in get_tools().values()],
+    capabilities=["customer_query", "customer_management"],
+).model_dump()
@@ -1,23 +1,111 @@
-from typing import Callable, Dict
+"""
+MCP 工具注册表
+
+注册时根据处理函数的签名一次性生成工具模式（ToolSchema）和参数校验器（Pydantic TypeAdapter），
+请求到来时按名称从字典中取出工具，用预编译的校验器校验参数后直接调用处理函数。
+参数的说明通过 Annotated[类型, Field(description=...)] 写在签名上，默认值即参数的默认值。
+"""
+
+import inspect
+import typing
+from dataclasses import dataclass
+from typing import Annotated, Any, Callable, Dict, Optional, Union
+
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
+from pydantic_core import PydanticUndefined
+
+from app.schemas.customer import format_validation_error
+
+from .errors import InvalidParametersError, ToolNotFoundError
+from .protocol import ParameterSchema, ToolSchema
+
+# Python 类型到工具模式中参数类型名称的映射
+_JSON_TYPES = {int: "integer", float: "number", str: "string", bool: "boolean", list: "array", dict: "object"}
+
+
+@dataclass
+class Tool:
+    """已注册的工具：处理函数、工具模式和参数校验器"""
+
+    name: str
+    func: Callable
+    schema: ToolSchema
+    validator: TypeAdapter
+    is_coroutine: bool
+
+    async def call(self, parameters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """校验参数并调用处理函数"""
+        try:
+            validated = self.validator.validate_python(parameters or {})
+        except ValidationError as e:
+            raise InvalidParametersError(f"参数校验失败: {format_validation_error(e)}", {"tool": self.name})
+        result = self.func(**dict(validated))
+        if self.is_coroutine:
+            result = await result
+        return result
 
-from .protocol import ToolSchema
 
 # 工具注册表
-_tools: Dict[str, Callable] = {}
+_tools: Dict[str, Tool] = {}
+
+
+def _json_type(annotation: Any) -> str:
+    """参数类型在工具模式中的名称，Optional[X] 取 X 的类型"""
+    if typing.get_origin(annotation) is Annotated:
+        annotation = typing.get_args(annotation)[0]
+    if typing.get_origin(annotation) is Union:
+        annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+    return _JSON_TYPES.get(typing.get_origin(annotation) or annotation, "object")
+
+
+def _parameter_model(name: str, func: Callable) -> type[BaseModel]:
+    """由处理函数的签名生成参数模型"""
+    hints = typing.get_type_hints(func, include_extras=True)
+    fields = {}
+    for param in inspect.signature(func).parameters.values():
+        # 必填参数用 PydanticUndefined 而不是 ...，后者与 Annotated 中的 Field 一起使用时会被当成默认值
+        default = PydanticUndefined if param.default is inspect.Parameter.empty else param.default
+        fields[param.name] = (hints.get(param.name, Any), default)
+    return create_model(f"{name}_parameters", **fields)
+
+
+def _tool_schema(name: str, func: Callable, model: type[BaseModel], returns: Optional[Dict[str, Any]]) -> ToolSchema:
+    """由参数模型和处理函数的文档字符串生成工具模式"""
+    parameters = {}
+    for param_name, field in model.model_fields.items():
+        default = None if field.is_required() else field.default
+        parameters[param_name] = ParameterSchema(
+            type=_json_type(field.annotation),
+            description=field.description or "",
+            required=field.is_required(),
+            default=list(default) if isinstance(default, tuple) else default,
+        )
+    description = (inspect.getdoc(func) or "").split("\n")[0]
+    return ToolSchema(name=name, description=description, parameters=parameters, returns=returns or {})
 
 
-def register_tool(name: str, func: Callable) -> None:
-    """注册工具"""
-    _tools[name] = func
+def register_tool(name: str, func: Callable, returns: Optional[Dict[str, Any]] = None) -> Tool:
+    """注册工具，生成工具模式并编译参数校验器"""
+    model = _parameter_model(name, func)
+    tool = Tool(
+        name=name,
+        func=func,
+        schema=_tool_schema(name, func, model, returns),
+        validator=TypeAdapter(model),
+        is_coroutine=inspect.iscoroutinefunction(func),
+    )
+    _tools[name] = tool
+    return tool
 
 
-def get_tools() -> Dict[str, Callable]:
+def get_tools() -> Dict[str, Tool]:
     """获取所有工具"""
     return _tools
 
 
-def get_tool_schema(name: str, tool: Callable) -> ToolSchema:
-    """获取工具模式"""
-    # 这里需要根据实际工具的参数和返回值生成模式
-    # 简化版本，实际使用时需要根据工具的具体实现来完善
-    return ToolSchema(name=name, description=tool.__doc__ or "", parameters={}, returns={})
+def get_tool(name: str) -> Tool:
+    """按名称获取工具，不存在时抛出 ToolNotFoundError"""
+    tool = _tools.get(name)
+    if tool is None:
+        raise ToolNotFoundError(name)
+    return tool
@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
 from app.config.options import CustomerSize
 
@@ -11,22 +11,69 @@ class CustomerBase(BaseModel):
     industry: str
     cargo_type: str
     size: CustomerSize
+    external_id: Optional[str] = None
 
 
 class CustomerCreate(CustomerBase):
     pass
 
 
+class CustomerUpsert(CustomerBase):
+    """按 external_id 同步的客户数据"""
+
+    external_id: str
+
+
 class CustomerUpdate(BaseModel):
     name: Optional[str] = None
     city: Optional[str] = None
     industry: Optional[str] = None
     cargo_type: Optional[str] = None
     size: Optional[CustomerSize] = None
+    external_id: Optional[str] = None
 
 
 class CustomerSchema(CustomerBase):
     id: int
+    version: int
 
     class Config:
         from_attributes = True
+
+
+class CustomerFilter(BaseModel):
+    """客户列表的服务端过滤条件"""
+
+    city: Optional[str] = None
+    industry: Optional[str] = None
+    cargo_type: Optional[str] = None
+    size: Optional[CustomerSize] = None
+
+
+class BulkRowResult(BaseModel):
+    """批量操作中单行的处理结果，index 为该行在请求中的位置"""
+
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkCreateResult(BaseModel):
+    """批量创建的汇总结果"""
+
+    created: int
+    failed: int
+    results: List[BulkRowResult]
+
+
+class BulkUpsertResult(BaseModel):
+    """批量同步的汇总结果"""
+
+    upserted: int
+    failed: int
+    results: List[BulkRowResult]
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """把校验错误压缩成一行文本，用于批量操作的逐行结果"""
+    return "; ".join(f"{'.'.join(str(loc) for loc in e['loc']) or 'body'}: {e['msg']}" for e in error.errors())
@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.customer import BulkRowResult
+
+
+class ImportJobSchema(BaseModel):
+    id: int
+    filename: Optional[str] = None
+    status: str
+    chunk_size: int
+    rows_processed: int
+    rows_created: int
+    rows_failed: int
+    chunks_committed: int
+    rows_per_second: Optional[float] = None
+    errors: List[BulkRowResult] = []
+    error_message: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
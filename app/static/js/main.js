@@ -8,11 +8,15 @@ function editCustomer(id) {
     const modal = document.getElementById('addCustomerModal');
     const form = document.getElementById('customerForm');
 
+    // 记下加载时的 ETag，保存时通过 If-Match 检测其间是否有人修改过该客户
+    let etag = null;
+
     fetch(`/api/customers/${id}`)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Failed to load customer data');
             }
+            etag = response.headers.get('ETag');
             return response.json();
         })
         .then(customer => {
@@ -35,14 +39,22 @@ function editCustomer(id) {
             size: document.getElementById('size').value
         };
 
+                const headers = {
+                    'Content-Type': 'application/json',
+                };
+                if (etag) {
+                    headers['If-Match'] = etag;
+                }
+
                 fetch(`/api/customers/${id}`, {
                     method: 'PUT',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
+                headers: headers,
                 body: JSON.stringify(formData)
                 })
                 .then(response => {
+                    if (response.status === 412) {
+                        throw new Error('This customer was modified by someone else, please reload and try again');
+                    }
                     if (!response.ok) {
                         throw new Error('Failed to update customer');
                     }
@@ -84,14 +96,24 @@ function deleteCustomer(id) {
     }
 }
 
+// 列表接口按游标分页，沿 X-Next-Cursor 响应头取完所有页
+async function fetchAllCustomers() {
+    const customers = [];
+    let cursor = null;
+    do {
+        const url = cursor ? `/api/customers/?cursor=${encodeURIComponent(cursor)}` : '/api/customers/';
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error('Failed to load customers');
+        }
+        customers.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return customers;
+}
+
 function loadCustomers() {
-    fetch('/api/customers/')
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Failed to load customers');
-            }
-            return response.json();
-        })
+    fetchAllCustomers()
         .then(customers => {
             const tableBody = document.getElementById('customerTableBody');
             tableBody.innerHTML = '';
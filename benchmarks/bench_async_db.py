@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+对比同步会话与异步会话在混合负载下的并发表现
+使用方法: python benchmarks/bench_async_db.py [--rows 10000] [--fast 200] [--slow 4]
+
+慢查询（递归 CTE 计数）与大量按 id 的点查并发执行：
+- sync: 在协程中直接调用同步 Session，与改造前的请求处理方式相同，慢查询会阻塞事件循环
+- async: 使用 aiosqlite 的 AsyncSession，查询在驱动线程中执行，事件循环可继续处理其它请求
+输出总耗时和点查延迟的 p50/p95（从计划到达时刻算起）。
+慢查询是 CPU 密集型的，单核机器上它与点查争用同一个核，异步带来的收益会明显变小。
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert, select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.config.options import CustomerSize  # noqa: E402
+from app.db.models import Base, Customer  # noqa: E402
+
+SLOW_QUERY = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < :n) SELECT count(*) FROM c")
+
+
+def seed(path: str, rows: int) -> None:
+    """创建并填充测试库"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Customer.__table__),
+            [
+                {"name": f"C{i}", "city": "City", "industry": "Ind", "cargo_type": "Cargo", "size": CustomerSize.SMALL}
+                for i in range(rows)
+            ],
+        )
+    engine.dispose()
+
+
+async def run_sync(path: str, rows: int, fast: int, slow: int, slow_n: int):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Session = sessionmaker(bind=engine)
+
+    async def point_lookup():
+        with Session() as db:
+            db.get(Customer, random.randint(1, rows))
+
+    async def slow_query():
+        with Session() as db:
+            db.execute(SLOW_QUERY, {"n": slow_n}).scalar()
+
+    try:
+        return await _mixed_load(point_lookup, slow_query, fast, slow)
+    finally:
+        engine.dispose()
+
+
+async def run_async(path: str, rows: int, fast: int, slow: int, slow_n: int):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine)
+
+    async def point_lookup():
+        async with Session() as db:
+            await db.get(Customer, random.randint(1, rows))
+
+    async def slow_query():
+        async with Session() as db:
+            (await db.execute(SLOW_QUERY, {"n": slow_n})).scalar()
+
+    try:
+        # 预热连接池，避免把建连时间算进点查延迟
+        async with Session() as db:
+            await db.execute(select(1))
+        return await _mixed_load(point_lookup, slow_query, fast, slow)
+    finally:
+        await engine.dispose()
+
+
+async def _mixed_load(point_lookup, slow_query, fast: int, slow: int):
+    started = time.perf_counter()
+
+    async def lookup_at(arrival: float):
+        # 点查在慢查询开始后陆续到达，模拟持续的请求流；延迟从计划到达时刻算起
+        await asyncio.sleep(max(arrival - time.perf_counter(), 0))
+        await point_lookup()
+        return time.perf_counter() - arrival
+
+    lookups = [asyncio.create_task(lookup_at(started + i * 0.002)) for i in range(fast)]
+    slow_tasks = [asyncio.create_task(slow_query()) for _ in range(slow)]
+    latencies = await asyncio.gather(*lookups)
+    await asyncio.gather(*slow_tasks)
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def report(name: str, elapsed: float, latencies) -> None:
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:>5}: total {elapsed * 1000:8.1f} ms | point lookup p50 {statistics.median(latencies) * 1000:7.2f} ms"
+        f" | p95 {p95 * 1000:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步/异步数据库会话混合负载对比")
+    parser.add_argument("--rows", type=int, default=10000, help="客户表行数")
+    parser.add_argument("--fast", type=int, default=200, help="点查请求数")
+    parser.add_argument("--slow", type=int, default=4, help="慢查询请求数")
+    parser.add_argument("--slow-n", type=int, default=2_000_000, help="慢查询的递归深度")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path, args.rows)
+        report("sync", *asyncio.run(run_sync(path, args.rows, args.fast, args.slow, args.slow_n)))
+        report("async", *asyncio.run(run_async(path, args.rows, args.fast, args.slow, args.slow_n)))
+
+
+if __name__ == "__main__":
+    main()
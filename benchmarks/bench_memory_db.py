@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+对比文件库（WAL）与内存优先模式（memdb + 快照）的读写延迟
+使用方法: python benchmarks/bench_memory_db.py [--rows 10000] [--reads 2000] [--writes 500]
+
+两种模式都使用应用自己的 create_async_engines（单连接写引擎 + 只读连接池 + SQLITE_PROFILE）：
+- file: 临时目录中的文件库
+- memory: memdb VFS 内存库，结束时用 backup API 写一次快照，并报告快照耗时
+读为按 id 的点查，写为单行插入并提交，逐个顺序执行，输出 p50/p95/p99 延迟。
+session 一行经过 AsyncSession + aiosqlite，是接口实际走的路径；raw 一行直接用 sqlite3，只包含存储本身的开销。
+经过会话时每次操作约 1ms 花在 ORM 和驱动线程切换上，两种存储的差距主要体现在 raw 一行。
+文件库在 balanced 配置档下 synchronous=NORMAL，提交不等待落盘，写入差距主要来自 WAL 写入和检查点。
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert, make_url  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+
+from app.config.options import CustomerSize  # noqa: E402
+from app.db.database import SQLITE_PROFILE, create_async_engines, create_schema  # noqa: E402
+from app.db.models import Customer  # noqa: E402
+from app.db.pragmas import apply_pragmas, get_sqlite_profile, install_sqlite_profile  # noqa: E402
+from app.db.snapshot import MemorySnapshot  # noqa: E402
+
+
+def seed(url: str, rows: int) -> None:
+    """创建并填充测试库"""
+    engine = create_engine(url)
+    install_sqlite_profile(engine, SQLITE_PROFILE)
+    create_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Customer.__table__),
+            [
+                {"name": f"C{i}", "city": "City", "industry": "Ind", "cargo_type": "Cargo", "size": CustomerSize.SMALL}
+                for i in range(rows)
+            ],
+        )
+    engine.dispose()
+
+
+async def measure(url: str, rows: int, reads: int, writes: int):
+    writer, reader = create_async_engines(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    WriteSession = async_sessionmaker(writer, expire_on_commit=False)
+    ReadSession = async_sessionmaker(reader, expire_on_commit=False)
+    read_latencies: List[float] = []
+    write_latencies: List[float] = []
+    try:
+        # 预热连接
+        async with ReadSession() as db:
+            await db.get(Customer, 1)
+        for _ in range(reads):
+            started = time.perf_counter()
+            async with ReadSession() as db:
+                await db.get(Customer, random.randint(1, rows))
+            read_latencies.append(time.perf_counter() - started)
+        for i in range(writes):
+            started = time.perf_counter()
+            async with WriteSession() as db:
+                db.add(Customer(name=f"W{i}", city="City", industry="Ind", cargo_type="Cargo", size=CustomerSize.SMALL))
+                await db.commit()
+            write_latencies.append(time.perf_counter() - started)
+    finally:
+        await writer.dispose()
+        await reader.dispose()
+    return sorted(read_latencies), sorted(write_latencies)
+
+
+def measure_raw(url: str, rows: int, reads: int, writes: int):
+    """直接用 sqlite3 执行同样的点查和单行写入"""
+    parsed = make_url(url)
+    # URL 中除 uri 外的查询参数（如 vfs=memdb）属于 SQLite URI 本身
+    query = urlencode({key: value for key, value in parsed.query.items() if key != "uri"})
+    conn = sqlite3.connect(f"{parsed.database}?{query}" if query else parsed.database, uri=True, isolation_level=None)
+    apply_pragmas(conn, get_sqlite_profile(SQLITE_PROFILE))
+    read_latencies: List[float] = []
+    write_latencies: List[float] = []
+    try:
+        for _ in range(reads):
+            started = time.perf_counter()
+            conn.execute("SELECT * FROM customers WHERE id = ?", (random.randint(1, rows),)).fetchone()
+            read_latencies.append(time.perf_counter() - started)
+        for i in range(writes):
+            started = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO customers (name, city, size) VALUES (?, 'City', 'SMALL')", (f"R{i}",))
+            conn.execute("COMMIT")
+            write_latencies.append(time.perf_counter() - started)
+    finally:
+        conn.close()
+    return sorted(read_latencies), sorted(write_latencies)
+
+
+def percentile(latencies: List[float], p: float) -> float:
+    return latencies[max(int(len(latencies) * p) - 1, 0)] * 1000
+
+
+def report(name: str, kind: str, latencies: List[float]) -> None:
+    print(
+        f"{name:>14} {kind:>5}: p50 {statistics.median(latencies) * 1000:7.3f} ms"
+        f" | p95 {percentile(latencies, 0.95):7.3f} ms | p99 {percentile(latencies, 0.99):7.3f} ms"
+    )
+
+
+def bench(name: str, url: str, args) -> None:
+    """填充数据后分别经过会话和直接用 sqlite3 测量读写延迟"""
+    seed(url, args.rows)
+    reads, writes = asyncio.run(measure(url, args.rows, args.reads, args.writes))
+    report(f"{name} session", "read", reads)
+    report(f"{name} session", "write", writes)
+    reads, writes = measure_raw(url, args.rows, args.reads, args.writes)
+    report(f"{name} raw", "read", reads)
+    report(f"{name} raw", "write", writes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文件库与内存优先模式的读写延迟对比")
+    parser.add_argument("--rows", type=int, default=10000, help="客户表行数")
+    parser.add_argument("--reads", type=int, default=2000, help="点查次数")
+    parser.add_argument("--writes", type=int, default=500, help="单行写入次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench("file", f"sqlite:///{os.path.join(tmp, 'bench.db')}", args)
+
+        # 常驻连接让内存库在整个测试期间存活，结束时写一次快照
+        snapshot = MemorySnapshot("file:/bench?vfs=memdb", os.path.join(tmp, "snapshot.db"))
+        snapshot.load()
+        bench("memory", "sqlite:///file:/bench?vfs=memdb&uri=true", args)
+        snapshot.close()
+        size_mb = os.path.getsize(snapshot.path) / 1024 / 1024
+        print(f"snapshot: {snapshot.last_duration_ms:.1f} ms for {size_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
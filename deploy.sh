@@ -31,6 +31,38 @@ echo "Setting up environment variables..."
 cat > .env << EOF
 # 数据库配置
 DATABASE_URL=sqlite:///l2c.db
+# SQLite 性能配置档: default / balanced / durable / fast
+SQLITE_PROFILE=balanced
+# 连接池配置（每个 worker 进程各自一份）
+DB_POOL_CLASS=queue
+DB_POOL_SIZE=5
+DB_MAX_OVERFLOW=10
+DB_POOL_TIMEOUT=30
+DB_POOL_RECYCLE=3600
+DB_POOL_PRE_PING=False
+# 内存优先模式：DATABASE_URL 作为快照文件，每 DB_SNAPSHOT_INTERVAL 秒写回一次；开启时需改为单 worker
+DB_IN_MEMORY=False
+DB_SNAPSHOT_INTERVAL=60
+# CSV 导入：上传文件目录；运行中的任务超过多少秒没有进度视为已中断，可以续传
+IMPORT_DIR=./imports
+IMPORT_JOB_LEASE_SECONDS=60
+# 合并提交：单条增删改最多等待的毫秒数和每批最大写操作数
+DB_GROUP_COMMIT_DELAY_MS=2
+DB_GROUP_COMMIT_MAX_BATCH=64
+# 客户读缓存：最多缓存的条目数、字节数和过期秒数，条目数为 0 时关闭
+CUSTOMER_CACHE_MAX_ENTRIES=10000
+CUSTOMER_CACHE_MAX_BYTES=16777216
+CUSTOMER_CACHE_TTL=30
+# 多 worker 时各进程的缓存每隔多少秒检查一次其他进程的写入
+CUSTOMER_CACHE_SYNC_INTERVAL=0.5
+# 分片存储：大于 1 时客户数据按 id 分散到多个库文件
+DB_SHARDS=1
+DB_SHARD_URL=sqlite:///l2c-shard{shard}.db
+# 多租户：请求头 X-Tenant-ID 选择租户库，打开的租户库数量有上限，空闲超时后关闭
+TENANT_DB_URL=sqlite:///tenants/{tenant}.db
+TENANT_ENGINE_CAPACITY=64
+TENANT_ENGINE_IDLE_SECONDS=300
+TENANT_READ_POOL_SIZE=2
 # 其他环境变量
 DEBUG=False
 ENVIRONMENT=production
@@ -1,14 +1,20 @@
 import logging
 import os
 import sys
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-
-from app.api import customers
-from app.db.database import init_db
+from fastapi.responses import HTMLResponse, JSONResponse
+from jinja2 import Environment, FileSystemLoader
+
+from app.api import customers, imports, metrics
+from app.api.assets import AssetPipeline, FingerprintedStaticFiles
+from app.api.pages import RenderedPage
+from app.config import settings
+from app.db.coherence import start_cache_watcher_task
+from app.db.database import dispose_engines, init_db, start_snapshot_task
+from app.db.sharding import dispose_shards, init_shards
+from app.db.tenants import TENANT_HEADER, InvalidTenantError, current_tenant, validate_tenant
 from app.mcp.router import router as mcp_router
 
 # 配置日志
@@ -35,44 +41,76 @@ logger.info("Logger initialized")
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 logger.info(f"Base directory: {BASE_DIR}")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动定期快照（内存优先模式）和缓存一致性检查，关闭时释放数据库连接"""
+    background_tasks = [task for task in (start_snapshot_task(), start_cache_watcher_task()) if task is not None]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await dispose_engines()
+    await dispose_shards()
+
+
 # 创建 FastAPI 应用
-app = FastAPI(title="L2C API")
+app = FastAPI(title="L2C API", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def bind_tenant(request: Request, call_next):
+    """把请求头中的租户绑定到当前请求上下文，数据库会话据此选择租户库"""
+    tenant = request.headers.get(TENANT_HEADER)
+    if tenant is None:
+        return await call_next(request)
+    try:
+        token = current_tenant.set(validate_tenant(tenant))
+    except InvalidTenantError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    try:
+        return await call_next(request)
+    finally:
+        current_tenant.reset(token)
+
 
 # 设置模板和静态文件目录
 TEMPLATE_DIR = os.path.join(BASE_DIR, "app", "templates")
 STATIC_DIR = os.path.join(BASE_DIR, "app", "static")
+# 带摘要文件名的静态资源及其压缩版本的构建目录
+STATIC_BUILD_DIR = os.path.join(BASE_DIR, "build", "static")
 
 logger.info(f"Template directory: {TEMPLATE_DIR}")
 logger.info(f"Static directory: {STATIC_DIR}")
 
-# 挂载静态文件
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+# 构建并挂载静态文件，开发模式下不生成带摘要的文件
+assets = AssetPipeline(STATIC_DIR, STATIC_BUILD_DIR, enabled=not settings.DEBUG)
+assets.build()
+app.mount("/static", FingerprintedStaticFiles(directory=STATIC_DIR, pipeline=assets), name="static")
 
-# 配置模板
-templates = Jinja2Templates(directory=TEMPLATE_DIR)
+# 页面模板不使用请求数据，启动时渲染一次；开发模式下模板修改后重新渲染
+templates = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=True, auto_reload=settings.DEBUG)
+templates.globals["static_url"] = assets.url
+info_html = RenderedPage(templates, "info.html", auto_reload=settings.DEBUG)
+index_html = RenderedPage(templates, "index.html", auto_reload=settings.DEBUG)
 
 # 初始化数据库
 init_db()
+init_shards()
 
 # 包含路由器
 app.include_router(customers.router, prefix="/api/customers", tags=["customers"])
+app.include_router(imports.router, prefix="/api/imports", tags=["imports"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
 app.include_router(mcp_router)
 
 
 @app.get("/info", response_class=HTMLResponse)
 async def info_page(request: Request):
     """信息页面，包含项目介绍和API文档"""
-    return templates.TemplateResponse("info.html", {"request": request})
+    return info_html.response(request)
 
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """客户管理页面作为主页"""
-    try:
-        logger.info("Attempting to render index.html")
-        logger.info(f"Template directory during render: {TEMPLATE_DIR}")
-        return templates.TemplateResponse("index.html", {"request": request})
-    except Exception as e:
-        logger.error(f"Error rendering customer management page: {str(e)}")
-        logger.exception("Full traceback:")
-        return "Error loading customer management page"
+    return index_html.response(request)
@@ -1,4 +1,5 @@
 # Standard library imports
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -17,24 +18,30 @@ from app.config.options import CustomerSize  # noqa: E402
 
 # 以下导入必须在设置环境变量和Python路径之后
 # 这是一个有效的例外，因为这些模块依赖于上面的配置
-from app.db.database import SessionLocal, engine, set_test_db  # noqa: E402
+from app.db.cache import customer_cache  # noqa: E402
+from app.db.database import SessionLocal, dispose_engines, engine  # noqa: E402
 from app.db.models import Base, Customer  # noqa: E402
 
 # 创建表结构
 Base.metadata.create_all(bind=engine)
 
-# 创建测试会话
+# 创建测试会话（应用通过异步引擎连接同一个共享缓存内存库，测试会话用于准备和校验数据）
 test_session = SessionLocal()
 
-# 设置测试数据库会话
-set_test_db(test_session)
-
 from fastapi.testclient import TestClient  # noqa: E402
 
 # 导入 FastAPI 应用 (必须在设置测试数据库后)
 from main import app  # noqa: E402
 
 
+@pytest.fixture(scope="session", autouse=True)
+def dispose_db_engines():
+    """测试结束后释放连接，aiosqlite 的连接线程不释放会阻止进程退出"""
+    yield
+    test_session.close()
+    asyncio.run(dispose_engines())
+
+
 # 每个测试开始前清空所有表
 @pytest.fixture(autouse=True)
 def clean_db():
@@ -44,15 +51,18 @@ def clean_db():
 
     # 删除所有表中的数据
     test_session.execute(text("DELETE FROM customers"))
+    test_session.execute(text("DELETE FROM import_jobs"))
 
     # 尝试重置自增ID (如果存在)
     try:
-        test_session.execute(text("DELETE FROM sqlite_sequence WHERE name='customers'"))
+        test_session.execute(text("DELETE FROM sqlite_sequence WHERE name IN ('customers', 'import_jobs')"))
     except Exception:
         pass
 
     # 提交删除操作
     test_session.commit()
+    # 测试直接改写数据库，不经过接口的缓存失效
+    customer_cache.clear()
     yield
     # 测试结束回滚
     test_session.rollback()
@@ -0,0 +1,126 @@
+from sqlalchemy import text
+
+from app.db.cache import customer_cache
+
+
+def _create(client, name="条件请求"):
+    customer = {"name": name, "city": "上海", "industry": "物流", "cargo_type": "普货", "size": "SMALL"}
+    return client.post("/api/customers/", json=customer).json()
+
+
+class TestCustomerETag:
+    """测试客户详情和列表的 ETag 与 If-None-Match"""
+
+    def test_get_customer_with_current_etag_should_return_304(self, client):
+        """测试带当前 ETag 的条件请求返回 304，客户更新后返回新数据"""
+        customer = _create(client)
+        assert customer["version"] == 1
+        response = client.get(f"/api/customers/{customer['id']}")
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"] == "no-cache"
+
+        response = client.get(f"/api/customers/{customer['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        client.put(f"/api/customers/{customer['id']}", json={"city": "北京"})
+        response = client.get(f"/api/customers/{customer['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["version"] == 2
+        assert response.headers["ETag"] != etag
+
+    def test_etag_responses_should_vary_by_tenant(self, client):
+        """测试带 ETag 的响应和 304 都带 Vary: X-Tenant-ID，共享缓存不会把一个租户的数据返回给另一个租户"""
+        customer = _create(client)
+        for url in (f"/api/customers/{customer['id']}", "/api/customers/"):
+            response = client.get(url)
+            assert response.headers["Vary"] == "X-Tenant-ID"
+            response = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+            assert response.status_code == 304
+            assert response.headers["Vary"] == "X-Tenant-ID"
+        response = client.put(f"/api/customers/{customer['id']}", json={"city": "北京"})
+        assert response.headers["Vary"] == "X-Tenant-ID"
+
+    def test_list_customers_etag_should_change_when_page_changes(self, client):
+        """测试列表页未变化时返回 304，页内客户变化后 ETag 改变"""
+        customer = _create(client)
+        etag = client.get("/api/customers/").headers["ETag"]
+        assert client.get("/api/customers/", headers={"If-None-Match": etag}).status_code == 304
+
+        client.put(f"/api/customers/{customer['id']}", json={"name": "改名"})
+        response = client.get("/api/customers/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()[0]["name"] == "改名"
+
+    def test_upsert_should_bump_version_only_for_changed_rows(self, client):
+        """测试按 external_id 同步时只有内容变化的行版本号加 1"""
+        rows = [
+            {"name": f"同步{i}", "city": "上海", "industry": "物流", "cargo_type": "普货", "size": "SMALL"}
+            for i in range(2)
+        ]
+        for i, row in enumerate(rows):
+            row["external_id"] = f"crm-{i}"
+        client.post("/api/customers/upsert", json=rows)
+        rows[0]["city"] = "北京"
+        ids = [result["id"] for result in client.post("/api/customers/upsert", json=rows).json()["results"]]
+        versions = [client.get(f"/api/customers/{customer_id}").json()["version"] for customer_id in ids]
+        assert versions == [2, 1]
+
+
+class TestCustomerIfMatch:
+    """测试更新和删除的 If-Match 乐观并发控制"""
+
+    def test_update_with_stale_etag_should_return_412(self, client):
+        """测试用过期的 ETag 更新返回 412，数据不变"""
+        customer = _create(client)
+        etag = client.get(f"/api/customers/{customer['id']}").headers["ETag"]
+
+        response = client.put(f"/api/customers/{customer['id']}", json={"city": "北京"}, headers={"If-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+        response = client.put(f"/api/customers/{customer['id']}", json={"city": "广州"}, headers={"If-Match": etag})
+        assert response.status_code == 412
+        assert client.get(f"/api/customers/{customer['id']}").json()["city"] == "北京"
+
+    def test_delete_with_stale_etag_should_return_412(self, client):
+        """测试用过期的 ETag 删除返回 412，用当前 ETag 删除成功"""
+        customer = _create(client)
+        stale = client.get(f"/api/customers/{customer['id']}").headers["ETag"]
+        current = client.put(f"/api/customers/{customer['id']}", json={"city": "北京"}).headers["ETag"]
+
+        response = client.delete(f"/api/customers/{customer['id']}", headers={"If-Match": stale})
+        assert response.status_code == 412
+        response = client.delete(f"/api/customers/{customer['id']}", headers={"If-Match": current})
+        assert response.status_code == 200
+
+    def test_if_match_on_missing_customer_should_return_404(self, client):
+        """测试客户不存在时即使带 If-Match 也返回 404"""
+        response = client.put("/api/customers/99999", json={"city": "北京"}, headers={"If-Match": '"v1"'})
+        assert response.status_code == 404
+
+    def test_recreated_customer_should_not_match_etag_of_deleted_one(self, client):
+        """测试删除 id 最大的客户后新建的客户复用了它的 id，旧 ETag 不命中 304 也不能用于 If-Match"""
+        first = _create(client, "先前的客户")
+        etag = client.get(f"/api/customers/{first['id']}").headers["ETag"]
+        client.delete(f"/api/customers/{first['id']}")
+        second = _create(client, "新客户")
+        assert second["id"] == first["id"]
+
+        response = client.get(f"/api/customers/{second['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["name"] == "新客户"
+        response = client.put(f"/api/customers/{second['id']}", json={"city": "北京"}, headers={"If-Match": etag})
+        assert response.status_code == 412
+        assert client.delete(f"/api/customers/{second['id']}", headers={"If-Match": etag}).status_code == 412
+
+    def test_legacy_etag_without_row_token_should_still_match(self, client, db_session):
+        """测试早于行标识的客户（行标识为空串）ETag 仍为 "v<版本号>"，可用于 If-Match"""
+        customer = _create(client)
+        db_session.execute(text("UPDATE customers SET row_token = '' WHERE id = :id"), {"id": customer["id"]})
+        db_session.commit()
+        customer_cache.clear()
+        assert client.get(f"/api/customers/{customer['id']}").headers["ETag"] == '"v1"'
+        response = client.put(f"/api/customers/{customer['id']}", json={"city": "北京"}, headers={"If-Match": '"v1"'})
+        assert response.status_code == 200
+        assert response.headers["ETag"] == '"v2"'
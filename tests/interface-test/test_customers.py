@@ -1,3 +1,6 @@
+import csv
+import io
+import json
 import sys
 from pathlib import Path
 
@@ -32,6 +35,12 @@ class TestSizeOptions:
             assert "label" in option, "选项应包含 label 字段"
             assert option["value"] in CustomerSize.__members__, f"选项值 {option['value']} 应在枚举定义中"
 
+    def test_get_size_options_should_return_304_when_etag_matches(self, client):
+        """测试带上次的 ETag 重新请求规模选项时返回 304"""
+        etag = client.get("/api/customers/size-options/").headers["ETag"]
+        response = client.get("/api/customers/size-options/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
 
 class TestCustomerCreate:
     """测试创建客户相关的接口"""
@@ -87,6 +96,132 @@ class TestCustomerCreate:
         response = client.post("/api/customers/", json=customer_data)
         assert response.status_code == 422, "缺少必填字段应返回 422 错误"
 
+    def test_create_customer_with_existing_external_id_should_return_409(self, client):
+        """测试使用已存在的 external_id 创建客户应返回 409"""
+        customer = {"name": "甲", "city": "上海", "industry": "物流", "cargo_type": "普货", "size": "SMALL"}
+        assert client.post("/api/customers/", json={**customer, "external_id": "crm-1"}).status_code == 200
+        response = client.post("/api/customers/", json={**customer, "external_id": "crm-1"})
+        assert response.status_code == 409
+
+    def test_update_customer_to_existing_external_id_should_return_409(self, client):
+        """测试把客户的 external_id 改成其它客户已使用的值应返回 409"""
+        customer = {"name": "甲", "city": "上海", "industry": "物流", "cargo_type": "普货", "size": "SMALL"}
+        client.post("/api/customers/", json={**customer, "external_id": "crm-1"})
+        customer_id = client.post("/api/customers/", json={**customer, "external_id": "crm-2"}).json()["id"]
+        response = client.put(f"/api/customers/{customer_id}", json={"external_id": "crm-1"})
+        assert response.status_code == 409
+
+
+class TestCustomerBulkCreate:
+    """测试批量创建客户相关的接口"""
+
+    @staticmethod
+    def _payload(count, start=0):
+        return [
+            {"name": f"C{i}", "city": "City", "industry": "Ind", "cargo_type": "Cargo", "size": "SMALL"}
+            for i in range(start, start + count)
+        ]
+
+    def test_bulk_create_with_valid_rows_should_create_all(self, client, db_session):
+        """测试批量创建有效数据应全部写入并按顺序返回 id"""
+        response = client.post("/api/customers/bulk", params={"batch_size": 2}, json=self._payload(5))
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 5
+        assert data["failed"] == 0
+        assert [r["index"] for r in data["results"]] == list(range(5))
+        ids = [r["id"] for r in data["results"]]
+        names = {c.id: c.name for c in db_session.query(Customer).all()}
+        assert [names[i] for i in ids] == [f"C{i}" for i in range(5)]
+
+    def test_bulk_create_with_invalid_rows_should_report_per_row_errors(self, client, db_session):
+        """测试批量创建含无效行时应只跳过无效行并逐行报告错误"""
+        payload = self._payload(3)
+        payload[1]["size"] = "HUGE"
+        del payload[2]["city"]
+        response = client.post("/api/customers/bulk", json=payload)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 1
+        assert data["failed"] == 2
+        assert data["results"][0]["id"] is not None
+        assert "size" in data["results"][1]["error"]
+        assert "city" in data["results"][2]["error"]
+        assert db_session.query(Customer).count() == 1
+
+    def test_bulk_create_with_ndjson_body_should_create_all(self, client, db_session):
+        """测试使用 NDJSON 请求体批量创建应全部写入，坏行单独报错"""
+        lines = [json.dumps(row) for row in self._payload(2)] + ["{not json"]
+        response = client.post(
+            "/api/customers/bulk",
+            content="\n".join(lines),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 2
+        assert data["results"][2]["error"].startswith("Invalid JSON")
+
+    def test_bulk_create_with_non_array_body_should_fail(self, client):
+        """测试请求体不是 JSON 数组时应返回 400"""
+        response = client.post("/api/customers/bulk", json=self._payload(1)[0])
+        assert response.status_code == 400
+
+    def test_bulk_create_with_empty_array_should_create_nothing(self, client):
+        """测试空数组批量创建应返回零条结果"""
+        response = client.post("/api/customers/bulk", json=[])
+        assert response.status_code == 200
+        assert response.json() == {"created": 0, "failed": 0, "results": []}
+
+
+class TestCustomerUpsert:
+    """测试按 external_id 批量同步客户相关的接口"""
+
+    @staticmethod
+    def _row(external_id, city="City"):
+        return {
+            "external_id": external_id,
+            "name": f"Customer {external_id}",
+            "city": city,
+            "industry": "Ind",
+            "cargo_type": "Cargo",
+            "size": "SMALL",
+        }
+
+    def test_upsert_new_rows_should_create_customers(self, client, db_session):
+        """测试同步不存在的 external_id 应新建客户"""
+        response = client.post("/api/customers/upsert", json=[self._row("crm-1"), self._row("crm-2")])
+        assert response.status_code == 200
+        data = response.json()
+        assert data["upserted"] == 2
+        assert db_session.query(Customer).filter(Customer.external_id == "crm-2").one().name == "Customer crm-2"
+
+    def test_upsert_existing_rows_should_update_in_place(self, client, db_session):
+        """测试同步已存在的 external_id 应原地更新且 id 不变"""
+        first = client.post("/api/customers/upsert", json=[self._row("crm-1")]).json()
+        second = client.post("/api/customers/upsert", json=[self._row("crm-1", city="Shanghai")]).json()
+        assert second["results"][0]["id"] == first["results"][0]["id"]
+        db_session.expire_all()
+        customers = db_session.query(Customer).all()
+        assert len(customers) == 1
+        assert customers[0].city == "Shanghai"
+
+    def test_upsert_same_batch_twice_should_be_idempotent(self, client, db_session):
+        """测试重复推送同一批数据应返回相同 id 且不产生重复客户"""
+        payload = [self._row("crm-1"), self._row("crm-2")]
+        first = client.post("/api/customers/upsert", json=payload).json()
+        second = client.post("/api/customers/upsert", json=payload).json()
+        assert [r["id"] for r in second["results"]] == [r["id"] for r in first["results"]]
+        assert db_session.query(Customer).count() == 2
+
+    def test_upsert_row_without_external_id_should_fail_that_row(self, client):
+        """测试缺少 external_id 的行应单独报错"""
+        row = self._row("crm-1")
+        del row["external_id"]
+        data = client.post("/api/customers/upsert", json=[row, self._row("crm-2")]).json()
+        assert data["upserted"] == 1
+        assert "external_id" in data["results"][0]["error"]
+
 
 class TestCustomerList:
     """测试获取客户列表相关的接口"""
@@ -219,6 +354,17 @@ class TestCustomerUpdate:
         assert data["cargo_type"] == "Updated Cargo"
         assert data["size"] == "MEDIUM"
 
+    def test_get_after_update_should_not_return_cached_customer(self, client, db_session):
+        """测试读取过的客户更新后再读取返回新数据"""
+        customer = Customer(name="缓存前", city="上海", industry="物流", cargo_type="普货", size=CustomerSize.SMALL)
+        db_session.add(customer)
+        db_session.commit()
+        assert client.get(f"/api/customers/{customer.id}").json()["name"] == "缓存前"
+        client.put(f"/api/customers/{customer.id}", json={"name": "缓存后"})
+        response = client.get(f"/api/customers/{customer.id}")
+        assert response.json()["name"] == "缓存后"
+        assert response.headers["ETag"].startswith('"v2.')
+
     def test_update_nonexistent_customer_should_fail(self, client):
         """测试更新不存在的客户信息应该失败"""
         # 发送请求
@@ -265,16 +411,200 @@ class TestCustomerDelete:
         assert data["name"] == customer.name
 
 
+def _add_customers(db_session, rows):
+    """批量写入测试客户，rows 为 (name, city, industry, cargo_type, size) 元组列表"""
+    customers = [
+        Customer(name=name, city=city, industry=industry, cargo_type=cargo_type, size=size)
+        for name, city, industry, cargo_type, size in rows
+    ]
+    db_session.add_all(customers)
+    db_session.commit()
+    return customers
+
+
 class TestCustomerListQuery:
     """测试客户列表的查询参数相关的接口"""
 
-    pass
+    def test_list_customers_with_city_filter_should_return_matching_only(self, client, db_session):
+        """测试按城市过滤客户列表应只返回该城市的客户"""
+        _add_customers(
+            db_session,
+            [
+                ("A", "Shanghai", "Retail", "Box", CustomerSize.SMALL),
+                ("B", "Beijing", "Retail", "Box", CustomerSize.SMALL),
+                ("C", "Shanghai", "Auto", "Bulk", CustomerSize.LARGE),
+            ],
+        )
+        response = client.get("/api/customers/", params={"city": "Shanghai"})
+        assert response.status_code == 200
+        assert [c["name"] for c in response.json()] == ["A", "C"]
+
+    def test_list_customers_with_combined_filters_should_return_intersection(self, client, db_session):
+        """测试组合多个过滤条件应返回同时满足的客户"""
+        _add_customers(
+            db_session,
+            [
+                ("A", "Shanghai", "Retail", "Box", CustomerSize.SMALL),
+                ("B", "Shanghai", "Retail", "Bulk", CustomerSize.LARGE),
+                ("C", "Shanghai", "Auto", "Bulk", CustomerSize.LARGE),
+            ],
+        )
+        response = client.get("/api/customers/", params={"industry": "Retail", "cargo_type": "Bulk", "size": "LARGE"})
+        assert response.status_code == 200
+        assert [c["name"] for c in response.json()] == ["B"]
+
+    def test_list_customers_with_invalid_size_filter_should_fail(self, client):
+        """测试使用无效的规模过滤值应返回 422"""
+        response = client.get("/api/customers/", params={"size": "HUGE"})
+        assert response.status_code == 422
+
+    def test_list_customers_with_limit_should_page_through_all_rows(self, client, db_session):
+        """测试使用 limit 和游标翻页应不重不漏地返回全部客户"""
+        _add_customers(db_session, [(f"C{i}", "City", "Ind", "Cargo", CustomerSize.SMALL) for i in range(5)])
+        names, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/api/customers/", params=params)
+            assert response.status_code == 200
+            names.extend(c["name"] for c in response.json())
+            pages += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert names == [f"C{i}" for i in range(5)]
+        assert pages == 3
+
+    def test_list_customers_last_page_should_not_return_cursor(self, client, db_session):
+        """测试最后一页不应返回下一页游标"""
+        _add_customers(db_session, [("A", "City", "Ind", "Cargo", CustomerSize.SMALL)])
+        response = client.get("/api/customers/", params={"limit": 1})
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_list_customers_with_invalid_cursor_should_fail(self, client):
+        """测试使用无法解析的游标应返回 400"""
+        response = client.get("/api/customers/", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+    def test_list_customers_with_cursor_from_other_sort_should_fail(self, client, db_session):
+        """测试游标与排序方式不一致时应返回 400"""
+        _add_customers(db_session, [(f"C{i}", "City", "Ind", "Cargo", CustomerSize.SMALL) for i in range(2)])
+        cursor = client.get("/api/customers/", params={"limit": 1}).headers["X-Next-Cursor"]
+        response = client.get("/api/customers/", params={"cursor": cursor, "sort": "name"})
+        assert response.status_code == 400
+
+    def test_list_customers_with_limit_over_max_should_fail(self, client):
+        """测试 limit 超过上限应返回 422"""
+        response = client.get("/api/customers/", params={"limit": 100000})
+        assert response.status_code == 422
 
 
 class TestCustomerListSort:
     """测试客户列表的排序相关的接口"""
 
-    pass
+    def test_list_customers_sorted_by_name_should_return_ascending(self, client, db_session):
+        """测试按名称升序排序应返回名称升序的客户"""
+        _add_customers(
+            db_session,
+            [(name, "City", "Ind", "Cargo", CustomerSize.SMALL) for name in ["Charlie", "Alpha", "Bravo"]],
+        )
+        response = client.get("/api/customers/", params={"sort": "name"})
+        assert response.status_code == 200
+        assert [c["name"] for c in response.json()] == ["Alpha", "Bravo", "Charlie"]
+
+    def test_list_customers_sorted_desc_with_duplicates_should_page_without_gaps(self, client, db_session):
+        """测试按城市降序翻页且城市有重复值时应不重不漏"""
+        _add_customers(
+            db_session,
+            [(f"C{i}", city, "Ind", "Cargo", CustomerSize.SMALL) for i, city in enumerate(["B", "A", "B", "C", "A"])],
+        )
+        seen, cursor = [], None
+        while True:
+            params = {"sort": "-city", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/api/customers/", params=params)
+            seen.extend((c["city"], c["id"]) for c in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert seen == sorted(seen, reverse=True)
+        assert len(seen) == 5
+
+    def test_list_customers_sorted_by_size_should_page_with_enum_cursor(self, client, db_session):
+        """测试按规模排序翻页时游标应能正确处理枚举值"""
+        _add_customers(
+            db_session,
+            [
+                (f"C{i}", "City", "Ind", "Cargo", size)
+                for i, size in enumerate([CustomerSize.SMALL, CustomerSize.LARGE])
+            ],
+        )
+        first = client.get("/api/customers/", params={"sort": "size", "limit": 1})
+        second = client.get(
+            "/api/customers/", params={"sort": "size", "limit": 1, "cursor": first.headers["X-Next-Cursor"]}
+        )
+        assert [c["size"] for c in first.json() + second.json()] == ["LARGE", "SMALL"]
+
+    def test_list_customers_with_unknown_sort_field_should_fail(self, client):
+        """测试使用不支持的排序字段应返回 422"""
+        response = client.get("/api/customers/", params={"sort": "password"})
+        assert response.status_code == 422
+
+
+class TestCustomerExport:
+    """测试客户数据导出相关的接口"""
+
+    def test_export_customers_as_ndjson_should_stream_one_object_per_line(self, client, db_session):
+        """测试以 NDJSON 格式导出应每行返回一个客户对象"""
+        _add_customers(
+            db_session,
+            [(f"C{i}", "City", "Ind", "Cargo", CustomerSize.SMALL) for i in range(3)],
+        )
+        response = client.get("/api/customers/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["name"] for row in rows] == ["C0", "C1", "C2"]
+        assert rows[0]["size"] == "SMALL"
+
+    def test_export_customers_as_csv_should_include_header_and_rows(self, client, db_session):
+        """测试以 CSV 格式导出应包含表头和全部数据行"""
+        _add_customers(
+            db_session,
+            [(f"C{i}", "City", "Ind", "Cargo", CustomerSize.LARGE) for i in range(2)],
+        )
+        response = client.get("/api/customers/export", params={"format": "csv"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["name"] for row in rows] == ["C0", "C1"]
+        assert rows[0]["size"] == "LARGE"
+
+    def test_export_customers_with_filter_should_only_include_matching_rows(self, client, db_session):
+        """测试导出时使用过滤条件应只包含匹配的客户"""
+        _add_customers(
+            db_session,
+            [
+                ("A", "Shanghai", "Ind", "Cargo", CustomerSize.SMALL),
+                ("B", "Beijing", "Ind", "Cargo", CustomerSize.SMALL),
+            ],
+        )
+        response = client.get("/api/customers/export", params={"city": "Beijing"})
+        assert [json.loads(line)["name"] for line in response.text.splitlines()] == ["B"]
+
+    def test_export_empty_table_as_csv_should_return_header_only(self, client):
+        """测试空表导出 CSV 应只返回表头"""
+        response = client.get("/api/customers/export", params={"format": "csv"})
+        assert response.status_code == 200
+        assert response.text.strip() == "id,name,city,industry,cargo_type,size,external_id"
+
+    def test_export_customers_with_unknown_format_should_fail(self, client):
+        """测试使用不支持的导出格式应返回 422"""
+        response = client.get("/api/customers/export", params={"format": "xml"})
+        assert response.status_code == 422
 
 
 class TestCustomerDataValidation:
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.models import Customer, ImportJob
+from app.imports import pipeline
+
+CSV_HEADER = "name,city,industry,cargo_type,size\n"
+
+
+def _csv(count, size="SMALL"):
+    return CSV_HEADER + "".join(f"C{i},City,Ind,Cargo,{size}\n" for i in range(count))
+
+
+@pytest.fixture(autouse=True)
+def import_dir(tmp_path, monkeypatch):
+    """导入文件写入临时目录"""
+    monkeypatch.setattr(pipeline, "IMPORT_DIR", str(tmp_path))
+    return tmp_path
+
+
+class TestCustomerImport:
+    """测试 CSV 导入客户相关的接口"""
+
+    def test_import_valid_csv_should_create_all_customers(self, client, db_session):
+        """测试导入有效的 CSV 应创建所有客户并报告吞吐量"""
+        response = client.post("/api/imports/customers", params={"chunk_size": 2}, content=_csv(5))
+        assert response.status_code == 202
+        job = client.get(f"/api/imports/{response.json()['id']}").json()
+        assert job["status"] == "completed"
+        assert job["rows_created"] == 5
+        assert job["chunks_committed"] == 3
+        assert job["rows_per_second"] > 0
+        assert db_session.query(Customer).count() == 5
+
+    def test_import_csv_with_invalid_rows_should_record_row_errors(self, client, db_session):
+        """测试导入含无效行的 CSV 应跳过无效行并记录行号和错误"""
+        content = CSV_HEADER + "A,City,Ind,Cargo,SMALL\nB,City,Ind,Cargo,HUGE\nC,,Ind,Cargo,Extra Large\n"
+        job_id = client.post("/api/imports/customers", content=content).json()["id"]
+        job = client.get(f"/api/imports/{job_id}").json()
+        assert job["status"] == "completed"
+        assert job["rows_created"] == 2
+        assert job["rows_failed"] == 1
+        assert job["errors"][0]["index"] == 1
+        assert "size" in job["errors"][0]["error"]
+        sizes = {c.name: c.size.value for c in db_session.query(Customer).all()}
+        assert sizes == {"A": "SMALL", "C": "EXTRA_LARGE"}
+
+    def test_get_nonexistent_import_job_should_fail(self, client):
+        """测试查询不存在的导入任务应返回 404"""
+        response = client.get("/api/imports/99999")
+        assert response.status_code == 404
+
+
+class TestCustomerImportResume:
+    """测试导入任务续传相关的接口"""
+
+    def test_resume_interrupted_import_should_continue_after_last_committed_chunk(
+        self, client, db_session, monkeypatch
+    ):
+        """测试中断的导入任务续传后应从最后提交的块之后继续且不重复写入"""
+        original_insert = pipeline.insert_customers
+        calls = []
+
+        def failing_insert(db, rows):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError("disk full")
+            return original_insert(db, rows)
+
+        monkeypatch.setattr(pipeline, "insert_customers", failing_insert)
+        job_id = client.post("/api/imports/customers", params={"chunk_size": 2}, content=_csv(5)).json()["id"]
+        job = client.get(f"/api/imports/{job_id}").json()
+        assert job["status"] == "failed"
+        assert job["rows_processed"] == 2
+        assert "disk full" in job["error_message"]
+
+        monkeypatch.setattr(pipeline, "insert_customers", original_insert)
+        response = client.post(f"/api/imports/{job_id}/resume")
+        assert response.status_code == 202
+        job = client.get(f"/api/imports/{job_id}").json()
+        assert job["status"] == "completed"
+        assert job["rows_created"] == 5
+        names = sorted(c.name for c in db_session.query(Customer).all())
+        assert names == [f"C{i}" for i in range(5)]
+
+    def test_resume_completed_import_should_fail(self, client):
+        """测试续传已完成的导入任务应返回 409"""
+        job_id = client.post("/api/imports/customers", content=_csv(1)).json()["id"]
+        response = client.post(f"/api/imports/{job_id}/resume")
+        assert response.status_code == 409
+
+    def test_resume_running_import_should_fail(self, client, db_session):
+        """测试续传仍在运行（租约期内有进度）的导入任务应返回 409"""
+        job = ImportJob(path="missing.csv", status="running", chunk_size=2, errors=[])
+        db_session.add(job)
+        db_session.commit()
+        response = client.post(f"/api/imports/{job.id}/resume")
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Import job is already running"
+
+    def test_resume_stale_running_import_should_continue(self, client, db_session, import_dir):
+        """测试运行中但超过租约没有进度的任务视为已中断，可以续传"""
+        path = import_dir / "stale.csv"
+        path.write_text(_csv(3))
+        stale = datetime.utcnow() - timedelta(hours=1)
+        job = ImportJob(path=str(path), status="running", chunk_size=2, errors=[], updated_at=stale)
+        db_session.add(job)
+        db_session.commit()
+        response = client.post(f"/api/imports/{job.id}/resume")
+        assert response.status_code == 202
+        assert client.get(f"/api/imports/{job.id}").json()["status"] == "completed"
+        assert db_session.query(Customer).count() == 3
+
+    def test_run_import_should_not_start_second_run_of_running_job(self, db_session, import_dir):
+        """测试任务已在运行时再次执行不会重复写入"""
+        path = import_dir / "running.csv"
+        path.write_text(_csv(3))
+        job = ImportJob(path=str(path), status="running", chunk_size=2, errors=[])
+        db_session.add(job)
+        db_session.commit()
+        asyncio.run(pipeline.run_import(job.id))
+        assert db_session.query(Customer).count() == 0
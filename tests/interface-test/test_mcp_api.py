@@ -1,4 +1,8 @@
+from sqlalchemy import event
+
 from app.config.options import CustomerSize
+from app.db.cache import customer_cache
+from app.db.database import read_engine
 from app.db.models import Customer
 from app.mcp.errors import ErrorCode
 
@@ -91,6 +95,36 @@ class TestMCPMetaInformation:
         assert result["error"]["code"] == ErrorCode.TOOL_NOT_FOUND
 
 
+class TestMCPStaticResponses:
+    """测试元数据、工具列表和工具模式接口的 ETag 与 304"""
+
+    def test_metadata_should_return_304_when_etag_matches(self, client):
+        """验证带上次的 ETag 重新请求元数据时返回 304"""
+        response = client.get("/api/mcp/metadata")
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"] == "public, no-cache"
+        revalidated = client.get("/api/mcp/metadata", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["ETag"] == etag
+        assert revalidated.content == b""
+
+    def test_tools_endpoint_should_match_list_tools_tool(self, client):
+        """验证工具列表接口与 list_tools 工具返回相同的列表"""
+        response = client.get("/api/mcp/tools")
+        assert response.status_code == 200
+        result = client.post("/api/mcp", json={"tool": "list_tools", "parameters": {}}).json()
+        assert response.json() == result["data"]
+
+    def test_tool_schemas_should_have_distinct_etags(self, client):
+        """验证不同工具的模式有各自的 ETag，不匹配的 ETag 返回完整内容"""
+        query = client.get("/api/mcp/tools/query")
+        by_name = client.get("/api/mcp/tools/query_by_name")
+        assert query.headers["ETag"] != by_name.headers["ETag"]
+        response = client.get("/api/mcp/tools/query", headers={"If-None-Match": by_name.headers["ETag"]})
+        assert response.status_code == 200
+        assert response.json()["name"] == "query"
+
+
 class TestMCPQueryById:
     """测试按ID查询客户的功能
     这组测试验证客户按ID查询功能的各个方面，包括成功查询、过滤字段、
@@ -228,6 +262,14 @@ class TestMCPQueryByName:
         assert result["data"]["customer"]["industry"] == "Test Industry"
         assert result["request_id"] == "test-name-123"
 
+    def test_query_by_name_after_rename_should_not_return_cached_customer(self, client, test_customer):
+        """验证按名称查询过的客户改名后，旧名称查不到该客户"""
+        request_data = {"tool": "query_by_name", "parameters": {"customer_name": test_customer.name}}
+        assert client.post("/api/mcp", json=request_data).json()["status"] == "success"
+        client.put(f"/api/customers/{test_customer.id}", json={"name": "Renamed Customer"})
+        result = client.post("/api/mcp", json=request_data).json()
+        assert result["status"] == "error"
+
     def test_query_by_name_with_field_filtering_should_return_only_selected_fields(self, client, test_customer):
         """验证按名称查询时使用fields参数可以只返回指定字段"""
         # 使用test_customer夹具创建的客户数据
@@ -309,3 +351,143 @@ class TestMCPErrorHandling:
         assert result["error"]["code"] == ErrorCode.TOOL_NOT_FOUND
         assert "未找到工具" in result["error"]["message"]
         assert result["request_id"] == "test-invalid-tool-123"
+
+
+class TestMCPBatch:
+    """测试一次 HTTP 请求中批量调用多个工具"""
+
+    def test_batch_request_should_return_responses_in_order(self, client, test_customer):
+        """验证批量请求按顺序返回各调用的响应，单个调用失败不影响其它调用"""
+        calls = [
+            {"tool": "query", "parameters": {"customer_id": test_customer.id}, "request_id": "a"},
+            {"tool": "query", "parameters": {"customer_id": 9999}, "request_id": "b"},
+            {"tool": "invalid_tool", "parameters": {}, "request_id": "c"},
+            {"tool": "query_by_name", "parameters": {"customer_name": test_customer.name}, "request_id": "d"},
+            {"parameters": {}, "request_id": "e"},
+        ]
+        response = client.post("/api/mcp", json=calls)
+        assert response.status_code == 200
+        results = response.json()
+        assert [result["request_id"] for result in results] == ["a", "b", "c", "d", "e"]
+        assert [result["status"] for result in results] == ["success", "error", "error", "success", "error"]
+        assert results[0]["data"]["customer"]["name"] == "Test Customer"
+        assert results[1]["error"]["code"] == ErrorCode.CUSTOMER_NOT_FOUND
+        assert results[2]["error"]["code"] == ErrorCode.TOOL_NOT_FOUND
+        assert results[3]["data"]["customer"]["city"] == "Test City"
+        assert results[4]["error"]["code"] == ErrorCode.INVALID_REQUEST
+
+    def test_batch_request_over_limit_should_return_error(self, client):
+        """验证超过上限的批量请求整体返回参数错误"""
+        calls = [{"tool": "list_tools", "request_id": str(i)} for i in range(101)]
+        response = client.post("/api/mcp", json=calls)
+        assert response.status_code == 400
+        assert response.json()["error"]["code"] == ErrorCode.INVALID_REQUEST
+
+
+class TestMCPParameterValidation:
+    """测试按工具签名校验参数"""
+
+    def test_query_with_non_integer_id_should_return_invalid_parameters(self, client):
+        """验证参数类型不符时返回参数错误"""
+        request_data = {"tool": "query", "parameters": {"customer_id": "abc"}, "request_id": "test-type-123"}
+        response = client.post("/api/mcp", json=request_data)
+        assert response.status_code == 400
+        result = response.json()
+        assert result["error"]["code"] == ErrorCode.INVALID_PARAMETERS
+        assert "customer_id" in result["error"]["message"]
+        assert result["request_id"] == "test-type-123"
+
+    def test_query_without_required_parameter_should_return_invalid_parameters(self, client):
+        """验证缺少必填参数时返回参数错误"""
+        response = client.post("/api/mcp", json={"tool": "query_by_name", "parameters": {}})
+        assert response.status_code == 400
+        assert response.json()["error"]["code"] == ErrorCode.INVALID_PARAMETERS
+
+
+class TestMCPFieldProjection:
+    """测试 fields 参数的字段投影"""
+
+    def test_query_should_return_requested_fields_in_order(self, client, test_customer):
+        """验证按请求顺序返回字段，重复和未知字段被忽略"""
+        request_data = {
+            "tool": "query",
+            "parameters": {"customer_id": test_customer.id, "fields": ["size", "id", "unknown", "size"]},
+        }
+        customer = client.post("/api/mcp", json=request_data).json()["data"]["customer"]
+        assert list(customer) == ["size", "id"]
+        assert customer["id"] == test_customer.id
+
+    def test_query_by_name_with_no_known_fields_should_return_empty_customer(self, client, test_customer):
+        """验证没有可返回的字段时仍能判断客户存在，返回空对象"""
+        request_data = {"tool": "query_by_name", "parameters": {"customer_name": test_customer.name, "fields": []}}
+        response = client.post("/api/mcp", json=request_data)
+        assert response.status_code == 200
+        assert response.json()["data"]["customer"] == {}
+
+    def test_queries_should_select_only_requested_columns_with_cache_enabled(self, client, test_customer):
+        """验证默认配置（缓存开启）下缓存未命中时 SELECT 只包含请求的字段，部分列不写入缓存"""
+        assert customer_cache.enabled
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if "FROM customers" in statement:
+                statements.append(statement)
+
+        calls = [
+            {"tool": "query", "parameters": {"customer_id": test_customer.id, "fields": ["city"]}},
+            {"tool": "query_by_name", "parameters": {"customer_name": test_customer.name, "fields": ["city"]}},
+            {"tool": "query_many", "parameters": {"customer_ids": [test_customer.id], "fields": ["city"]}},
+        ]
+        event.listen(read_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            for call in calls:
+                assert client.post("/api/mcp", json=call).json()["data"]
+        finally:
+            event.remove(read_engine.sync_engine, "before_cursor_execute", record)
+        assert len(statements) == 3
+        assert all("city" in statement and "cargo_type" not in statement for statement in statements)
+        assert customer_cache.stats()["entries"] == 0
+
+
+class TestMCPQueryMany:
+    """测试按ID或名称列表批量查询客户"""
+
+    def _create_customers(self, db_session, count):
+        customers = [
+            Customer(name=f"批量{i}", city=f"城市{i}", industry="物流", cargo_type="普货", size=CustomerSize.SMALL)
+            for i in range(count)
+        ]
+        db_session.add_all(customers)
+        db_session.commit()
+        return customers
+
+    def test_query_many_by_ids_should_report_missing_ids(self, client, db_session):
+        """验证按ID列表查询时按请求顺序返回找到的客户，并列出不存在的ID"""
+        customers = self._create_customers(db_session, 3)
+        ids = [customers[2].id, 9999, customers[0].id]
+        request_data = {"tool": "query_many", "parameters": {"customer_ids": ids, "fields": ["city"]}}
+        response = client.post("/api/mcp", json=request_data)
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["customers"] == [
+            {"customer_id": customers[2].id, "customer": {"city": "城市2"}},
+            {"customer_id": customers[0].id, "customer": {"city": "城市0"}},
+        ]
+        assert data["missing"] == [9999]
+
+    def test_query_many_by_names_should_chunk_large_lists(self, client, db_session):
+        """验证名称列表超过单条语句的参数个数时分块查询"""
+        self._create_customers(db_session, 3)
+        names = ["批量1"] + [f"不存在{i}" for i in range(600)] + ["批量2"]
+        request_data = {"tool": "query_many", "parameters": {"customer_names": names}}
+        data = client.post("/api/mcp", json=request_data).json()["data"]
+        assert [item["customer_name"] for item in data["customers"]] == ["批量1", "批量2"]
+        assert data["customers"][1]["customer"]["city"] == "城市2"
+        assert len(data["missing"]) == 600
+
+    def test_query_many_without_keys_should_return_invalid_parameters(self, client):
+        """验证既没有ID列表也没有名称列表时返回参数错误"""
+        for parameters in ({}, {"customer_ids": [1], "customer_names": ["a"]}):
+            response = client.post("/api/mcp", json={"tool": "query_many", "parameters": parameters})
+            assert response.status_code == 400
+            assert response.json()["error"]["code"] == ErrorCode.INVALID_PARAMETERS
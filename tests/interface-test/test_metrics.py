@@ -0,0 +1,54 @@
+class TestDbPoolMetrics:
+    """测试连接池监控相关的接口"""
+
+    def test_get_db_pool_metrics_should_report_all_engines(self, client):
+        """测试获取连接池状态应同时返回写引擎、只读引擎和同步引擎的连接池信息"""
+        response = client.get("/api/metrics/db-pool")
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data) == {"write", "read", "sync", "tenants"}
+        assert "pool_class" in data["write"]
+        assert "pool_class" in data["read"]
+        assert "pool_class" in data["sync"]
+
+
+class TestSnapshotMetrics:
+    """测试内存库快照状态接口"""
+
+    def test_get_snapshot_should_report_disabled_by_default(self, client):
+        """测试未开启内存优先模式时快照状态为未启用"""
+        response = client.get("/api/metrics/snapshot")
+        assert response.status_code == 200
+        assert response.json() == {"enabled": False}
+
+
+class TestGroupCommitMetrics:
+    """测试合并提交统计接口"""
+
+    def test_get_group_commit_should_count_writes(self, client):
+        """测试单条创建客户经过合并提交并计入统计"""
+        before = client.get("/api/metrics/group-commit").json()["writes"]
+        client.post(
+            "/api/customers/",
+            json={"name": "合并", "city": "上海", "industry": "物流", "cargo_type": "普货", "size": "SMALL"},
+        )
+        data = client.get("/api/metrics/group-commit").json()
+        assert data["writes"] == before + 1
+        assert data["batches"] >= 1
+
+
+class TestCacheMetrics:
+    """测试客户读缓存统计接口"""
+
+    def test_get_cache_should_count_hits(self, client):
+        """测试重复读取同一客户时第二次命中缓存"""
+        created = client.post(
+            "/api/customers/",
+            json={"name": "缓存", "city": "上海", "industry": "物流", "cargo_type": "普货", "size": "SMALL"},
+        ).json()
+        before = client.get("/api/metrics/cache").json()
+        client.get(f"/api/customers/{created['id']}")
+        client.get(f"/api/customers/{created['id']}")
+        data = client.get("/api/metrics/cache").json()
+        assert data["misses"] == before["misses"] + 1
+        assert data["hits"] == before["hits"] + 1
@@ -0,0 +1,34 @@
+class TestPages:
+    """测试预渲染的主页和信息页"""
+
+    def test_home_should_return_gzip_when_accepted(self, client):
+        """测试客户端接受 gzip 时返回压缩后的主页"""
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.headers["Content-Type"].startswith("text/html")
+        assert "Customer Management" in response.text
+
+    def test_home_should_prefer_brotli_when_accepted(self, client):
+        """测试客户端同时接受 br 和 gzip 时返回 brotli 压缩的主页"""
+        response = client.get("/", headers={"Accept-Encoding": "gzip, br"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "br"
+        assert response.headers["ETag"].endswith('-br"')
+        assert "Customer Management" in response.text
+
+    def test_info_should_return_uncompressed_page_without_accept_encoding(self, client):
+        """测试客户端只接受 identity 时返回未压缩的信息页"""
+        response = client.get("/info", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert "Content-Encoding" not in response.headers
+        assert "Project Info" in response.text
+
+    def test_home_should_return_304_when_etag_matches(self, client):
+        """测试带上次的 ETag 重新请求时返回 304，不同编码的 ETag 不同"""
+        gzipped = client.get("/", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/", headers={"Accept-Encoding": "identity"})
+        assert gzipped.headers["ETag"] != plain.headers["ETag"]
+        response = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["ETag"]})
+        assert response.status_code == 304
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+from sqlalchemy import select
+
+from app.db import sharding
+from app.db.models import Customer
+from app.db.sharding import ShardRouter, shard_urls
+
+SHARD_COUNT = 3
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    """启用 3 个分片的分片存储模式，分片库放在临时目录中"""
+    router = ShardRouter(shard_urls(SHARD_COUNT, f"sqlite:///{tmp_path}/shard{{shard}}.db"))
+    router.init_db()
+    monkeypatch.setattr(sharding, "shard_router", router)
+    yield tmp_path
+    asyncio.run(router.dispose())
+
+
+def _shard_ids(tmp_path, shard):
+    """直接读取分片库中的客户 id"""
+    conn = sqlite3.connect(tmp_path / f"shard{shard}.db")
+    try:
+        return [row[0] for row in conn.execute("SELECT id FROM customers ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _customer(name, city="上海", external_id=None):
+    return {
+        "name": name,
+        "city": city,
+        "industry": "物流",
+        "cargo_type": "普货",
+        "size": "SMALL",
+        "external_id": external_id,
+    }
+
+
+class TestShardedCustomerWrite:
+    """测试分片模式下的客户写入"""
+
+    def test_create_customers_should_spread_across_shards_with_unique_ids(self, client, sharded, db_session):
+        """测试新建客户轮转写入各分片，id 全局唯一且能算出所在分片"""
+        ids = [client.post("/api/customers/", json=_customer(f"客户{i}")).json()["id"] for i in range(6)]
+        assert len(set(ids)) == 6
+        for shard in range(SHARD_COUNT):
+            shard_ids = _shard_ids(sharded, shard)
+            assert len(shard_ids) == 2
+            assert all((customer_id - 1) % SHARD_COUNT == shard for customer_id in shard_ids)
+        # 主库中不应有客户数据
+        assert db_session.execute(select(Customer)).first() is None
+
+    def test_bulk_create_should_allocate_unique_ids_per_batch(self, client, sharded):
+        """测试批量创建按批次写入分片，返回的 id 与分片中的数据一致"""
+        rows = [_customer(f"批量{i}") for i in range(10)]
+        response = client.post("/api/customers/bulk?batch_size=3", json=rows)
+        assert response.status_code == 200
+        ids = [result["id"] for result in response.json()["results"]]
+        stored = sorted(customer_id for shard in range(SHARD_COUNT) for customer_id in _shard_ids(sharded, shard))
+        assert sorted(ids) == stored
+        assert len(set(ids)) == 10
+
+    def test_upsert_twice_should_keep_one_row_per_external_id(self, client, sharded):
+        """测试重复同步同一批 external_id 不会在其它分片上产生重复数据"""
+        rows = [_customer(f"同步{i}", external_id=f"crm-{i}") for i in range(5)]
+        first = client.post("/api/customers/upsert", json=rows).json()
+        rows[0]["city"] = "北京"
+        second = client.post("/api/customers/upsert", json=rows).json()
+        assert [result["id"] for result in first["results"]] == [result["id"] for result in second["results"]]
+        assert sum(len(_shard_ids(sharded, shard)) for shard in range(SHARD_COUNT)) == 5
+        assert client.get(f"/api/customers/{second['results'][0]['id']}").json()["city"] == "北京"
+
+    def test_create_with_same_external_id_should_not_duplicate_across_shards(self, client, sharded):
+        """测试重复创建同一 external_id 的客户时只保留一行，后续创建返回 409，批量创建同样拦截"""
+        responses = [client.post("/api/customers/", json=_customer(f"重复{i}", external_id="dup")) for i in range(3)]
+        assert [response.status_code for response in responses] == [200, 409, 409]
+        bulk = client.post("/api/customers/bulk", json=[_customer("批量重复", external_id="dup")]).json()
+        assert bulk["created"] == 0
+        assert sum(len(_shard_ids(sharded, shard)) for shard in range(SHARD_COUNT)) == 1
+        upserted = client.post("/api/customers/upsert", json=[_customer("同步", city="北京", external_id="dup")])
+        assert upserted.json()["results"][0]["id"] == responses[0].json()["id"]
+
+    def test_update_external_id_to_another_shard_should_return_409(self, client, sharded):
+        """测试把客户的 external_id 改成哈希到其它分片的值返回 409，之后按该值新建客户不会产生重复"""
+        customer_id = client.post("/api/customers/", json=_customer("改标识")).json()["id"]
+        shard = sharding.shard_router.shard_for(customer_id)
+        keys = [f"crm-{i}" for i in range(20)]
+        foreign = next(key for key in keys if sharding.shard_router.shard_for_key(key) != shard)
+        local = next(key for key in keys if sharding.shard_router.shard_for_key(key) == shard)
+        response = client.put(f"/api/customers/{customer_id}", json={"external_id": foreign})
+        assert response.status_code == 409
+        assert client.get(f"/api/customers/{customer_id}").json()["external_id"] is None
+        assert client.post("/api/customers/", json=_customer("新客户", external_id=foreign)).status_code == 200
+        # 哈希到本分片的 external_id 可以使用，且之后按该值新建客户返回 409
+        assert client.put(f"/api/customers/{customer_id}", json={"external_id": local}).status_code == 200
+        assert client.post("/api/customers/", json=_customer("重复", external_id=local)).status_code == 409
+
+    def test_update_and_delete_should_hit_owning_shard(self, client, sharded):
+        """测试按 id 更新和删除客户"""
+        customer_id = client.post("/api/customers/", json=_customer("待更新")).json()["id"]
+        response = client.put(f"/api/customers/{customer_id}", json={"city": "广州"})
+        assert response.json()["city"] == "广州"
+        assert client.delete(f"/api/customers/{customer_id}").status_code == 200
+        assert client.get(f"/api/customers/{customer_id}").status_code == 404
+
+
+class TestShardedCustomerRead:
+    """测试分片模式下的客户查询"""
+
+    def test_list_should_merge_shards_in_sort_order(self, client, sharded):
+        """测试列表归并所有分片的结果，翻页覆盖全部客户且顺序与排序一致"""
+        names = ["d", "a", "c", "b", "f", "e", "a"]
+        client.post("/api/customers/bulk?batch_size=2", json=[_customer(name) for name in names])
+        for sort in ("id", "-name"):
+            seen, cursor = [], None
+            while True:
+                params = {"sort": sort, "limit": 3, **({"cursor": cursor} if cursor else {})}
+                response = client.get("/api/customers/", params=params)
+                seen.extend(response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            if sort == "id":
+                assert [row["id"] for row in seen] == sorted(row["id"] for row in seen)
+            else:
+                expected = sorted(seen, key=lambda row: (row["name"], row["id"]), reverse=True)
+                assert seen == expected
+            assert len(seen) == len(names)
+
+    def test_export_should_merge_shards_by_id(self, client, sharded):
+        """测试导出归并所有分片，按 id 有序"""
+        client.post("/api/customers/bulk?batch_size=4", json=[_customer(f"导出{i}") for i in range(9)])
+        response = client.get("/api/customers/export")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 9
+        assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+    def test_mcp_queries_should_find_customer_on_its_shard(self, client, sharded):
+        """测试 MCP 按 id 和按名称查询分片中的客户"""
+        ids = [
+            client.post("/api/customers/", json=_customer(f"MCP{i}", city=f"城市{i}")).json()["id"] for i in range(3)
+        ]
+        response = client.post("/api/mcp", json={"tool": "query", "parameters": {"customer_id": ids[2]}})
+        assert response.json()["data"]["customer"]["city"] == "城市2"
+        response = client.post("/api/mcp", json={"tool": "query_by_name", "parameters": {"customer_name": "MCP1"}})
+        assert response.json()["data"]["customer"]["city"] == "城市1"
+
+    def test_mcp_batch_should_query_shards_concurrently(self, client, sharded):
+        """测试分片模式下的 MCP 批量请求，各调用连接各自的分片"""
+        ids = [client.post("/api/customers/", json=_customer(f"批量MCP{i}")).json()["id"] for i in range(4)]
+        calls = [
+            {"tool": "query", "parameters": {"customer_id": customer_id}, "request_id": i}
+            for i, customer_id in enumerate(ids)
+        ]
+        results = client.post("/api/mcp", json=calls).json()
+        assert [result["data"]["customer"]["name"] for result in results] == [f"批量MCP{i}" for i in range(4)]
+
+    def test_mcp_query_many_should_collect_from_all_shards(self, client, sharded):
+        """测试分片模式下批量查询汇总所有分片的结果"""
+        ids = [client.post("/api/customers/", json=_customer(f"汇总{i}")).json()["id"] for i in range(4)]
+        request_data = {"tool": "query_many", "parameters": {"customer_ids": ids + [9999], "fields": ["name"]}}
+        data = client.post("/api/mcp", json=request_data).json()["data"]
+        assert [item["customer"]["name"] for item in data["customers"]] == [f"汇总{i}" for i in range(4)]
+        assert data["missing"] == [9999]
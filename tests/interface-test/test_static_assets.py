@@ -0,0 +1,40 @@
+import re
+
+
+def _asset_url(client, pattern):
+    html = client.get("/", headers={"Accept-Encoding": "identity"}).text
+    return re.search(pattern, html).group(0)
+
+
+class TestStaticAssets:
+    """测试带摘要文件名的静态资源"""
+
+    def test_home_should_reference_fingerprinted_assets(self, client):
+        """测试主页引用带摘要的样式表和脚本，不再带时间戳参数"""
+        html = client.get("/").text
+        assert re.search(r"/static/css/style\.[0-9a-f]{12}\.css", html)
+        assert re.search(r"/static/js/main\.[0-9a-f]{12}\.js'", html)
+
+    def test_fingerprinted_asset_should_be_immutable_and_precompressed(self, client):
+        """测试带摘要的资源长期缓存，并按 Accept-Encoding 返回 gzip 版本"""
+        url = _asset_url(client, r"/static/css/style\.[0-9a-f]{12}\.css")
+        response = client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "immutable" in response.headers["Cache-Control"]
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Content-Type"].startswith("text/css")
+        assert response.text == client.get("/static/css/style.css").text
+
+    def test_fingerprinted_asset_should_serve_brotli_sibling(self, client):
+        """测试客户端接受 br 时返回预先写好的 .br 版本"""
+        url = _asset_url(client, r"/static/js/main\.[0-9a-f]{12}\.js")
+        response = client.get(url, headers={"Accept-Encoding": "br, gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "br"
+        assert response.text == client.get("/static/js/main.js").text
+
+    def test_original_asset_path_should_still_be_served(self, client):
+        """测试原路径仍可访问，但不带长期缓存"""
+        response = client.get("/static/js/main.js")
+        assert response.status_code == 200
+        assert "Cache-Control" not in response.headers
@@ -0,0 +1,88 @@
+import asyncio
+from functools import partial
+
+import httpx
+import pytest
+
+from app.db import database
+from app.db.database import create_async_engines
+from app.db.models import Customer
+from app.db.tenants import TenantEngineCache
+from app.imports import pipeline
+from main import app
+
+
+@pytest.fixture
+def tenant_engines(tmp_path, monkeypatch):
+    """租户库放在临时目录中，最多同时打开 2 个租户"""
+    cache = TenantEngineCache(
+        f"sqlite:///{tmp_path}/tenants/{{tenant}}.db",
+        open_engines=partial(create_async_engines, read_pool_size=1),
+        init_schema=database._init_tenant_schema,
+        capacity=2,
+        idle_seconds=300,
+    )
+    monkeypatch.setattr(database, "tenant_engines", cache)
+    monkeypatch.setattr(pipeline, "IMPORT_DIR", str(tmp_path / "imports"))
+    yield cache
+    asyncio.run(cache.dispose())
+
+
+def _customer(name):
+    return {"name": name, "city": "上海", "industry": "物流", "cargo_type": "普货", "size": "SMALL"}
+
+
+def _tenant(tenant):
+    return {"X-Tenant-ID": tenant}
+
+
+class TestTenantRouting:
+    """测试按请求头路由到租户库"""
+
+    def test_customers_should_be_isolated_per_tenant(self, client, tenant_engines, tmp_path, db_session):
+        """测试不同租户和主库的客户数据互不可见"""
+        client.post("/api/customers/", json=_customer("华东客户"), headers=_tenant("east"))
+        client.post("/api/customers/", json=_customer("华南客户"), headers=_tenant("south"))
+        east = client.get("/api/customers/", headers=_tenant("east")).json()
+        south = client.get("/api/customers/", headers=_tenant("south")).json()
+        assert [customer["name"] for customer in east] == ["华东客户"]
+        assert [customer["name"] for customer in south] == ["华南客户"]
+        assert db_session.query(Customer).count() == 0
+        assert (tmp_path / "tenants" / "east.db").exists()
+
+    def test_invalid_tenant_should_return_400(self, client, tenant_engines):
+        """测试租户标识包含路径字符时返回 400"""
+        response = client.get("/api/customers/", headers=_tenant("../main"))
+        assert response.status_code == 400
+
+    def test_import_should_run_in_tenant_database(self, client, tenant_engines, db_session):
+        """测试后台导入任务沿用请求的租户"""
+        content = "name,city,industry,cargo_type,size\nA,City,Ind,Cargo,SMALL\nB,City,Ind,Cargo,SMALL\n"
+        job_id = client.post("/api/imports/customers", content=content, headers=_tenant("east")).json()["id"]
+        job = client.get(f"/api/imports/{job_id}", headers=_tenant("east")).json()
+        assert job["status"] == "completed"
+        assert len(client.get("/api/customers/", headers=_tenant("east")).json()) == 2
+        assert db_session.query(Customer).count() == 0
+
+    def test_least_recently_used_tenant_should_be_evicted_over_capacity(self, client, tenant_engines):
+        """测试超出容量时关闭最久未用的租户库，再次访问时重新打开且数据仍在"""
+        for tenant in ("a", "b", "c"):
+            client.post("/api/customers/", json=_customer(f"客户{tenant}"), headers=_tenant(tenant))
+        stats = client.get("/api/metrics/db-pool").json()["tenants"]
+        assert stats["open"] == 2
+        assert stats["evictions"] == 1
+        assert set(stats["tenants"]) == {"b", "c"}
+        assert client.get("/api/customers/", headers=_tenant("a")).json()[0]["name"] == "客户a"
+
+    def test_concurrent_first_requests_should_initialise_new_tenant_once(self, tenant_engines):
+        """测试新租户的多个首次请求同时到达时都成功，建表不会互相冲突"""
+
+        async def run(tenant):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                requests = [client.get("/api/customers/", headers=_tenant(tenant)) for _ in range(8)]
+                return await asyncio.gather(*requests)
+
+        for round_ in range(5):
+            responses = asyncio.run(run(f"new{round_}"))
+            assert [response.status_code for response in responses] == [200] * 8
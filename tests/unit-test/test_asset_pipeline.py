@@ -0,0 +1,63 @@
+import asyncio
+import os
+
+from app.api.assets import AssetPipeline, ZeroCopyFileResponse
+
+
+class TestAssetPipeline:
+    """静态资源构建测试"""
+
+    def test_build_should_write_fingerprinted_file_and_gzip_sibling(self, tmp_path):
+        """测试构建后生成带摘要的文件和 .gz 版本，URL 指向带摘要的路径"""
+        source = tmp_path / "static"
+        (source / "css").mkdir(parents=True)
+        (source / "css" / "site.css").write_text("body { color: red; }\n" * 50)
+        pipeline = AssetPipeline(str(source), str(tmp_path / "build"))
+        pipeline.build()
+        url = pipeline.url("css/site.css")
+        assert url.startswith("/static/css/site.") and url.endswith(".css")
+        variants = pipeline.files[url.removeprefix("/static/")]
+        assert set(variants) >= {"identity", "gzip"}
+        assert variants["gzip"].endswith(".css.gz")
+        assert all(os.path.exists(path) for path in variants.values())
+
+    def test_changed_content_should_get_new_url(self, tmp_path):
+        """测试文件内容变化后摘要和 URL 随之变化"""
+        source = tmp_path / "static"
+        source.mkdir()
+        path = source / "app.js"
+        path.write_text("let a = 1;")
+        first = AssetPipeline(str(source), str(tmp_path / "build"))
+        first.build()
+        path.write_text("let a = 2;")
+        second = AssetPipeline(str(source), str(tmp_path / "build"))
+        second.build()
+        assert first.url("app.js") != second.url("app.js")
+
+    def test_disabled_pipeline_should_return_original_url(self, tmp_path):
+        """测试开发模式下不构建，URL 为原路径"""
+        pipeline = AssetPipeline(str(tmp_path), str(tmp_path / "build"), enabled=False)
+        pipeline.build()
+        assert pipeline.url("js/main.js") == "/static/js/main.js"
+
+
+class TestZeroCopyFileResponse:
+    """零拷贝文件响应测试"""
+
+    def test_should_use_zerocopysend_when_server_supports_it(self, tmp_path):
+        """测试服务器声明支持 zerocopysend 扩展时发送文件描述符而不是文件内容"""
+        path = tmp_path / "a.txt"
+        path.write_text("hello")
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "extensions": {"http.response.zerocopysend": {}}}
+        asyncio.run(ZeroCopyFileResponse(str(path))(scope, None, send))
+        assert [message["type"] for message in messages] == ["http.response.start", "http.response.zerocopysend"]
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-length"] == b"5"
+        assert b"last-modified" in headers
+        assert b"etag" in headers
+        assert messages[1]["file"].closed
@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from app.db.cache import CustomerCache
+from app.db.coherence import DataVersionWatcher
+from app.db.tenants import current_tenant
+
+
+@pytest.fixture
+def database(tmp_path):
+    """临时文件库，模拟另一个 worker 进程的写连接"""
+    path = str(tmp_path / "main.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    yield path, conn
+    conn.close()
+
+
+def _customer(customer_id):
+    return {"id": customer_id, "name": "C", "version": 1}
+
+
+class TestDataVersionWatcher:
+    """缓存跨进程一致性检查测试"""
+
+    def test_poll_should_detect_commit_by_other_connection(self, database):
+        """测试其他连接提交写入后清空主库的缓存条目"""
+        path, conn = database
+        cache = CustomerCache(10, 1 << 20, 60)
+        watcher = DataVersionWatcher(cache, lambda tenants: {None: [path]})
+        watcher.sync(watcher.poll())
+        cache.put(_customer(1))
+        assert watcher.poll() == set()
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.commit()
+        watcher.sync(watcher.poll())
+        assert cache.get("id", 1) is None
+        assert watcher.changes == 2
+        watcher.close()
+
+    def test_sync_should_only_clear_changed_tenant(self, database, tmp_path):
+        """测试只清空库被写入过的租户，其他租户的条目保留"""
+        path, conn = database
+        tenant_path = str(tmp_path / "tenant.db")
+        sqlite3.connect(tenant_path).close()
+        cache = CustomerCache(10, 1 << 20, 60)
+        watcher = DataVersionWatcher(
+            cache, lambda tenants: {None: [path], **{t: [tenant_path] for t in tenants if t is not None}}
+        )
+        token = current_tenant.set("acme")
+        try:
+            cache.put(_customer(1))
+            watcher.poll()
+            conn.execute("INSERT INTO t VALUES (1)")
+            conn.commit()
+            assert watcher.poll() == {None}
+            watcher.sync({None})
+            assert cache.get("id", 1) is not None
+        finally:
+            current_tenant.reset(token)
+        watcher.close()
+
+    def test_poll_should_skip_missing_files(self, tmp_path):
+        """测试库文件还不存在时跳过"""
+        watcher = DataVersionWatcher(CustomerCache(10, 1 << 20, 60), lambda tenants: {None: [str(tmp_path / "x.db")]})
+        assert watcher.poll() == set()
@@ -0,0 +1,67 @@
+import asyncio
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config.options import CustomerSize
+from app.db.crud import delete_customer_row, insert_customer_row, update_customer_row
+from app.db.database import create_async_engines, create_schema
+
+
+class TestCustomerRowWrites:
+    """单条增删改的 RETURNING 写路径测试"""
+
+    def test_each_write_should_be_one_statement(self, tmp_path):
+        """测试新建、更新、删除各只执行一条语句，更新只写入给出的列"""
+        url = f"sqlite:///{tmp_path}/crud.db"
+        sync_engine = create_engine(url)
+        create_schema(sync_engine)
+        sync_engine.dispose()
+        write_engine, read_engine = create_async_engines(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+        statements = []
+
+        @event.listens_for(write_engine.sync_engine, "before_cursor_execute")
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if not statement.startswith("BEGIN"):
+                statements.append(statement)
+
+        async def run():
+            async with async_sessionmaker(write_engine)() as db:
+                values = {
+                    "name": "C",
+                    "city": "北京",
+                    "industry": "物流",
+                    "cargo_type": "普货",
+                    "size": CustomerSize.SMALL,
+                }
+                created = await insert_customer_row(db, values)
+                updated = await update_customer_row(db, created.id, {"city": "上海"})
+                deleted = await delete_customer_row(db, created.id)
+                missing = await delete_customer_row(db, created.id)
+                await db.commit()
+            return created, updated, deleted, missing
+
+        try:
+            created, updated, deleted, missing = asyncio.run(run())
+        finally:
+            asyncio.run(write_engine.dispose())
+            asyncio.run(read_engine.dispose())
+        assert len(statements) == 4
+        assert all("RETURNING" in statement for statement in statements)
+        assert statements[1].startswith("UPDATE customers SET city=?")
+        assert updated.city == "上海" and updated.name == "C"
+        assert deleted.id == created.id
+        assert missing is None
+
+    def test_missing_version_column_should_be_added_with_default(self, tmp_path):
+        """测试旧库中缺少的 version 列按 server_default 补齐，已有的行取默认值"""
+        sync_engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+        with sync_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE customers (id INTEGER PRIMARY KEY, name VARCHAR)"))
+            conn.execute(text("INSERT INTO customers (name) VALUES ('旧客户')"))
+        try:
+            create_schema(sync_engine)
+            with sync_engine.connect() as conn:
+                assert conn.execute(text("SELECT version FROM customers")).scalar_one() == 1
+        finally:
+            sync_engine.dispose()
@@ -0,0 +1,72 @@
+import asyncio
+
+from app.db.cache import CustomerCache
+
+
+def _customer(customer_id, name="C", version=1):
+    return {"id": customer_id, "name": name, "city": "City", "version": version}
+
+
+class TestCustomerCache:
+    """客户读缓存测试"""
+
+    def test_get_should_return_cached_customer_by_id_and_name(self):
+        """测试按 id 和名称写入后都能命中"""
+        cache = CustomerCache(10, 1 << 20, 60)
+        cache.put(_customer(1, "甲"), name="甲")
+        assert cache.get("id", 1)["name"] == "甲"
+        assert cache.get("name", "甲")["id"] == 1
+        assert cache.get("id", 2) is None
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_put_should_evict_least_recently_used_entry(self):
+        """测试超过条目上限时淘汰最久未使用的条目"""
+        cache = CustomerCache(2, 1 << 20, 60)
+        cache.put(_customer(1))
+        cache.put(_customer(2))
+        cache.get("id", 1)
+        cache.put(_customer(3))
+        assert cache.get("id", 2) is None
+        assert cache.get("id", 1) is not None
+        assert cache.evictions == 1
+
+    def test_put_should_respect_byte_limit(self):
+        """测试超过字节上限时淘汰条目"""
+        cache = CustomerCache(100, 300, 60)
+        cache.put(_customer(1))
+        cache.put(_customer(2))
+        assert cache.stats()["entries"] == 1
+        assert cache.bytes <= 300
+
+    def test_get_should_expire_entry_after_ttl(self):
+        """测试条目超过 TTL 后不再命中"""
+        cache = CustomerCache(10, 1 << 20, 0)
+        cache.put(_customer(1))
+        assert cache.get("id", 1) is None
+        assert cache.expirations == 1
+
+    def test_invalidate_should_drop_cached_names_of_customer(self):
+        """测试按 id 失效时一并失效该客户被缓存过的名称"""
+        cache = CustomerCache(10, 1 << 20, 60)
+        cache.put(_customer(1, "旧名"), name="旧名")
+        cache.invalidate(customer_ids=[1])
+        assert cache.get("id", 1) is None
+        assert cache.get("name", "旧名") is None
+
+    def test_get_or_load_should_not_store_value_read_before_invalidation(self):
+        """测试加载期间发生失效时不把旧数据写入缓存"""
+        cache = CustomerCache(10, 1 << 20, 60)
+
+        async def load():
+            cache.invalidate(customer_ids=[1])
+            return _customer(1)
+
+        assert asyncio.run(cache.get_or_load("id", 1, load))["id"] == 1
+        assert cache.get("id", 1) is None
+
+    def test_disabled_cache_should_not_store(self):
+        """测试条目上限为 0 时不缓存"""
+        cache = CustomerCache(0, 1 << 20, 60)
+        cache.put(_customer(1))
+        assert cache.get("id", 1) is None
+        assert not cache.stats()["enabled"]
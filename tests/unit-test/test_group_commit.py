@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config.options import CustomerSize
+from app.db.database import create_async_engines, create_schema
+from app.db.group_commit import GroupCommitter, after_commit
+from app.db.models import Customer
+
+
+@pytest.fixture
+def writer(tmp_path):
+    """临时文件库的写会话工厂"""
+    url = f"sqlite:///{tmp_path}/group.db"
+    sync_engine = create_engine(url)
+    create_schema(sync_engine)
+    sync_engine.dispose()
+    write_engine, read_engine = create_async_engines(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    yield async_sessionmaker(write_engine, expire_on_commit=False)
+    asyncio.run(write_engine.dispose())
+    asyncio.run(read_engine.dispose())
+
+
+def _create(external_id):
+    async def op(db):
+        customer = Customer(name="C", city="City", industry="Ind", cargo_type="Cargo", size=CustomerSize.SMALL)
+        customer.external_id = external_id
+        db.add(customer)
+        await db.flush()
+        return customer.id
+
+    return op
+
+
+class TestGroupCommitter:
+    """合并提交协调器测试"""
+
+    def test_concurrent_writes_should_share_one_commit(self, writer):
+        """测试同时到达的写操作在一个事务中提交，失败的写操作只影响它自己"""
+        committer = GroupCommitter(max_delay=0.05, max_batch=100)
+
+        async def run():
+            external_ids = ["a", "b", "a", "c"]
+            results = await asyncio.gather(
+                *(committer.submit("main", writer, _create(external_id)) for external_id in external_ids),
+                return_exceptions=True,
+            )
+            async with writer() as db:
+                count = await db.scalar(select(func.count()).select_from(Customer))
+            return results, count
+
+        results, count = asyncio.run(run())
+        assert isinstance(results[2], Exception)
+        assert len({results[0], results[1], results[3]}) == 3
+        assert count == 3
+        stats = committer.stats()
+        assert stats["batches"] == 1
+        assert stats["writes"] == 4
+        assert stats["failed_writes"] == 1
+
+    def test_full_batch_should_commit_without_waiting(self, writer):
+        """测试攒满 max_batch 个写操作时立即提交，不等待 max_delay"""
+        committer = GroupCommitter(max_delay=10, max_batch=3)
+
+        async def run():
+            return await asyncio.wait_for(
+                asyncio.gather(*(committer.submit("main", writer, _create(None)) for _ in range(3))), timeout=5
+            )
+
+        assert len(set(asyncio.run(run()))) == 3
+        assert committer.stats()["largest_batch"] == 3
+
+    def test_batches_for_same_target_should_never_overlap(self):
+        """测试一个批次等待前一批次的锁时，之后到达的写操作不会另建队列与它同时提交"""
+        committer = GroupCommitter(max_delay=0.001, max_batch=100)
+        active = []
+        overlaps = []
+
+        async def op(db):
+            active.append(1)
+            overlaps.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+        async def run():
+            first = asyncio.create_task(committer.submit("main", _FakeSession, op))
+            await asyncio.sleep(0.003)
+            # 第一批正在提交，第二批等待锁
+            second = asyncio.create_task(committer.submit("main", _FakeSession, op))
+            await first
+            await committer.submit("main", _FakeSession, op)
+            await second
+
+        asyncio.run(run())
+        assert max(overlaps) == 1
+
+    def test_after_commit_callback_should_run_when_caller_is_cancelled(self):
+        """测试写操作执行后调用方被取消（如客户端断开），登记的回调仍在提交后执行；提交失败时不执行"""
+        committer = GroupCommitter(max_delay=0.001, max_batch=100)
+        calls = []
+
+        async def submit_and_cancel(session_factory, name):
+            ran = asyncio.Event()
+
+            async def op(db):
+                after_commit(db, lambda: calls.append(name))
+                ran.set()
+                await asyncio.sleep(0.01)
+
+            task = asyncio.create_task(committer.submit(name, session_factory, op))
+            await ran.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # 等待这一批提交结束
+            await asyncio.sleep(0.05)
+
+        async def run():
+            await submit_and_cancel(_FakeSession, "committed")
+            await submit_and_cancel(_FailingSession, "failed")
+
+        asyncio.run(run())
+        assert calls == ["committed"]
+
+
+class _FakeSession:
+    """只记录调用的会话，用于检查批次的执行顺序"""
+
+    def __init__(self):
+        self.info = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def begin_nested(self):
+        return self
+
+    async def commit(self):
+        pass
+
+
+class _FailingSession(_FakeSession):
+    """提交总是失败的会话"""
+
+    async def commit(self):
+        raise RuntimeError("disk I/O error")
@@ -1,7 +1,12 @@
-from unittest.mock import MagicMock
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, Dict
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from pydantic import Field
 
+from app.mcp import service, tools
 from app.mcp.errors import DatabaseError, InvalidParametersError
 from app.mcp.protocol import MCPProtocol
 from app.mcp.service import MCPService
@@ -14,7 +19,7 @@ class TestMCPEdgeCases:
         """测试无效的客户ID - 验证参数校验逻辑，接口测试难以全面覆盖边界值"""
         # 直接使用无效ID调用方法
         with pytest.raises(InvalidParametersError) as excinfo:
-            MCPService.query_customer(customer_id=-1)
+            asyncio.run(MCPService.query_customer(customer_id=-1))
         # 验证异常
         assert "客户ID必须是正整数" in str(excinfo.value)
         assert excinfo.value.code == "INVALID_PARAMETERS"
@@ -23,7 +28,7 @@ class TestMCPEdgeCases:
         """测试使用空名称查询客户 - 验证边界情况的处理"""
         # 使用空名称调用方法，应该抛出异常
         with pytest.raises(InvalidParametersError) as excinfo:
-            MCPService.query_customer_by_name(customer_name="")
+            asyncio.run(MCPService.query_customer_by_name(customer_name=""))
         # 验证异常
         assert "客户名称不能为空" in str(excinfo.value)
         assert excinfo.value.code == "INVALID_PARAMETERS"
@@ -32,18 +37,18 @@ class TestMCPEdgeCases:
         """测试数据库错误 - 模拟数据库连接失败，接口测试难以模拟此场景"""
         # 创建模拟数据库会话
         mock_db = MagicMock()
-        mock_db._is_test_db = True  # 避免关闭连接
-        mock_db.query.side_effect = Exception("database connection error")
+        mock_db.execute = AsyncMock(side_effect=Exception("database connection error"))
 
-        # 模拟 get_db 生成器
-        def mock_get_db():
+        # 模拟会话上下文
+        @asynccontextmanager
+        async def mock_session_scope(customer_id):
             yield mock_db
 
         # 应用补丁
-        monkeypatch.setattr("app.mcp.service.get_db", mock_get_db)
+        monkeypatch.setattr("app.mcp.service.customer_read_scope", mock_session_scope)
         # 执行查询，应该抛出异常
         with pytest.raises(DatabaseError) as excinfo:
-            MCPService.query_customer(customer_id=1)
+            asyncio.run(MCPService.query_customer(customer_id=1))
         # 验证异常
         assert "数据库操作失败" in str(excinfo.value)
         assert excinfo.value.code == "DATABASE_ERROR"
@@ -84,3 +89,46 @@ class TestMCPProtocol:
         assert result["status"] == "success"
         assert result["data"] == data
         assert result["request_id"] == request_id
+
+
+class TestMCPToolRegistry:
+    """MCP 工具注册表测试 - 验证由签名生成的模式和校验器，接口测试只能覆盖已注册的工具"""
+
+    def test_register_tool_should_build_schema_from_signature(self, monkeypatch):
+        """测试注册工具时由签名生成参数模式，调用时按签名校验和转换参数"""
+        monkeypatch.setattr(tools, "_tools", {})
+
+        async def lookup(
+            code: Annotated[str, Field(description="编码")], limit: Annotated[int, Field(description="条数")] = 10
+        ) -> Dict[str, Any]:
+            """按编码查找"""
+            return {"code": code, "limit": limit}
+
+        tool = tools.register_tool("lookup", lookup)
+        assert tool.schema.description == "按编码查找"
+        assert tool.schema.parameters["code"].model_dump() == {
+            "type": "string",
+            "description": "编码",
+            "required": True,
+            "default": None,
+        }
+        assert tool.schema.parameters["limit"].default == 10
+        assert tools.get_tool("lookup") is tool
+        assert asyncio.run(tool.call({"code": "A", "limit": "5"})) == {"code": "A", "limit": 5}
+
+    def test_call_with_invalid_parameters_should_raise(self, monkeypatch):
+        """测试参数缺失或类型不符时抛出参数错误"""
+        monkeypatch.setattr(tools, "_tools", {})
+        tool = tools.register_tool("echo", lambda value: value)
+        with pytest.raises(InvalidParametersError) as excinfo:
+            asyncio.run(tool.call({}))
+        assert "value" in str(excinfo.value)
+
+
+class TestMCPProjection:
+    """MCP 查询字段投影测试 - 验证生成的 SQL 只查询需要的列"""
+
+    def test_query_should_select_only_requested_columns(self):
+        """测试查询语句只包含请求的字段和 id，不加载整行"""
+        stmt = service._select_columns(service._projection(["city"]))
+        assert [column.name for column in stmt.selected_columns] == ["id", "city"]
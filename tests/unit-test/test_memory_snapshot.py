@@ -0,0 +1,29 @@
+import sqlite3
+
+from app.db.snapshot import MemorySnapshot
+
+
+class TestMemorySnapshot:
+    """内存库快照测试"""
+
+    def test_snapshot_should_survive_restart(self, tmp_path):
+        """测试关闭时写出的快照在下一次启动时载入内存库"""
+        path = str(tmp_path / "snapshot.db")
+        snapshot = MemorySnapshot("file:/snapshot-test?vfs=memdb", path)
+        snapshot.load()
+        conn = sqlite3.connect("file:/snapshot-test?vfs=memdb", uri=True)
+        conn.execute("CREATE TABLE t (v INTEGER)")
+        conn.execute("INSERT INTO t VALUES (42)")
+        conn.commit()
+        conn.close()
+        snapshot.close()
+        assert snapshot.stats()["snapshots"] == 1
+
+        restarted = MemorySnapshot("file:/snapshot-test?vfs=memdb", path)
+        restarted.load()
+        conn = sqlite3.connect("file:/snapshot-test?vfs=memdb", uri=True)
+        try:
+            assert conn.execute("SELECT v FROM t").fetchall() == [(42,)]
+        finally:
+            conn.close()
+            restarted.close()
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app.config import settings
+from app.db.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool, pool_options, pool_status, writer_pool_options
+
+
+class TestPoolOptions:
+    """连接池配置测试 - 测试环境使用内存库，接口测试覆盖不到文件库的连接池"""
+
+    def test_queue_pool_options_should_follow_settings(self, monkeypatch):
+        """测试 queue 连接池参数取自配置"""
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 2)
+        options = pool_options("sqlite:///./some.db", is_async=False)
+        assert options["poolclass"] is TimedQueuePool
+        assert options["pool_size"] == 3
+        assert options["max_overflow"] == 2
+
+    def test_memory_url_should_keep_default_pool(self):
+        """测试内存库不覆盖默认连接池"""
+        assert pool_options("sqlite:///file:memdb?mode=memory&cache=shared&uri=true", is_async=True) == {}
+
+    def test_writer_pool_should_hold_single_connection(self, monkeypatch):
+        """测试写连接池固定为一个连接，不受 DB_POOL_SIZE 影响"""
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 8)
+        options = writer_pool_options("sqlite+aiosqlite:///./some.db")
+        assert options["poolclass"] is TimedAsyncAdaptedQueuePool
+        assert options["pool_size"] == 1
+        assert options["max_overflow"] == 0
+
+    def test_unknown_pool_class_should_fail(self, monkeypatch):
+        """测试未知的连接池类型应报错"""
+        monkeypatch.setattr(settings, "DB_POOL_CLASS", "magic")
+        with pytest.raises(ValueError):
+            pool_options("sqlite:///./some.db", is_async=False)
+
+
+class TestPoolStatus:
+    """连接池状态统计测试"""
+
+    def test_pool_status_should_count_checkouts_and_checked_out_connections(self, tmp_path):
+        """测试借出连接时状态中的借出数和取连接次数随之变化"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=2)
+        try:
+            with engine.connect():
+                status = pool_status(engine)
+                assert status["checked_out"] == 1
+            status = pool_status(engine)
+            assert status["checked_out"] == 0
+            assert status["checkouts"] == 1
+            assert status["size"] == 2
+            assert status["wait_time_max_ms"] >= 0
+        finally:
+            engine.dispose()
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.db.pragmas import SQLITE_PROFILES, install_read_only, install_sqlite_profile, read_sqlite_settings
+
+
+class TestSQLiteProfile:
+    """SQLite 性能配置档测试 - 用临时文件库验证 PRAGMA 实际生效，测试用的内存库不支持 WAL"""
+
+    def test_balanced_profile_should_apply_on_every_connection(self, tmp_path):
+        """测试 balanced 配置档在新连接上生效"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+        install_sqlite_profile(engine, "balanced")
+        try:
+            settings = read_sqlite_settings(engine)
+        finally:
+            engine.dispose()
+        expected = SQLITE_PROFILES["balanced"]
+        assert settings["journal_mode"] == "wal"
+        assert settings["synchronous"] == 1  # NORMAL
+        assert settings["cache_size"] == expected["cache_size"]
+        assert settings["busy_timeout"] == expected["busy_timeout"]
+
+    def test_default_profile_should_keep_rollback_journal(self, tmp_path):
+        """测试 default 配置档保持 SQLite 默认的回滚日志模式"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'default.db'}")
+        install_sqlite_profile(engine, "default")
+        try:
+            assert read_sqlite_settings(engine)["journal_mode"] == "delete"
+        finally:
+            engine.dispose()
+
+    def test_unknown_profile_should_fail(self):
+        """测试未知的配置档名称应报错"""
+        engine = create_engine("sqlite://")
+        with pytest.raises(ValueError) as excinfo:
+            install_sqlite_profile(engine, "turbo")
+        assert "turbo" in str(excinfo.value)
+
+
+class TestReadOnlyConnection:
+    """只读连接测试"""
+
+    def test_read_only_engine_should_reject_writes(self, tmp_path):
+        """测试只读引擎可以查询，但执行写语句时报错"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'ro.db'}")
+        install_read_only(engine)
+        try:
+            with engine.connect() as conn:
+                assert conn.execute(text("SELECT 1")).scalar() == 1
+                with pytest.raises(OperationalError):
+                    conn.execute(text("CREATE TABLE t (id INTEGER)"))
+        finally:
+            engine.dispose()
@@ -0,0 +1,51 @@
+import os
+
+from jinja2 import Environment, FileSystemLoader
+from starlette.requests import Request
+
+from app.api.pages import RenderedPage, choose_encoding
+
+
+def _request(headers=None):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class TestChooseEncoding:
+    """Accept-Encoding 协商测试"""
+
+    def test_should_prefer_br_then_gzip(self):
+        """测试 br 可用且被接受时优先选择 br"""
+        available = {"identity", "gzip", "br"}
+        assert choose_encoding("gzip, br", available) == "br"
+        assert choose_encoding("gzip, br", {"identity", "gzip"}) == "gzip"
+
+    def test_should_respect_q_values(self):
+        """测试 q=0 的编码不被选择，* 匹配未列出的编码"""
+        assert choose_encoding("gzip;q=0, br;q=0", {"identity", "gzip", "br"}) == "identity"
+        assert choose_encoding("*", {"identity", "gzip"}) == "gzip"
+        assert choose_encoding(None, {"identity", "gzip"}) == "identity"
+
+
+class TestRenderedPage:
+    """预渲染页面测试"""
+
+    def test_should_render_once(self, tmp_path):
+        """测试多次请求只渲染一次"""
+        (tmp_path / "page.html").write_text("<p>" + "hello " * 100 + "</p>")
+        page = RenderedPage(Environment(loader=FileSystemLoader(str(tmp_path))), "page.html")
+        for _ in range(3):
+            page.response(_request({"Accept-Encoding": "gzip"}))
+        assert page.renders == 1
+
+    def test_should_rerender_changed_template_when_auto_reload(self, tmp_path):
+        """测试开启自动重新渲染时模板修改后返回新内容"""
+        path = tmp_path / "page.html"
+        path.write_text("<p>old</p>")
+        environment = Environment(loader=FileSystemLoader(str(tmp_path)), auto_reload=True)
+        page = RenderedPage(environment, "page.html", auto_reload=True)
+        path.write_text("<p>new</p>")
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        assert page.response(_request()).body == b"<p>new</p>"
+        assert page.renders == 2
@@ -0,0 +1,39 @@
+import asyncio
+
+from app.config.options import CustomerSize
+from app.db.sharding import ShardRouter, insert_customers_into_shard, iter_sharded_customer_chunks, shard_urls
+
+
+class TestShardedExport:
+    """分片导出归并测试 - 用很小的批次验证多轮归并，接口测试只覆盖单批次"""
+
+    def test_iter_sharded_chunks_should_yield_all_rows_in_id_order(self, tmp_path):
+        """测试各分片数据量不均时，按 id 归并输出全部客户"""
+        router = ShardRouter(shard_urls(3, f"sqlite:///{tmp_path}/shard{{shard}}.db"))
+        router.init_db()
+
+        async def run():
+            try:
+                # 分片 0 写入 5 个客户，分片 1 写入 2 个，分片 2 为空
+                for shard, count in ((0, 5), (1, 2)):
+                    async with router.write_session(shard) as db:
+                        rows = [
+                            {
+                                "name": f"{shard}-{i}",
+                                "city": "",
+                                "industry": "",
+                                "cargo_type": "",
+                                "size": CustomerSize.SMALL,
+                            }
+                            for i in range(count)
+                        ]
+                        await insert_customers_into_shard(db, rows)
+                        await db.commit()
+                return [chunk async for chunk in iter_sharded_customer_chunks(router, chunk_size=2)]
+            finally:
+                await router.dispose()
+
+        chunks = asyncio.run(run())
+        ids = [row["id"] for chunk in chunks for row in chunk]
+        assert ids == [1, 2, 4, 5, 7, 10, 13]
+        assert len(chunks) > 1
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.db.cache import CustomerCache
+from app.db.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """并发相同读取合并测试"""
+
+    def test_concurrent_calls_should_share_one_load(self):
+        """测试同一键的并发调用只执行一次加载并共享结果"""
+        flights = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"id": 1}
+
+        async def main():
+            return await asyncio.gather(*(flights.do("k", load) for _ in range(5)))
+
+        results = asyncio.run(main())
+        assert len(calls) == 1
+        assert all(result == {"id": 1} for result in results)
+        assert (flights.loads, flights.coalesced) == (1, 4)
+
+    def test_different_keys_should_load_separately(self):
+        """测试不同的键各自加载"""
+        flights = SingleFlight()
+
+        async def main():
+            return await asyncio.gather(flights.do("a", _value("a")), flights.do("b", _value("b")))
+
+        assert asyncio.run(main()) == ["a", "b"]
+        assert flights.loads == 2
+
+    def test_error_should_be_shared_by_waiting_callers(self):
+        """测试加载失败时等待中的调用方收到同一个异常"""
+        flights = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("db down")
+
+        async def main():
+            return await asyncio.gather(*(flights.do("k", load) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(main())
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flights.loads == 1
+
+    def test_cancelled_leader_should_not_cancel_waiting_callers(self):
+        """测试执行加载的调用方被取消时，等待中的调用方重新加载"""
+        flights = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(10)
+
+        async def main():
+            leader = asyncio.create_task(flights.do("k", slow))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flights.do("k", _value("fresh")))
+            await asyncio.sleep(0)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await follower
+
+        assert asyncio.run(main()) == "fresh"
+        assert flights.loads == 2
+
+    def test_cache_should_coalesce_concurrent_misses(self):
+        """测试缓存未命中时同一客户的并发读取只查询一次"""
+        cache = CustomerCache(10, 1 << 20, 60)
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"id": 1, "name": "C", "version": 1}
+
+        async def main():
+            return await asyncio.gather(*(cache.get_or_load("id", 1, load) for _ in range(4)))
+
+        asyncio.run(main())
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 3
+
+
+def _value(value):
+    async def load():
+        await asyncio.sleep(0.01)
+        return value
+
+    return load
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+from app.api.streaming import StreamParseError, iter_json_array, iter_ndjson
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _collect(parser, data: bytes, size: int):
+    async def run():
+        return [item async for item in parser(_chunks(data, size))]
+
+    return asyncio.run(run())
+
+
+class TestIterJsonArray:
+    """JSON 数组增量解析测试 - 覆盖任意分块边界，接口测试无法控制请求体的分块方式"""
+
+    def test_parse_array_split_at_every_byte(self):
+        """测试逐字节分块时仍能完整解析所有元素"""
+        items = [{"name": "客户", "n": 12345}, {"name": "b", "nested": [1, 2]}, 678]
+        data = json.dumps(items, ensure_ascii=False).encode("utf-8")
+        for size in (1, 2, 7, len(data)):
+            assert _collect(iter_json_array, data, size) == items
+
+    def test_parse_empty_array(self):
+        """测试空数组"""
+        assert _collect(iter_json_array, b"  [ ]  ", 1) == []
+
+    def test_parse_truncated_array_should_fail(self):
+        """测试被截断的数组应报错"""
+        with pytest.raises(StreamParseError):
+            _collect(iter_json_array, b'[{"a": 1}, {"b"', 4)
+
+    def test_parse_trailing_data_should_fail(self):
+        """测试数组后有多余数据应报错"""
+        with pytest.raises(StreamParseError):
+            _collect(iter_json_array, b"[1] [2]", 3)
+
+    def test_parse_missing_separator_or_bracket_should_fail(self):
+        """测试元素之间缺少逗号或请求体不以 [ 开头应报错"""
+        for data in (b'[{"a": 1} {"b": 2}]', b'{"a": 1}'):
+            with pytest.raises(StreamParseError):
+                _collect(iter_json_array, data, 2)
+
+
+class TestIterNdjson:
+    """NDJSON 逐行解析测试"""
+
+    def test_parse_lines_across_chunks(self):
+        """测试跨分块的行以及末尾无换行的行都能解析"""
+        data = b'{"a": 1}\n\n{"b": 2}\n{"c": 3}'
+        assert _collect(iter_ndjson, data, 3) == [{"a": 1}, {"b": 2}, {"c": 3}]
+
+    def test_bad_line_should_be_yielded_as_error(self):
+        """测试无法解析的行以错误对象产出，不中断后续行"""
+        items = _collect(iter_ndjson, b'{"a": 1}\n{bad\n{"c": 3}\n', 5)
+        assert isinstance(items[1], StreamParseError)
+        assert items[2] == {"c": 3}
@@ -0,0 +1,54 @@
+import asyncio
+from functools import partial
+
+from sqlalchemy import text
+
+from app.db import database
+from app.db.database import create_async_engines
+from app.db.tenants import TenantEngineCache
+
+
+def _cache(tmp_path, **kwargs):
+    return TenantEngineCache(
+        f"sqlite:///{tmp_path}/{{tenant}}.db",
+        open_engines=partial(create_async_engines, read_pool_size=1),
+        init_schema=database._init_tenant_schema,
+        **kwargs,
+    )
+
+
+class TestTenantEngineCache:
+    """租户引擎缓存淘汰策略测试 - 接口测试不方便控制会话的持有时间"""
+
+    def test_idle_tenant_should_be_closed_after_timeout(self, tmp_path):
+        """测试空闲超时的租户在下一次取会话后被关闭"""
+        cache = _cache(tmp_path, capacity=10, idle_seconds=0)
+
+        async def run():
+            async with cache.session("a") as db:
+                await db.execute(text("SELECT 1"))
+            return cache.stats()
+
+        try:
+            stats = asyncio.run(run())
+        finally:
+            asyncio.run(cache.dispose())
+        assert stats["open"] == 0
+        assert stats["evictions"] == 1
+
+    def test_tenant_in_use_should_not_be_evicted(self, tmp_path):
+        """测试正在使用的租户即使超出容量也不会被关闭"""
+        cache = _cache(tmp_path, capacity=1, idle_seconds=300)
+
+        async def run():
+            async with cache.session("a") as db_a:
+                async with cache.session("b", read_only=True) as db_b:
+                    await db_b.execute(text("SELECT 1"))
+                # b 用完后超出容量，a 仍在使用，淘汰的是 b
+                assert set(cache.stats()["tenants"]) == {"a"}
+                await db_a.execute(text("SELECT 1"))
+
+        try:
+            asyncio.run(run())
+        finally:
+            asyncio.run(cache.dispose())